@@ -0,0 +1,399 @@
+"""on_message 热路径的合成基准测试。
+
+需在已安装 AstrBot 的环境中运行（插件目录位于 AstrBot 的插件目录下即可）::
+
+    python benchmarks/bench_on_message.py --sizes 10,1000 --save baseline.json
+    python benchmarks/bench_on_message.py --sizes 10,1000 --compare baseline.json
+
+按规则规模（正则、纯文本指令、消息类型、带生效时段规则的混合）与消息流（纯文本、大型卡片、
+混合消息段）逐项运行，报告吞吐量、p50/p99 延迟与峰值内存。``--save`` 保存结果作为基线，
+``--compare`` 与基线对比，吞吐下降或 p99 上升超过阈值时以非零状态退出。
+
+规则构建耗时随规则总数线性增长（全局规则的自动机与组合正则只构建一次，由各群共享），
+其中大头是正则安全检测：每条新正则在检测子进程中约需数毫秒，10 万条规则（约 1 万条正则）
+的单项构建需一分钟以上，因此默认规模只到 1 万，更大规模请用 ``--sizes`` 显式指定。
+输出末尾按规模汇总每千条规则的构建耗时，用于确认构建没有退化为超线性。
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PLUGIN_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_SIZES = (10, 1000, 10000)
+STREAMS = ("plain", "card", "mixed")
+# 每个群的指令规则数量，用于按规则规模推算群数量
+COMMAND_RULES_PER_GROUP = 100
+
+
+def load_plugin_module():
+    sys.path.insert(0, str(PLUGIN_DIR.parent))
+    return importlib.import_module(f"{PLUGIN_DIR.name}.main")
+
+
+# ---- AstrBot 事件与 Bot API 替身 ----
+
+class FakeSegment:
+    def __init__(self, **data):
+        self.__dict__.update(data)
+
+
+def make_segment(seg_type: str, **data) -> FakeSegment:
+    # 插件按消息段的类名识别类型
+    cls = type(seg_type, (FakeSegment,), {})
+    return cls(**data)
+
+
+class FakeBotApi:
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+
+    async def call_action(self, action: str, **params):
+        self.calls[action] = self.calls.get(action, 0) + 1
+        if action == "get_group_member_list":
+            return [{"user_id": 1, "role": "owner"}]
+        return {}
+
+
+class FakeBot:
+    def __init__(self, api: FakeBotApi):
+        self.api = api
+
+
+class FakeEvent:
+    def __init__(self, bot: FakeBot, group_id: str, user_id: str, text: str, segments: List[Any], message_id: int):
+        self.bot = bot
+        self.message_str = text
+        self.message_obj = FakeSegment(
+            raw_message={"sender": {"role": "member"}, "post_type": "message"},
+            message_id=message_id,
+        )
+        self._group_id = group_id
+        self._user_id = user_id
+        self._segments = segments
+
+    def get_group_id(self):
+        return self._group_id
+
+    def get_sender_id(self):
+        return self._user_id
+
+    def get_sender_name(self):
+        return "bench"
+
+    def get_self_id(self):
+        return "10000"
+
+    def get_messages(self):
+        return self._segments
+
+    def plain_result(self, text: str):
+        return text
+
+    async def send(self, result: Any):
+        return None
+
+
+class FakeContext:
+    def get_config(self):
+        return {"admins_id": []}
+
+
+# ---- 规则与消息生成 ----
+
+def random_word(rng: random.Random, length: int = 6) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def build_rule_set(size: int, rng: random.Random) -> Dict[str, Any]:
+    """按规模生成规则：约 5% 配置正则、1% 消息类型、2% 带生效时段，其余为按群的纯文本指令规则。"""
+    regex_count = max(1, size * 5 // 100)
+    type_count = max(1, size // 100)
+    timed_count = max(1, size * 2 // 100)
+    command_count = max(0, size - regex_count - type_count - timed_count)
+    group_count = max(1, command_count // COMMAND_RULES_PER_GROUP)
+    groups = [str(100000 + i) for i in range(group_count)]
+
+    sentinel_rules = []
+    for _ in range(regex_count):
+        word = random_word(rng, 5)
+        sentinel_rules.append({
+            "keywords": [f"{word}\\d{{2,4}}", f"(?i){word[:3]}.{{0,3}}{word[3:]}"],
+            "groups": [rng.choice(groups)] if rng.random() < 0.5 else [],
+            "mute_duration": "60",
+        })
+    type_choices = ["图片", "语音", "视频", "文件", "卡片/分享", "转发消息"]
+    for _ in range(type_count):
+        sentinel_rules.append({
+            "msg_types": [rng.choice(type_choices)],
+            "groups": [rng.choice(groups)],
+            "mute_duration": "0",
+        })
+    for _ in range(timed_count):
+        sentinel_rules.append({
+            "keywords": [random_word(rng, 7)],
+            "time_range": rng.choice(["09:00-18:00", "22:00-02:00", "Mon-Fri 08:00-20:00", "Sat,Sun"]),
+            "mute_duration": "30",
+        })
+
+    command_rules = []
+    for i in range(command_count):
+        command_rules.append({
+            "rule_id": str(i + 1),
+            "keywords": [random_word(rng, rng.randint(3, 8))],
+            "groups": [groups[i % group_count]],
+            "rule_user_monitor_list": [],
+            "rule_user_whitelist": [],
+            "created_by": "1",
+        })
+
+    return {"sentinel_rules": sentinel_rules, "command_rules": command_rules, "groups": groups}
+
+
+def build_card_payload(rng: random.Random, words: List[str]) -> str:
+    news = {
+        "title": " ".join(rng.choice(words) for _ in range(4)),
+        "desc": " ".join(rng.choice(words) for _ in range(30)),
+        "jumpUrl": "https://example.com/" + random_word(rng, 24),
+        "preview": "https://example.com/img/" + random_word(rng, 24),
+        "tag": random_word(rng),
+    }
+    return json.dumps({
+        "app": "com.tencent.miniapp",
+        "ver": "1.0.0.1",
+        "prompt": "[分享]" + rng.choice(words),
+        "meta": {"detail_1": {**news, "host": {"uin": 10001, "nick": random_word(rng)}}, "news": news},
+        "extra": {"items": [random_word(rng, 32) for _ in range(200)]},
+        "config": {"ctime": 1700000000, "token": random_word(rng, 32)},
+    }, ensure_ascii=False)
+
+
+def build_messages(stream: str, count: int, rule_set: Dict[str, Any], rng: random.Random, repeat_ratio: float) -> List[Dict[str, Any]]:
+    groups = rule_set["groups"] + ["999999"]
+    command_words = [rule["keywords"][0] for rule in rule_set["command_rules"][:500]]
+    filler = [random_word(rng, rng.randint(2, 8)) for _ in range(200)]
+    messages = []
+    for i in range(count):
+        if messages and rng.random() < repeat_ratio:
+            # 模拟刷屏：重复之前的内容
+            messages.append(dict(rng.choice(messages), user_id=str(rng.randint(20000, 20999))))
+            continue
+        words = [rng.choice(filler) for _ in range(rng.randint(3, 40))]
+        if command_words and rng.random() < 0.05:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(command_words))
+        text = " ".join(words)
+        segments = [("Plain", {"text": text})]
+        if stream == "card":
+            text = ""
+            segments = [("Json", {"data": build_card_payload(rng, filler + command_words[:20])})]
+        elif stream == "mixed":
+            extra = rng.choice([("Image", {}), ("Face", {}), ("At", {"qq": "10001"}), ("Record", {})])
+            segments.append(extra)
+            if rng.random() < 0.2:
+                segments.append(("Json", {"data": build_card_payload(rng, filler)}))
+        messages.append({
+            "group_id": rng.choice(groups),
+            "user_id": str(rng.randint(20000, 20999)),
+            "text": text,
+            "segments": segments,
+        })
+    return messages
+
+
+# ---- 运行 ----
+
+def make_plugin(module, rule_set: Dict[str, Any]):
+    # 以旧版整表格式写入，初始化时由 CommandRuleStore 迁移为按群分片
+    kv: Dict[str, Any] = {module.CommandRuleStore.LEGACY_KEY: rule_set["command_rules"]}
+
+    class BenchPlugin(module.SentinelPlugin):
+        async def get_kv_data(self, key, default):
+            return kv.get(key, default)
+
+        async def put_kv_data(self, key, value):
+            kv[key] = value
+
+        async def delete_kv_data(self, key):
+            kv.pop(key, None)
+
+    config = {
+        "sentinel_rules": rule_set["sentinel_rules"],
+        "command_module": {"mute_duration": "60"},
+        # 只测量消息处理本身，不受动作限速影响
+        "performance": {"action_group_rate": 0, "action_global_rate": 0},
+    }
+    return BenchPlugin(FakeContext(), config)
+
+
+def percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return float(sorted_values[index])
+
+
+async def run_case(module, size: int, stream: str, count: int, seed: int, repeat_ratio: float) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    rule_set = build_rule_set(size, rng)
+    messages = build_messages(stream, count, rule_set, rng, repeat_ratio)
+    api = FakeBotApi()
+    bot = FakeBot(api)
+    events = [
+        FakeEvent(
+            bot,
+            msg["group_id"],
+            msg["user_id"],
+            msg["text"],
+            [make_segment(seg_type, **data) for seg_type, data in msg["segments"]],
+            i,
+        )
+        for i, msg in enumerate(messages)
+    ]
+
+    gc.collect()
+    tracemalloc.start()
+    build_start = time.perf_counter()
+    plugin = make_plugin(module, rule_set)
+    await plugin.initialize()
+    build_seconds = time.perf_counter() - build_start
+    # 峰值内存只统计规则构建与一小段消息处理，避免 tracemalloc 影响延迟测量
+    for event in events[: min(200, len(events))]:
+        await plugin.on_message(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+    start = time.perf_counter()
+    for event in events:
+        t0 = perf_counter_ns()
+        await plugin.on_message(event)
+        latencies.append((perf_counter_ns() - t0) // 1000)
+    elapsed = time.perf_counter() - start
+    await plugin.terminate()
+
+    latencies.sort()
+    return {
+        "rules": size,
+        "groups": len(rule_set["groups"]),
+        "stream": stream,
+        "messages": count,
+        "build_seconds": round(build_seconds, 4),
+        "throughput": round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_us": percentile(latencies, 50),
+        "p99_us": percentile(latencies, 99),
+        "peak_mem_mb": round(peak / (1024 * 1024), 2),
+        "actions": dict(api.calls),
+    }
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return f"rules={result['rules']}/stream={result['stream']}"
+
+
+def print_results(results: List[Dict[str, Any]]):
+    header = f"{'case':<32}{'msg/s':>12}{'p50 us':>10}{'p99 us':>10}{'peak MB':>10}{'build s':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{case_key(r):<32}{r['throughput']:>12.1f}{r['p50_us']:>10.1f}"
+            f"{r['p99_us']:>10.1f}{r['peak_mem_mb']:>10.2f}{r['build_seconds']:>10.3f}"
+        )
+
+    # 构建耗时的规模曲线：每千条规则的耗时应大致持平，随规模明显上升说明构建出现了超线性
+    by_size: Dict[int, List[Dict[str, Any]]] = {}
+    for r in results:
+        by_size.setdefault(r["rules"], []).append(r)
+    print("\n构建耗时随规模的变化（同一规模各消息流取平均）:")
+    for size in sorted(by_size):
+        cases = by_size[size]
+        build = sum(r["build_seconds"] for r in cases) / len(cases)
+        groups = cases[0].get("groups", "?")
+        print(f"rules={size:<10} groups={groups:<8} build {build:>8.3f}s  {build * 1000 / size * 1000:>8.2f} ms/千条规则")
+
+
+def compare_results(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> bool:
+    """与基线对比并打印差异，存在回归时返回 False。"""
+    base_cases = {case_key(r): r for r in baseline.get("results", [])}
+    ok = True
+    print(f"\n对比基线 ({baseline.get('meta', {}).get('created_at', '?')})，阈值 {threshold:.0%}")
+    for r in results:
+        base = base_cases.get(case_key(r))
+        if base is None:
+            print(f"{case_key(r):<32} 基线中无此项")
+            continue
+        tp_delta = (r["throughput"] - base["throughput"]) / base["throughput"] if base["throughput"] else 0.0
+        p99_delta = (r["p99_us"] - base["p99_us"]) / base["p99_us"] if base["p99_us"] else 0.0
+        regressed = tp_delta < -threshold or p99_delta > threshold
+        ok = ok and not regressed
+        flag = "REGRESSION" if regressed else "ok"
+        print(f"{case_key(r):<32} msg/s {tp_delta:+.1%}  p99 {p99_delta:+.1%}  {flag}")
+    return ok
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="规则规模，逗号分隔")
+    parser.add_argument("--streams", default=",".join(STREAMS), help="消息流类型: plain,card,mixed")
+    parser.add_argument("--messages", type=int, default=5000, help="每项的消息条数")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="重复内容（刷屏）所占比例")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", type=Path, help="把结果保存为基线 JSON")
+    parser.add_argument("--compare", type=Path, help="与已保存的基线对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定回归的相对变化阈值")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    module = load_plugin_module()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    streams = [s.strip() for s in args.streams.split(",") if s.strip()]
+    unknown = set(streams) - set(STREAMS)
+    if unknown:
+        print(f"未知的消息流类型: {', '.join(sorted(unknown))}")
+        return 2
+
+    results = []
+    for size in sizes:
+        for stream in streams:
+            results.append(await run_case(module, size, stream, args.messages, args.seed, args.repeat_ratio))
+            print(f"完成 {case_key(results[-1])}", file=sys.stderr)
+    print_results(results)
+
+    if args.save:
+        payload = {
+            "meta": {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "messages": args.messages,
+                "repeat_ratio": args.repeat_ratio,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        args.save.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n已保存基线: {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if not compare_results(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,72 +1,153 @@
-import re
+import os
 import random
+import re
 import asyncio
+import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from astrbot.api.event import filter, AstrMessageEvent
-from astrbot.api.star import Context, Star, register
+from astrbot.api.star import Context, Star, StarTools, register
+from astrbot.api.message_components import File
 from astrbot.api import logger
 from .utils import (
+    RegexGuard,
+    RuleChain,
+    SentinelMetrics,
+    TokenBucket,
+    VerdictCache,
+    build_literal_matchers,
+    build_regex_program,
+    merge_rule_chains,
     extract_at_user_ids,
-    extract_command_keyword,
+    extract_command_keywords,
     extract_json_descriptive_text,
-    is_in_active_when,
+    format_rule_export_text,
+    parse_rule_import_text,
+    ActiveWindowScheduler,
+    BackgroundActionQueue,
+    OneBotActionScheduler,
+    AdminTargetCache,
     notify_for_hit,
-    parse_active_when,
+    CommandRuleIndex,
+    CommandRuleStore,
+    CompiledRule,
+    HitCounterStore,
+    MuteStateTracker,
+    NotificationDigest,
+    PrivateMessageFanout,
+    RecipientFailureCache,
+    SEGMENT_MSG_TYPES,
+    parse_mute_duration,
+    parse_normalize_level,
+    pick_mute_duration,
     render_template_text,
 )
 
 
 class SentinelPlugin(Star):
-    COMMAND_RULES_KEY = "command_monitor_rules"
+    # /监控导入 的文件大小、规则条数与结果中逐条列出的上限
+    IMPORT_MAX_BYTES = 1024 * 1024
+    IMPORT_MAX_RULES = 5000
+    IMPORT_REPORT_LIMIT = 20
 
     def __init__(self, context: Context, config: dict = None):
         super().__init__(context)
         self.config = config or {}
         self._compiled_global_rules = []
         self._compiled_rules_by_group = {}
-        self._command_rules = []
+        # 指令规则 ID -> 已编译规则，供指令增删时局部更新
+        self._compiled_command_rules: Dict[str, CompiledRule] = {}
+        self._command_rule_overrides = {}
+        self._next_rule_order = 0
+        # 正则文本 -> 已编译对象；全量重建时只保留仍在使用的正则
+        self._pattern_cache = {}
+        self._retired_patterns = {}
+        self._rule_set_version = 0
+        self._global_chain = RuleChain(0, [])
+        self._chains_by_group = {}
+        self._performance_cfg = {}
+        self._command_rules = CommandRuleIndex()
         self._global_whitelist_set = set()
         self._group_blacklist_set = set()
         self._command_whitelist_set = set()
         self._command_rules_lock = asyncio.Lock()
         self._warned_no_admin_targets = False
+        self._window_scheduler = ActiveWindowScheduler(logger)
+        self._metrics = SentinelMetrics(logger=logger)
+        self._regex_guard = RegexGuard(logger=logger, on_disable=self._build_rule_chains)
+        self._action_queue = BackgroundActionQueue(logger=logger)
+        self._action_scheduler = OneBotActionScheduler(logger=logger)
+        self._action_scheduler.metrics = self._metrics
+        self._mute_state = MuteStateTracker()
+        self._verdict_cache = VerdictCache()
+        self._admin_cache = AdminTargetCache()
+        self._notify_fanout = PrivateMessageFanout(
+            limiter=TokenBucket(5, 10),
+            failure_cache=RecipientFailureCache(),
+            scheduler=self._action_scheduler,
+        )
+        self._notify_digest = NotificationDigest(fanout=self._notify_fanout, logger=logger)
+        self._notify_digest_cfg = {}
+        self._hit_counters = HitCounterStore(
+            self.get_kv_data,
+            self.put_kv_data,
+            self.delete_kv_data,
+            pending_groups=lambda: self._rule_store.pending_groups,
+            logger=logger,
+        )
+        self._rule_store = CommandRuleStore(
+            self.get_kv_data, self.put_kv_data, self.delete_kv_data, logger=logger
+        )
         self._update_cache()
 
     async def initialize(self):
         await self._load_command_rules()
+        await self._hit_counters.load()
+        # 构造时登记的新正则在线程池中探测，完成后再构建规则缓存，探测期间不阻塞事件循环
+        await self._regex_guard.probe_pending()
         self._update_cache()
+        await self._regex_guard.start()
+        self._window_scheduler.start()
+        self._hit_counters.start()
+        self._rule_store.start()
+        self._notify_digest.start()
+        self._action_scheduler.start()
+        self._action_queue.start()
+        self._metrics.start(self._metrics_gauges)
 
     async def _load_command_rules(self):
-        data = await self.get_kv_data(self.COMMAND_RULES_KEY, [])
-        if not isinstance(data, list):
-            self._command_rules = []
-            return
-
-        result = []
-        max_id = 0
-        for item in data:
-            if not isinstance(item, dict):
-                continue
-            keywords = item.get("keywords", [])
-            groups = item.get("groups", [])
-            if not keywords or not groups:
-                continue
-            normalized = item.copy()
-            rid = str(normalized.get("rule_id", "")).strip()
-            if rid.isdigit():
-                rid_num = int(rid)
-                if rid_num > max_id:
-                    max_id = rid_num
-                normalized["rule_id"] = rid
-            else:
-                max_id += 1
-                normalized["rule_id"] = str(max_id)
-            result.append(normalized)
-        self._command_rules = result
-
-    async def _save_command_rules(self):
-        await self.put_kv_data(self.COMMAND_RULES_KEY, self._command_rules)
+        await self._rule_store.load()
+        if self._performance_cfg["lazy_rule_loading"]:
+            # 各群的规则分片在该群首条消息或首次指令时载入
+            self._command_rules = CommandRuleIndex()
+        else:
+            self._command_rules = CommandRuleIndex(await self._rule_store.hydrate_all())
+
+    async def _save_command_rules(self, upserts=(), removed_ids=()):
+        """只把变化的规则追加到变更日志，不重写整个规则表。"""
+        await self._rule_store.record(upserts, removed_ids)
+
+    async def _commit_command_rule_changes(self, upserts=(), removed_ids=()):
+        """更新规则索引、追加变更日志并局部更新规则缓存；调用方需持有 ``_command_rules_lock``。"""
+        for rid in removed_ids:
+            self._command_rules.remove(rid)
+        for rule in upserts:
+            self._command_rules.add(rule)
+        await self._save_command_rules(upserts, removed_ids)
+        self._patch_command_rules(upserts, removed_ids)
+
+    async def _ensure_group_rules(self, group_id: str):
+        """按需载入某群的指令规则分片，并局部更新规则缓存。"""
+        async with self._command_rules_lock:
+            try:
+                rules = await self._rule_store.hydrate(group_id)
+            except Exception as e:
+                logger.error(f"[Sentinel] 载入群 {group_id} 的指令规则失败: {e}")
+                return
+            if rules:
+                for rule in rules:
+                    self._command_rules.add(rule)
+                self._patch_command_rules(upserts=rules)
 
     def _get_command_module_config(self) -> Dict[str, Any]:
         raw = self.config.get("command_module", {})
@@ -80,6 +161,55 @@ class SentinelPlugin(Star):
             "kick_threshold": self._safe_int(raw.get("kick_threshold", 0), 0),
             "kick_message": [str(m).strip() for m in raw.get("kick_message", []) if str(m).strip()],
             "notify_creator": bool(raw.get("notify_creator", False)),
+            "notify_immediate": bool(raw.get("notify_immediate", False)),
+            "normalize": parse_normalize_level(raw.get("normalize", "关闭")),
+        }
+
+    def _get_notify_digest_config(self) -> Dict[str, Any]:
+        raw = self.config.get("notify_digest", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return {
+            "enable": bool(raw.get("enable", False)),
+            "interval": max(1, self._safe_int(raw.get("interval", 10), 10)),
+            "max_batch": max(1, self._safe_int(raw.get("max_batch", 20), 20)),
+        }
+
+    def _get_metrics_config(self) -> Dict[str, Any]:
+        raw = self.config.get("metrics", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return {
+            "enable": bool(raw.get("enable", False)),
+            "prometheus_file": str(raw.get("prometheus_file", "") or "").strip(),
+            "prometheus_interval": max(5, self._safe_int(raw.get("prometheus_interval", 60), 60)),
+        }
+
+    def _get_performance_config(self) -> Dict[str, Any]:
+        raw = self.config.get("performance", {})
+        if not isinstance(raw, dict):
+            raw = {}
+        return {
+            "fused_regex": bool(raw.get("fused_regex", False)),
+            "fused_regex_chunk_size": max(1, self._safe_int(raw.get("fused_regex_chunk_size", 32), 32)),
+            "regex_prefilter": bool(raw.get("regex_prefilter", True)),
+            "hit_counter_flush_interval": max(1, self._safe_int(raw.get("hit_counter_flush_interval", 30), 30)),
+            "group_admin_cache_ttl": max(0, self._safe_int(raw.get("group_admin_cache_ttl", 600), 600)),
+            "notify_concurrency": max(1, self._safe_int(raw.get("notify_concurrency", 4), 4)),
+            "notify_rate_limit": max(0, self._safe_int(raw.get("notify_rate_limit", 5), 5)),
+            "notify_failure_ttl": max(0, self._safe_int(raw.get("notify_failure_ttl", 3600), 3600)),
+            "action_workers": max(1, self._safe_int(raw.get("action_workers", 4), 4)),
+            "action_queue_size": max(1, self._safe_int(raw.get("action_queue_size", 1000), 1000)),
+            "action_group_rate": max(0, self._safe_int(raw.get("action_group_rate", 5), 5)),
+            "action_global_rate": max(0, self._safe_int(raw.get("action_global_rate", 20), 20)),
+            "action_burst_window": max(0, self._safe_int(raw.get("action_burst_window", 10), 10)),
+            "verdict_cache_size": max(0, self._safe_int(raw.get("verdict_cache_size", 4096), 4096)),
+            "regex_guard": bool(raw.get("regex_guard", True)),
+            "regex_guard_budget_ms": max(1, self._safe_int(raw.get("regex_guard_budget_ms", 100), 100)),
+            "lazy_rule_loading": bool(raw.get("lazy_rule_loading", False)),
+            "rule_journal_compact_threshold": max(
+                1, self._safe_int(raw.get("rule_journal_compact_threshold", 200), 200)
+            ),
         }
 
     @staticmethod
@@ -90,131 +220,303 @@ class SentinelPlugin(Star):
             return default
 
     def _next_command_rule_id(self) -> str:
-        """生成下一个指令规则 ID（纯数字字符串）。"""
-        max_id = 0
-        for rule in self._command_rules:
-            rid = str(rule.get("rule_id", "")).strip()
-            if not rid.isdigit():
-                continue
-            num = int(rid)
-            if num > max_id:
-                max_id = num
-        return str(max_id + 1)
+        """生成下一个指令规则 ID（纯数字字符串）；按需载入时未载入的群也计入，ID 不会重复。"""
+        return str(self._rule_store.max_rule_id + 1)
 
     def _update_cache(self):
         """更新配置缓存，预编译正则表达式并转换列表为集合以提高性能"""
+        started = time.perf_counter_ns()
+        metrics_cfg = self._get_metrics_config()
+        self._metrics.enabled = metrics_cfg["enable"]
+        self._metrics.prometheus_file = metrics_cfg["prometheus_file"]
+        self._metrics.interval = metrics_cfg["prometheus_interval"]
         self._global_whitelist_set = {str(u) for u in self.config.get("user_whitelist", [])}
         self._group_blacklist_set = {str(g) for g in self.config.get("group_blacklist", [])}
 
         cmd_cfg = self._get_command_module_config()
         self._command_whitelist_set = set(cmd_cfg.get("command_user_whitelist", []))
+        self._performance_cfg = self._get_performance_config()
+        self._notify_digest_cfg = self._get_notify_digest_config()
+        self._notify_digest.interval = self._notify_digest_cfg["interval"]
+        self._notify_digest.max_batch = self._notify_digest_cfg["max_batch"]
 
         self._compiled_global_rules = []
         self._compiled_rules_by_group = {}
-        merged_rules = []
+        self._compiled_command_rules = {}
+        self._retired_patterns = self._pattern_cache
+        self._pattern_cache = {}
+        compiled_rules = []
 
         static_rules = self.config.get("sentinel_rules", [])
         for i, rule in enumerate(static_rules):
             if not isinstance(rule, dict):
                 continue
-            r = rule.copy()
-            r["_rule_source"] = "config"
-            r["_rule_id"] = f"cfg:{i}"
-            merged_rules.append(r)
-
+            compiled_rules.append(
+                CompiledRule.from_dict(
+                    rule,
+                    source="config",
+                    rule_id=f"cfg:{i}",
+                    order=len(compiled_rules),
+                    logger=logger,
+                    compile_pattern=self._compile_pattern,
+                )
+            )
+        # 按探测结果把慢正则移出同步匹配路径（结果按正则文本缓存，新正则由 initialize 中的 probe_pending 探测）
+        self._regex_guard.enabled = self._performance_cfg["regex_guard"]
+        self._regex_guard.budget = self._performance_cfg["regex_guard_budget_ms"] / 1000
+        self._regex_guard.apply(compiled_rules)
+
+        # 指令规则统一使用指令模块配置，这些字段在所有指令规则间共享同一对象
+        cmd_mute_bounds, cmd_mute_err = parse_mute_duration(cmd_cfg["mute_duration"])
+        if cmd_mute_err:
+            logger.error(f"[Sentinel] 指令模块 {cmd_mute_err}")
+        self._command_rule_overrides = {
+            "whitelist": frozenset(self._command_whitelist_set),
+            "mute_bounds": cmd_mute_bounds,
+            "reply_message": tuple(cmd_cfg["reply_message"]),
+            "ignore_admin": cmd_cfg["ignore_admin"],
+            "kick_threshold": cmd_cfg["kick_threshold"],
+            "kick_message": tuple(cmd_cfg["kick_message"]),
+            "notify_creator": cmd_cfg["notify_creator"],
+            "notify_immediate": cmd_cfg["notify_immediate"],
+            "normalize": cmd_cfg["normalize"],
+        }
         for rule in self._command_rules:
-            if not isinstance(rule, dict):
-                continue
-            r = rule.copy()
-            rid = str(r.get("rule_id", "")).strip()
-            if not rid.isdigit():
-                continue
-            r["_rule_source"] = "command"
-            r["_rule_id"] = rid
-            merged_rules.append(r)
-
-        for i, rule in enumerate(merged_rules):
-            compiled_rule = rule.copy()
-            compiled_rule["_order"] = i
-            compiled_rule["_user_whitelist_set"] = {str(u) for u in rule.get("rule_user_whitelist", [])}
-            compiled_rule["_user_monitor_list_set"] = {str(u) for u in rule.get("rule_user_monitor_list", [])}
-            compiled_rule["_groups_set"] = {str(g) for g in rule.get("groups", [])}
-
-            compiled_patterns = []
-            for kw in rule.get("keywords", []):
-                kw_text = str(kw)
-                if compiled_rule.get("_rule_source") == "command":
-                    # 指令规则关键词仅做纯文本匹配，不支持正则
-                    compiled_patterns.append(kw_text)
-                    continue
-                try:
-                    compiled_patterns.append(re.compile(kw_text))
-                except re.error as e:
-                    logger.error(f"[Sentinel] 规则 {i} 正则表达式语法错误: {kw_text}, 错误: {e}")
-                    compiled_patterns.append(kw_text)
-            compiled_rule["_compiled_patterns"] = compiled_patterns
-
-            compiled_rule["_msg_types_set"] = set(rule.get("msg_types", []))
-            schedule_raw = str(rule.get("time_range", "") or "").strip()
-            compiled_rule["_active_when_raw"] = schedule_raw
-            compiled_rule["_active_when_spec"] = None
-            compiled_rule["_active_when_error"] = None
-            if schedule_raw:
-                spec, err = parse_active_when(schedule_raw)
-                compiled_rule["_active_when_spec"] = spec
-                compiled_rule["_active_when_error"] = err
-                if err:
-                    rid = compiled_rule.get("_rule_id", i)
-                    logger.error(f"[Sentinel] 规则 {rid} time_range 配置错误: {err}")
-
-            groups_set = compiled_rule["_groups_set"]
-            if groups_set:
-                for gid in groups_set:
+            compiled = self._compile_command_rule(rule, len(compiled_rules))
+            if compiled is not None:
+                self._compiled_command_rules[compiled.rule_id] = compiled
+                compiled_rules.append(compiled)
+        self._next_rule_order = len(compiled_rules)
+        self._retired_patterns = {}
+
+        for compiled_rule in compiled_rules:
+            if compiled_rule.groups:
+                for gid in compiled_rule.groups:
                     self._compiled_rules_by_group.setdefault(gid, []).append(compiled_rule)
             else:
                 self._compiled_global_rules.append(compiled_rule)
 
-    def _get_candidate_rules_for_group(self, group_id: str) -> List[dict]:
-        group_rules = self._compiled_rules_by_group.get(group_id, [])
-        if not group_rules:
-            return self._compiled_global_rules
-        if not self._compiled_global_rules:
-            return group_rules
-
-        # 线性合并两条有序规则链，保持与原始配置一致的匹配顺序
-        merged = []
-        global_rules = self._compiled_global_rules
-        i = 0
-        j = 0
-        while i < len(global_rules) and j < len(group_rules):
-            if global_rules[i]["_order"] <= group_rules[j]["_order"]:
-                merged.append(global_rules[i])
-                i += 1
-            else:
-                merged.append(group_rules[j])
-                j += 1
-        if i < len(global_rules):
-            merged.extend(global_rules[i:])
-        if j < len(group_rules):
-            merged.extend(group_rules[j:])
-        return merged
-
-    def _resolve_effective_rule(self, rule: dict) -> dict:
-        if rule.get("_rule_source") != "command":
-            return rule
-        cmd_cfg = self._get_command_module_config()
-        effective = rule.copy()
+        self._hit_counters.flush_interval = self._performance_cfg["hit_counter_flush_interval"]
+        self._admin_cache.ttl = self._performance_cfg["group_admin_cache_ttl"]
+        notify_rate = self._performance_cfg["notify_rate_limit"]
+        self._notify_fanout.concurrency = self._performance_cfg["notify_concurrency"]
+        self._notify_fanout.limiter.configure(notify_rate, max(1, notify_rate * 2))
+        self._notify_fanout.failure_cache.ttl = self._performance_cfg["notify_failure_ttl"]
+        # 队列大小与并发数在下次启动队列时生效
+        self._action_queue.workers = self._performance_cfg["action_workers"]
+        self._action_queue.maxsize = self._performance_cfg["action_queue_size"]
+        self._action_scheduler.configure(
+            self._performance_cfg["action_group_rate"], self._performance_cfg["action_global_rate"]
+        )
+        self._mute_state.burst_window = self._performance_cfg["action_burst_window"]
+        self._verdict_cache.maxsize = self._performance_cfg["verdict_cache_size"]
+        self._rule_store.compact_threshold = self._performance_cfg["rule_journal_compact_threshold"]
+        self._hit_counters.set_valid_rule_ids(r.rule_id for r in compiled_rules if r.kick_threshold > 0)
+        self._build_rule_chains()
+        if self._metrics.enabled:
+            self._metrics.observe_stage("rebuild", time.perf_counter_ns() - started)
+
+    def _compile_pattern(self, text: str) -> "re.Pattern":
+        """按正则文本复用已编译对象，未变化的正则不会重复编译。"""
+        pattern = self._pattern_cache.get(text)
+        if pattern is None:
+            pattern = self._retired_patterns.get(text)
+            if pattern is None:
+                pattern = re.compile(text)
+            self._pattern_cache[text] = pattern
+        return pattern
+
+    def _compile_command_rule(self, rule: Any, order: int):
+        """编译单条指令规则并套用指令模块配置；规则 ID 无效时返回 None。"""
+        if not isinstance(rule, dict):
+            return None
+        rid = str(rule.get("rule_id", "")).strip()
+        if not rid.isdigit():
+            return None
+        overrides = self._command_rule_overrides
+        compiled = CompiledRule.from_dict(
+            rule,
+            source="command",
+            rule_id=rid,
+            order=order,
+            logger=logger,
+            compile_pattern=self._compile_pattern,
+            normalize=overrides["normalize"],
+        )
         # 指令模块白名单用户对“指令规则”免检
-        cmd_whitelist = set(cmd_cfg.get("command_user_whitelist", []))
-        base_whitelist = {str(u) for u in effective.get("_user_whitelist_set", set())}
-        effective["_user_whitelist_set"] = base_whitelist | cmd_whitelist
-        effective["mute_duration"] = cmd_cfg["mute_duration"]
-        effective["reply_message"] = cmd_cfg["reply_message"]
-        effective["ignore_admin"] = cmd_cfg["ignore_admin"]
-        effective["kick_threshold"] = cmd_cfg["kick_threshold"]
-        effective["kick_message"] = cmd_cfg["kick_message"]
-        effective["_notify_creator"] = cmd_cfg["notify_creator"]
-        return effective
+        cmd_whitelist = overrides["whitelist"]
+        compiled.user_whitelist = compiled.user_whitelist | cmd_whitelist if compiled.user_whitelist else cmd_whitelist
+        compiled.mute_bounds = overrides["mute_bounds"]
+        compiled.reply_message = overrides["reply_message"]
+        compiled.ignore_admin = overrides["ignore_admin"]
+        compiled.kick_threshold = overrides["kick_threshold"]
+        compiled.kick_message = overrides["kick_message"]
+        compiled.notify_creator = overrides["notify_creator"]
+        compiled.notify_immediate = overrides["notify_immediate"]
+        return compiled
+
+    def _patch_command_rules(self, upserts=(), removed_ids=()):
+        """指令增删规则后局部更新缓存：只编译变化的规则，只重建涉及的群的规则链。"""
+        started = time.perf_counter_ns()
+        rules_by_group = self._compiled_rules_by_group
+        touched = set()
+        needs_full_chains = False
+        kick_added = []
+        kick_removed = []
+
+        def _detach(compiled: CompiledRule):
+            nonlocal needs_full_chains
+            if not compiled.groups:
+                needs_full_chains = True
+                self._compiled_global_rules = [r for r in self._compiled_global_rules if r is not compiled]
+            for gid in compiled.groups:
+                group_rules = rules_by_group.get(gid)
+                if group_rules is None:
+                    continue
+                group_rules[:] = [r for r in group_rules if r is not compiled]
+                if not group_rules:
+                    del rules_by_group[gid]
+                touched.add(gid)
+            if compiled.kick_threshold > 0:
+                kick_removed.append(compiled.rule_id)
+
+        def _attach(compiled: CompiledRule):
+            nonlocal needs_full_chains
+            if not compiled.groups:
+                needs_full_chains = True
+                targets = [self._compiled_global_rules]
+            else:
+                targets = [rules_by_group.setdefault(gid, []) for gid in compiled.groups]
+                touched.update(compiled.groups)
+            for group_rules in targets:
+                index = len(group_rules)
+                while index > 0 and group_rules[index - 1].order > compiled.order:
+                    index -= 1
+                group_rules.insert(index, compiled)
+            if compiled.kick_threshold > 0:
+                kick_added.append(compiled.rule_id)
+
+        for rid in removed_ids:
+            old = self._compiled_command_rules.pop(str(rid), None)
+            if old is not None:
+                _detach(old)
+        for rule in upserts:
+            rid = str(rule.get("rule_id", "")).strip() if isinstance(rule, dict) else ""
+            old = self._compiled_command_rules.get(rid)
+            if old is not None:
+                order = old.order
+            else:
+                order = self._next_rule_order
+            compiled = self._compile_command_rule(rule, order)
+            if compiled is None:
+                continue
+            if old is not None:
+                _detach(old)
+            else:
+                self._next_rule_order += 1
+            self._compiled_command_rules[rid] = compiled
+            _attach(compiled)
+
+        self._hit_counters.update_valid_rule_ids(kick_added, kick_removed)
+        if needs_full_chains:
+            # 没有群范围的规则属于全局规则链，所有群都需重建
+            self._build_rule_chains()
+        elif touched:
+            self._rebuild_group_chains(touched)
+        if self._metrics.enabled:
+            self._metrics.observe_stage("rebuild", time.perf_counter_ns() - started)
+
+    def _rebuild_group_chains(self, group_ids):
+        """只重建指定群的规则链，全局规则链及其组合正则保持不变。
+
+        判定缓存不清空：缓存键包含规则集版本号，旧版本的条目不会再命中，随 LRU 淘汰。
+        """
+        self._rule_set_version += 1
+        version = self._rule_set_version
+        disabled = self._regex_guard.disabled_rules
+        global_chain = self._global_chain
+        global_rules = global_chain.rules
+        global_matchers = global_chain.global_literal_matchers
+        global_program = global_chain.global_program
+        fused = self._performance_cfg["fused_regex"]
+        chunk_size = self._performance_cfg["fused_regex_chunk_size"]
+        prefilter = self._performance_cfg["regex_prefilter"]
+
+        chains = dict(self._chains_by_group)
+        removed_chains = []
+        added_chains = []
+        for gid in group_ids:
+            old_chain = chains.pop(gid, None)
+            if old_chain is not None:
+                removed_chains.append(old_chain)
+            group_rules = self._compiled_rules_by_group.get(gid)
+            if not group_rules:
+                continue
+            if disabled:
+                group_rules = [r for r in group_rules if r.rule_id not in disabled]
+            rules = merge_rule_chains(global_rules, group_rules)
+            chain = chains[gid] = RuleChain(
+                version,
+                rules,
+                global_literal_matchers=global_matchers,
+                group_literal_matchers=build_literal_matchers(group_rules, prefilter),
+                global_program=global_program,
+                group_program=build_regex_program(group_rules, chunk_size) if fused else None,
+                regex_prefilter=prefilter,
+            )
+            added_chains.append(chain)
+        self._chains_by_group = chains
+        self._window_scheduler.replace_chains(removed_chains, added_chains)
+
+    def _build_rule_chains(self):
+        """为每个群预先合并有序规则链并构建匹配器；未单独配置规则的群共享全局规则链。"""
+        self._rule_set_version += 1
+        version = self._rule_set_version
+        self._verdict_cache.clear()
+        global_rules = self._compiled_global_rules
+        rules_by_group = self._compiled_rules_by_group
+        disabled = self._regex_guard.disabled_rules
+        if disabled:
+            # 跳过超出正则时间预算而被自动停用的规则
+            global_rules = [r for r in global_rules if r.rule_id not in disabled]
+            rules_by_group = {
+                gid: [r for r in group_rules if r.rule_id not in disabled]
+                for gid, group_rules in rules_by_group.items()
+            }
+
+        # 可选：把每个群的正则合并为少量组合正则（全局规则单独成一个程序，供所有群共享）
+        fused = self._performance_cfg["fused_regex"]
+        chunk_size = self._performance_cfg["fused_regex_chunk_size"]
+        global_program = build_regex_program(global_rules, chunk_size) if fused else None
+        # 可选：正则的必需字面量并入纯文本自动机，字面量均未出现时跳过该规则的正则
+        prefilter = self._performance_cfg["regex_prefilter"]
+        # 全局规则的自动机同样只构建一次，各群规则链只为本群规则构建自动机
+        global_matchers = build_literal_matchers(global_rules, prefilter)
+
+        self._global_chain = RuleChain(
+            version,
+            list(global_rules),
+            global_literal_matchers=global_matchers,
+            global_program=global_program,
+            regex_prefilter=prefilter,
+        )
+        chains = {}
+        for gid, group_rules in rules_by_group.items():
+            rules = merge_rule_chains(global_rules, group_rules)
+            chains[gid] = RuleChain(
+                version,
+                rules,
+                global_literal_matchers=global_matchers,
+                group_literal_matchers=build_literal_matchers(group_rules, prefilter),
+                global_program=global_program,
+                group_program=build_regex_program(group_rules, chunk_size) if fused else None,
+                regex_prefilter=prefilter,
+            )
+        self._chains_by_group = chains
+        self._window_scheduler.rebuild([self._global_chain, *chains.values()])
+
+    def _get_rule_chain(self, group_id: str) -> RuleChain:
+        return self._chains_by_group.get(group_id, self._global_chain)
 
     def _is_command_allowed(self, event: AstrMessageEvent) -> bool:
         try:
@@ -242,181 +544,276 @@ class SentinelPlugin(Star):
         group_id = str(event.get_group_id())
         if group_id in self._group_blacklist_set:
             return
+        if self._rule_store.needs_hydrate(group_id):
+            await self._ensure_group_rules(group_id)
+
+        # 指标关闭时只多这一次判断
+        metrics = self._metrics if self._metrics.enabled else None
+        if metrics is not None:
+            metrics.counters["messages"] += 1
+            clock = time.perf_counter_ns
+            t0 = clock()
+
+        chain = self._get_rule_chain(group_id)
+        if not chain.active_rules:
+            if metrics is not None:
+                metrics.counters["skipped"] += 1
+            return
 
-        # 2. 构建待检测文本与类型
-        content_parts = [event.message_str]
+        # 2. 按规则链用到的特征构建待检测文本与类型
+        needs_text = chain.needs_text
+        needed_types = chain.needed_types
+        content_parts = [event.message_str] if needs_text else []
         msg_types = set()
 
-        messages = event.get_messages()
-        for msg_seg in messages:
-            seg_type = getattr(getattr(msg_seg, 'type', None), 'name', None)
-            if not seg_type:
-                seg_type = msg_seg.__class__.__name__
+        if needs_text or needed_types:
+            for msg_seg in event.get_messages():
+                seg_type = getattr(getattr(msg_seg, 'type', None), 'name', None)
+                if not seg_type:
+                    seg_type = msg_seg.__class__.__name__
 
-            if seg_type in ["Plain"]:
-                msg_types.add("文本")
-                continue
-            elif seg_type == "Image":
-                msg_types.add("图片")
-            elif seg_type in ["Record"]:
-                msg_types.add("语音")
-            elif seg_type == "Video":
-                msg_types.add("视频")
-            elif seg_type == "File":
-                msg_types.add("文件")
-            elif seg_type == "Face":
-                msg_types.add("表情")
-            elif seg_type == "Forward":
-                msg_types.add("转发消息")
-            elif seg_type == "Json":
-                msg_types.add("卡片/分享")
-                json_data = getattr(msg_seg, 'data', '{}')
-                descriptive_text = extract_json_descriptive_text(json_data)
-                if descriptive_text:
-                    content_parts.append(descriptive_text)
+                msg_type = SEGMENT_MSG_TYPES.get(seg_type)
+                if msg_type is None:
+                    continue
+                if msg_type in needed_types:
+                    msg_types.add(msg_type)
+                # 卡片描述文字仅在存在关键词规则时解析
+                if needs_text and seg_type == "Json":
+                    json_data = getattr(msg_seg, 'data', '{}')
+                    descriptive_text = extract_json_descriptive_text(json_data)
+                    if descriptive_text:
+                        content_parts.append(descriptive_text)
 
         message_to_check = " ".join(content_parts)
+        if metrics is not None:
+            t1 = clock()
+            metrics.observe_stage("extract", t1 - t0)
 
         # 3. 匹配规则
-        candidate_rules = self._get_candidate_rules_for_group(group_id)
-        for i, raw_rule in enumerate(candidate_rules):
-            rule = self._resolve_effective_rule(raw_rule)
+        matched_orders = None
+        if self._verdict_cache.maxsize > 0:
+            # 刷屏时同样的内容反复出现，内容匹配结果按文本缓存，发送者相关条件仍逐条判断
+            scope = group_id if chain is not self._global_chain else ""
+            cache_key = (chain.version, scope, hash(message_to_check), frozenset(msg_types))
+            matched_orders = self._verdict_cache.get(cache_key, message_to_check)
+            if metrics is not None:
+                t2 = clock()
+                metrics.observe_stage("select", t2 - t1)
+                t1 = t2
+            if matched_orders is None:
+                matched_orders = chain.match_orders(message_to_check, msg_types, metrics)
+                if chain.guarded_rules:
+                    matched_orders = await self._match_guarded_rules(
+                        chain, message_to_check, matched_orders, metrics
+                    )
+                self._verdict_cache.put(cache_key, message_to_check, matched_orders)
+            if not matched_orders:
+                if metrics is not None:
+                    metrics.observe_stage("match", clock() - t1)
+                return
 
-            if rule.get("_active_when_error"):
-                continue
-            if not is_in_active_when(rule.get("_active_when_spec") or {}):
+        match_memo = {}
+        matched_rule = None
+        # 生效时段由调度器在切换时刻预先筛选，这里只遍历当前生效的规则
+        for rule in chain.active_rules:
+            if matched_orders is not None and rule.order not in matched_orders:
                 continue
 
-            monitor_set = rule["_user_monitor_list_set"]
+            monitor_set = rule.user_monitor_list
             if monitor_set and user_id not in monitor_set:
                 continue
 
-            if user_id in rule["_user_whitelist_set"]:
+            if user_id in rule.user_whitelist:
                 continue
 
-            if rule.get("ignore_admin", False) and role == 'admin':
+            if rule.ignore_admin and role == 'admin':
                 continue
 
-            target_groups = rule["_groups_set"]
+            target_groups = rule.groups
             if target_groups and group_id not in target_groups:
                 continue
 
-            matched = False
-            if rule.get("keywords"):
-                for pattern in rule["_compiled_patterns"]:
-                    if isinstance(pattern, re.Pattern):
-                        if pattern.search(message_to_check):
-                            matched = True
-                            break
-                    elif isinstance(pattern, str):
-                        if pattern in message_to_check:
-                            matched = True
-                            break
-            elif rule.get("msg_types"):
-                rule_msg_types = rule["_msg_types_set"]
-                if rule_msg_types & msg_types:
-                    matched = True
-
+            if matched_orders is not None:
+                matched_rule = rule
+                break
+            if metrics is None:
+                matched = chain.rule_matches(rule, message_to_check, msg_types, match_memo)
+            else:
+                r0 = clock()
+                matched = chain.rule_matches(rule, message_to_check, msg_types, match_memo, metrics)
+                metrics.observe_rule(rule.rule_id, matched, clock() - r0)
+            if not matched and rule.guarded_patterns:
+                rule_text = chain.rule_text(rule, message_to_check, match_memo)
+                if chain.regex_may_match(rule, rule_text, match_memo, metrics):
+                    matched = await self._regex_guard.rule_matches(rule, rule_text)
             if matched:
-                rule_id = str(rule.get("_rule_id", i))
-                await self.execute_actions(event, rule, rule_id)
+                matched_rule = rule
                 break
 
-    async def execute_actions(self, event: AstrMessageEvent, rule: dict, rule_id: str):
+        if metrics is not None:
+            t2 = clock()
+            metrics.observe_stage("match", t2 - t1)
+        if matched_rule is None:
+            return
+
+        await self.execute_actions(event, matched_rule, matched_rule.rule_id)
+        if metrics is not None:
+            metrics.counters["matched"] += 1
+            metrics.observe_rule_hit(matched_rule.rule_id)
+            metrics.observe_stage("actions", clock() - t2)
+
+    async def _match_guarded_rules(self, chain: RuleChain, text: str, matched_orders, metrics=None):
+        """在隔离进程中补充判断慢正则规则，返回合并后的命中集合；必需字面量未出现的规则不发往隔离进程。"""
+        extra = []
+        memo = {}
+        for rule in chain.guarded_rules:
+            if rule.order in matched_orders:
+                continue
+            rule_text = chain.rule_text(rule, text, memo)
+            if not chain.regex_may_match(rule, rule_text, memo, metrics):
+                continue
+            if await self._regex_guard.rule_matches(rule, rule_text):
+                extra.append(rule.order)
+        return matched_orders.union(extra) if extra else matched_orders
+
+    async def execute_actions(self, event: AstrMessageEvent, rule: CompiledRule, rule_id: str):
         group_id = event.get_group_id()
         user_id = event.get_sender_id()
         message_id = event.message_obj.message_id
 
-        # 解析禁言时长
-        mute_duration_str = str(rule.get("mute_duration", "0")).strip()
-        duration = 0
-        try:
-            if "-" in mute_duration_str and not mute_duration_str.startswith("-"):
-                start, end = map(int, mute_duration_str.split("-"))
-                duration = random.randint(min(start, end), max(start, end))
-            else:
-                duration = int(float(mute_duration_str))
-        except (ValueError, TypeError):
-            logger.error(f"[Sentinel] 禁言时长格式错误: {mute_duration_str}")
+        # 禁言时长已在 _update_cache 中预解析
+        duration = pick_mute_duration(rule.mute_bounds)
+
+        # 刷屏合并：同一用户在 burst 窗口内的重复命中只撤回与计数，不重复禁言与回复
+        first_in_burst = self._mute_state.begin_hit(group_id, user_id, rule_id)
 
-        # 1. 撤回消息 (-1 表示不撤回也不禁言)
+        # 1. 撤回与禁言立即并发执行 (-1 表示不撤回也不禁言)
+        #    通知按实际执行的动作生成：仍在禁言期而跳过、或禁言失败时不报告“禁言Ns”
+        immediate = []
         if duration != -1:
-            try:
-                await event.bot.api.call_action("delete_msg", message_id=message_id)
-                logger.info(f"[Sentinel] 已撤回群 {group_id} 中用户 {user_id} 的违规消息 {message_id}")
-            except Exception as e:
-                logger.error(f"[Sentinel] 撤回消息失败: {e}。请确认 Bot 是否具有管理员权限。")
+            immediate.append(self._retract_message(event, group_id, user_id, message_id))
+        mute_skipped = duration > 0 and not self._mute_state.try_mute(group_id, user_id, duration)
+        if duration > 0 and not mute_skipped:
+            immediate.append(self._mute_user(event, group_id, user_id, duration))
+        applied = min(duration, 0)
+        if immediate:
+            results = await asyncio.gather(*immediate)
+            if duration > 0 and not mute_skipped and results[-1]:
+                applied = duration
+
+        if not first_in_burst:
+            logger.debug(f"[Sentinel] 用户 {user_id} 在群 {group_id} 连续命中规则 {rule_id}，已合并回复")
+
+        # 2. 回复与踢人计数交给后台队列；回复按原先的 0.5 秒延迟定时入队，踢出提示排在回复之后。
+        #    刷屏期间的每次命中仍计入踢出阈值，只是不再回复
+        reply = first_in_burst and bool(rule.reply_message)
+        if reply or rule.kick_threshold > 0:
+            delay = 0.5 if reply else 0
+            self._action_queue.submit_later(
+                delay,
+                lambda: self._reply_and_count_hit(event, rule, rule_id, reply),
+                f"reply/kick {group_id}:{user_id}",
+            )
 
-        # 2. 禁言逻辑
-        if duration > 0:
-            try:
-                await event.bot.api.call_action(
-                    "set_group_ban",
-                    group_id=int(group_id),
-                    user_id=int(user_id),
-                    duration=duration
-                )
-                logger.info(f"[Sentinel] 已禁言群 {group_id} 中用户 {user_id}，时长: {duration}秒")
-            except Exception as e:
-                logger.error(f"[Sentinel] 禁言失败: {e}。请确认 Bot 是否具有管理员权限。")
+        # 3. 通知交给后台队列
+        if rule.wants_notification:
+            await self._action_queue.submit(
+                lambda: self._notify_hit(event, rule, applied, mute_skipped),
+                f"notify {group_id}:{user_id}",
+            )
+
+    async def _retract_message(self, event: AstrMessageEvent, group_id, user_id, message_id):
+        try:
+            await self._action_scheduler.call(
+                event.bot, "delete_msg", {"message_id": message_id}, group=group_id
+            )
+            logger.info(f"[Sentinel] 已撤回群 {group_id} 中用户 {user_id} 的违规消息 {message_id}")
+        except Exception as e:
+            logger.error(f"[Sentinel] 撤回消息失败: {e}。请确认 Bot 是否具有管理员权限。")
+
+    async def _mute_user(self, event: AstrMessageEvent, group_id, user_id, duration: int) -> bool:
+        try:
+            await self._action_scheduler.call(
+                event.bot,
+                "set_group_ban",
+                {"group_id": int(group_id), "user_id": int(user_id), "duration": duration},
+                group=group_id,
+            )
+            logger.info(f"[Sentinel] 已禁言群 {group_id} 中用户 {user_id}，时长: {duration}秒")
+            return True
+        except Exception as e:
+            self._mute_state.clear_mute(group_id, user_id)
+            logger.error(f"[Sentinel] 禁言失败: {e}。请确认 Bot 是否具有管理员权限。")
+            return False
+
+    async def _reply_and_count_hit(self, event: AstrMessageEvent, rule: CompiledRule, rule_id: str, reply: bool = True):
+        group_id = event.get_group_id()
+        user_id = event.get_sender_id()
 
-        # 3. 发送回复
-        reply_messages = rule.get("reply_message", [])
-        if reply_messages:
+        # 发送回复
+        reply_messages = rule.reply_message
+        if reply and reply_messages:
             reply_text = random.choice(reply_messages)
             if reply_text:
                 reply_text = render_template_text(event, reply_text)
-                await asyncio.sleep(0.5)
-                await event.send(event.plain_result(reply_text))
+                # 同一用户排队中的回复合并为一条
+                await self._send_group_text(event, group_id, reply_text, merge_key=("reply", group_id, user_id))
 
-        # 4. 踢人与计数逻辑
-        kick_threshold = self._safe_int(rule.get("kick_threshold", 0), 0)
-        if kick_threshold > 0:
-            kv_key = f"hits:{group_id}:{user_id}:{rule_id}"
+        # 踢人与计数逻辑
+        kick_threshold = rule.kick_threshold
+        if kick_threshold <= 0:
+            return
+        current_hits = await self._hit_counters.increment(group_id, user_id, rule_id)
+
+        if current_hits >= kick_threshold:
             try:
-                data = await self.get_kv_data(kv_key, 0)
-                current_hits = int(data)
-            except (ValueError, TypeError):
-                current_hits = 0
-
-            current_hits += 1
-
-            if current_hits >= kick_threshold:
-                try:
-                    await event.bot.api.call_action(
-                        "set_group_kick",
-                        group_id=int(group_id),
-                        user_id=int(user_id),
-                        reject_add_request=False
-                    )
-                    logger.info(
-                        f"[Sentinel] 用户 {user_id} 在群 {group_id} 命中规则 {rule_id} 达到阈值 {kick_threshold}，已踢出。"
-                    )
+                await self._action_scheduler.call(
+                    event.bot,
+                    "set_group_kick",
+                    {"group_id": int(group_id), "user_id": int(user_id), "reject_add_request": False},
+                    group=group_id,
+                )
+                logger.info(
+                    f"[Sentinel] 用户 {user_id} 在群 {group_id} 命中规则 {rule_id} 达到阈值 {kick_threshold}，已踢出。"
+                )
 
-                    kick_messages = rule.get("kick_message", [])
-                    if kick_messages:
-                        kick_text = random.choice(kick_messages)
-                        if kick_text:
-                            kick_text = render_template_text(event, kick_text)
-                            await event.send(event.plain_result(kick_text))
+                kick_messages = rule.kick_message
+                if kick_messages:
+                    kick_text = random.choice(kick_messages)
+                    if kick_text:
+                        kick_text = render_template_text(event, kick_text)
+                        await self._send_group_text(event, group_id, kick_text)
 
-                    await self.delete_kv_data(kv_key)
-                except Exception as e:
-                    logger.error(f"[Sentinel] 踢人失败: {e}。请确认 Bot 是否具有管理员权限。")
-            else:
-                await self.put_kv_data(kv_key, current_hits)
-                logger.debug(
-                    f"[Sentinel] 用户 {user_id} 命中规则 {rule_id}，当前累计次数: {current_hits}/{kick_threshold}"
-                )
+                await self._hit_counters.reset(group_id, user_id, rule_id)
+            except Exception as e:
+                logger.error(f"[Sentinel] 踢人失败: {e}。请确认 Bot 是否具有管理员权限。")
+        else:
+            logger.debug(
+                f"[Sentinel] 用户 {user_id} 命中规则 {rule_id}，当前累计次数: {current_hits}/{kick_threshold}"
+            )
 
+    async def _send_group_text(self, event: AstrMessageEvent, group_id, text: str, merge_key=None):
+        await self._action_scheduler.call(
+            event.bot,
+            "send_group_msg",
+            {"group_id": int(group_id), "message": text, "auto_escape": True},
+            group=group_id,
+            merge_key=merge_key,
+        )
+
+    async def _notify_hit(self, event: AstrMessageEvent, rule: CompiledRule, duration: int, mute_skipped: bool = False):
         self._warned_no_admin_targets = await notify_for_hit(
             event,
             rule,
             duration,
+            mute_skipped=mute_skipped,
             context=self.context,
             safe_int=self._safe_int,
             warned_no_admin_targets=self._warned_no_admin_targets,
             logger=logger,
+            admin_cache=self._admin_cache,
+            digest=self._notify_digest if self._notify_digest_cfg["enable"] else None,
+            fanout=self._notify_fanout,
         )
 
     @filter.command("监控")
@@ -433,51 +830,184 @@ class SentinelPlugin(Star):
             yield event.plain_result("❌ 请在群聊中使用该命令。")
             return
 
-        keyword = extract_command_keyword(event)
-        if not keyword:
-            yield event.plain_result("❌ 用法：/监控 <关键词> [@某人 ...]")
+        keywords = extract_command_keywords(event)
+        if not keywords:
+            yield event.plain_result("❌ 用法：/监控 <关键词> [关键词 ...] [@某人 ...]")
             return
-        if keyword.isdigit():
+        if len(keywords) == 1 and keywords[0].isdigit():
             yield event.plain_result(
                 "❌ 指令添加不允许纯数字关键词；如需纯数字关键词，请在配置页面添加。"
             )
             return
 
         target_user_ids = extract_at_user_ids(event)
-        target_set = set(target_user_ids)
+        target_desc = "全体成员" if not target_user_ids else ", ".join(target_user_ids)
+
+        await self._ensure_group_rules(group_id)
+        results = await self._add_command_rules(
+            group_id, [(keyword, target_user_ids) for keyword in keywords], str(event.get_sender_id())
+        )
+
+        if len(keywords) == 1:
+            new_rule, _ = results[0]
+            if new_rule is None:
+                yield event.plain_result("ℹ️ 已存在相同监控规则。")
+                return
+            yield event.plain_result(
+                f"✅ 已添加监控规则\n规则ID: {new_rule['rule_id']}\n关键词: {keywords[0]}\n目标用户: {target_desc}\n群号: {group_id}"
+            )
+            return
+
+        added = sum(1 for rule, _ in results if rule is not None)
+        problems = [f"{keyword}: {reason}" for keyword, (rule, reason) in zip(keywords, results) if rule is None]
+        lines = [
+            f"✅ 已添加 {added} 条监控规则，跳过 {len(problems)} 条",
+            f"目标用户: {target_desc}",
+            f"群号: {group_id}",
+        ]
+        yield event.plain_result("\n".join(lines + self._format_bulk_details(results, problems)))
+
+    async def _add_command_rules(self, group_id: str, items, creator: str):
+        """批量新增指令规则：整批在一次加锁中查重，只写一次变更日志、只局部重建一次规则缓存。
 
-        duplicate_exists = False
+        ``items`` 为 ``[(关键词, 目标用户列表)]``，返回一一对应的 ``[(新规则或 None, 跳过原因)]``。
+        """
+        results = []
+        new_rules = []
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         async with self._command_rules_lock:
-            for existing in self._command_rules:
-                ex_keywords = [str(k) for k in existing.get("keywords", [])]
-                ex_groups = {str(g) for g in existing.get("groups", [])}
-                ex_monitors = {str(u) for u in existing.get("rule_user_monitor_list", [])}
-                if keyword in ex_keywords and group_id in ex_groups and ex_monitors == target_set:
-                    duplicate_exists = True
-                    break
-
-            if not duplicate_exists:
+            next_id = int(self._next_command_rule_id())
+            seen = set()
+            for keyword, target_user_ids in items:
+                target_set = frozenset(target_user_ids)
+                if keyword.isdigit():
+                    results.append((None, "不允许纯数字关键词"))
+                    continue
+                if (keyword, target_set) in seen or any(
+                    {str(u) for u in existing.get("rule_user_monitor_list", [])} == target_set
+                    for existing in self._command_rules.with_keyword(group_id, keyword)
+                ):
+                    results.append((None, "已存在相同监控规则"))
+                    continue
+                seen.add((keyword, target_set))
                 new_rule = {
-                    "rule_id": self._next_command_rule_id(),
+                    "rule_id": str(next_id),
                     "keywords": [keyword],
                     "groups": [group_id],
-                    "rule_user_monitor_list": target_user_ids,
+                    "rule_user_monitor_list": list(target_user_ids),
                     "rule_user_whitelist": [],
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "created_by": str(event.get_sender_id()),
+                    "created_at": created_at,
+                    "created_by": creator,
                 }
-                self._command_rules.append(new_rule)
-                await self._save_command_rules()
-                self._update_cache()
+                next_id += 1
+                new_rules.append(new_rule)
+                results.append((new_rule, ""))
+            if new_rules:
+                await self._commit_command_rule_changes(upserts=new_rules)
+        return results
+
+    @filter.command("监控导入")
+    async def import_monitor_by_command(self, event: AstrMessageEvent):
+        """从文本文件或指令后的多行文本批量导入指令规则。
+        用法: /监控导入 （附带 .txt 文件，或换行后逐行填写：关键词 [@QQ号 ...]）
+        """
+        if not self._is_command_allowed(event):
+            yield event.plain_result("❌ 仅管理员或指令白名单用户可使用该命令。")
+            return
 
-        if duplicate_exists:
-            yield event.plain_result("ℹ️ 已存在相同监控规则。")
+        group_id = str(event.get_group_id() or "").strip()
+        if not group_id:
+            yield event.plain_result("❌ 请在群聊中使用该命令。")
             return
 
-        target_desc = "全体成员" if not target_user_ids else ", ".join(target_user_ids)
-        yield event.plain_result(
-            f"✅ 已添加监控规则\n规则ID: {new_rule['rule_id']}\n关键词: {keyword}\n目标用户: {target_desc}\n群号: {group_id}"
+        text, error = await self._read_import_text(event)
+        if error:
+            yield event.plain_result(error)
+            return
+        items, errors = parse_rule_import_text(text)
+        if not items and not errors:
+            yield event.plain_result("❌ 用法：/监控导入 并附带文本文件，或换行后逐行填写：关键词 [@QQ号 ...]")
+            return
+        if len(items) > self.IMPORT_MAX_RULES:
+            yield event.plain_result(f"❌ 单次最多导入 {self.IMPORT_MAX_RULES} 条规则，当前 {len(items)} 条。")
+            return
+
+        await self._ensure_group_rules(group_id)
+        results = await self._add_command_rules(
+            group_id, [(keyword, targets) for _, keyword, targets in items], str(event.get_sender_id())
+        )
+
+        added = sum(1 for rule, _ in results if rule is not None)
+        problems = [f"第 {line_no} 行: {reason}" for line_no, reason in errors]
+        problems.extend(
+            f"第 {line_no} 行 {keyword}: {reason}"
+            for (line_no, keyword, _), (rule, reason) in zip(items, results)
+            if rule is None
         )
+        lines = [f"✅ 导入完成：新增 {added} 条，跳过 {len(problems)} 条（群号: {group_id}）"]
+        yield event.plain_result("\n".join(lines + self._format_bulk_details(results, problems)))
+
+    def _format_bulk_details(self, results, problems: List[str]) -> List[str]:
+        """批量新增结果的明细：新规则 ID 范围（批内 ID 连续分配）与逐条跳过原因。"""
+        lines = []
+        added_ids = [rule["rule_id"] for rule, _ in results if rule is not None]
+        if added_ids:
+            lines.append(f"规则ID: {added_ids[0]}" if len(added_ids) == 1 else f"规则ID: {added_ids[0]} ~ {added_ids[-1]}")
+        lines.extend(f"- {item}" for item in problems[: self.IMPORT_REPORT_LIMIT])
+        if len(problems) > self.IMPORT_REPORT_LIMIT:
+            lines.append(f"……其余 {len(problems) - self.IMPORT_REPORT_LIMIT} 条未列出")
+        return lines
+
+    async def _read_import_text(self, event: AstrMessageEvent):
+        """读取导入内容：优先使用消息中的文件，否则使用指令之后的文本。返回 (文本, 错误提示)。"""
+        for seg in event.get_messages() or []:
+            seg_type = getattr(getattr(seg, "type", None), "name", None) or seg.__class__.__name__
+            if seg_type != "File":
+                continue
+            try:
+                path = await seg.get_file()
+                if os.path.getsize(path) > self.IMPORT_MAX_BYTES:
+                    return "", f"❌ 导入文件不能超过 {self.IMPORT_MAX_BYTES // 1024} KB。"
+                with open(path, "rb") as f:
+                    return f.read().decode("utf-8-sig"), ""
+            except Exception as e:
+                logger.error(f"[Sentinel] 读取导入文件失败: {e}")
+                return "", "❌ 读取导入文件失败，请确认文件为 UTF-8 编码的文本文件。"
+
+        parts = (event.message_str or "").strip().split(None, 1)
+        return (parts[1] if len(parts) > 1 else ""), ""
+
+    @filter.command("监控导出")
+    async def export_monitor_by_command(self, event: AstrMessageEvent):
+        """把当前群的指令规则导出为可再导入的文本文件。"""
+        if not self._is_command_allowed(event):
+            yield event.plain_result("❌ 仅管理员或指令白名单用户可使用该命令。")
+            return
+
+        group_id = str(event.get_group_id() or "").strip()
+        if not group_id:
+            yield event.plain_result("❌ 请在群聊中使用该命令。")
+            return
+
+        await self._ensure_group_rules(group_id)
+        async with self._command_rules_lock:
+            group_rules = self._command_rules.in_group(group_id)
+        if not group_rules:
+            yield event.plain_result("ℹ️ 当前群暂无通过指令添加的监控规则。")
+            return
+
+        text = format_rule_export_text(group_id, group_rules)
+        file_name = f"sentinel_rules_{group_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
+        try:
+            # 每个群固定一个导出文件，每次导出覆盖写入，数据目录不随导出次数增长；发送时仍使用带时间戳的文件名
+            path = StarTools.get_data_dir() / f"sentinel_rules_{group_id}.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            logger.error(f"[Sentinel] 写入导出文件失败: {e}")
+            yield event.plain_result("❌ 写入导出文件失败，请查看日志。")
+            return
+        yield event.chain_result([File(name=file_name, file=str(path))])
 
     @filter.command("取消监控")
     async def remove_monitor_by_command(self, event: AstrMessageEvent):
@@ -500,30 +1030,16 @@ class SentinelPlugin(Star):
         if not arg and not at_user_ids:
             yield event.plain_result("❌ 用法：/取消监控 <rule_id> 或 /取消监控 [关键词] @某人")
             return
+        await self._ensure_group_rules(group_id)
 
         # 1) 按 rule_id 删除（优先）
         if arg:
             removed_by_id = None
             async with self._command_rules_lock:
-                group_rule_ids = {
-                    str(r.get("rule_id", "")).strip()
-                    for r in self._command_rules
-                    if group_id in {str(g) for g in r.get("groups", [])}
-                }
-                if arg in group_rule_ids:
-                    retained = []
-                    removed = 0
-                    for rule in self._command_rules:
-                        rid = str(rule.get("rule_id", "")).strip()
-                        groups = {str(g) for g in rule.get("groups", [])}
-                        if rid == arg and group_id in groups:
-                            removed += 1
-                            continue
-                        retained.append(rule)
-                    self._command_rules = retained
-                    await self._save_command_rules()
-                    self._update_cache()
-                    removed_by_id = removed
+                rule = self._command_rules.get(arg)
+                if rule is not None and group_id in {str(g) for g in rule.get("groups", [])}:
+                    await self._commit_command_rule_changes(removed_ids=[arg])
+                    removed_by_id = 1
             if removed_by_id is not None:
                 yield event.plain_result(f"✅ 已按规则ID删除 {removed_by_id} 条监控规则。")
                 return
@@ -531,43 +1047,14 @@ class SentinelPlugin(Star):
         # 2) 只 @ 用户：仅移除目标用户的监控，不影响同规则中的其他对象
         user_only_mode = bool(at_user_ids) and (not arg or arg.startswith("@") or "[CQ:at" in arg)
         if user_only_mode:
-            targets = set(at_user_ids)
-            changed = 0
-            removed = 0
             async with self._command_rules_lock:
-                retained = []
-                for rule in self._command_rules:
-                    groups = {str(g) for g in rule.get("groups", [])}
-                    if group_id not in groups:
-                        retained.append(rule)
-                        continue
-
-                    monitor_list = [str(u) for u in rule.get("rule_user_monitor_list", [])]
-                    monitor_set = set(monitor_list)
-
-                    # 仅处理指定监控用户的规则；全群规则不受影响
-                    if monitor_set:
-                        if not (monitor_set & targets):
-                            retained.append(rule)
-                            continue
-                        new_monitor_list = [u for u in monitor_list if u not in targets]
-                        if not new_monitor_list:
-                            removed += 1
-                            continue
-                        if len(new_monitor_list) != len(monitor_list):
-                            rule = rule.copy()
-                            rule["rule_user_monitor_list"] = new_monitor_list
-                            changed += 1
-                        retained.append(rule)
-                        continue
-
-                    # 全群规则：平行存在，不参与“只 @ 用户”删除
-                    retained.append(rule)
-
-                if changed != 0 or removed != 0:
-                    self._command_rules = retained
-                    await self._save_command_rules()
-                    self._update_cache()
+                # 全群规则的监控列表为空，不会出现在用户索引中，因此不参与“只 @ 用户”删除
+                candidates = self._command_rules.monitoring(group_id, at_user_ids)
+                upserts, removed_ids = self._strip_monitor_targets(candidates, set(at_user_ids))
+                changed = len(upserts)
+                removed = len(removed_ids)
+                if upserts or removed_ids:
+                    await self._commit_command_rule_changes(upserts, removed_ids)
             if changed == 0 and removed == 0:
                 yield event.plain_result("ℹ️ 未找到与该用户相关的监控规则。")
                 return
@@ -582,46 +1069,18 @@ class SentinelPlugin(Star):
         # 3) 关键词 + 可选 @ 用户
         keyword = arg
         targets = set(at_user_ids)
-        removed = 0
-        changed = 0
         async with self._command_rules_lock:
-            retained = []
-            for rule in self._command_rules:
-                rule_keywords = [str(k) for k in rule.get("keywords", [])]
-                groups = {str(g) for g in rule.get("groups", [])}
-
-                if keyword in rule_keywords and group_id in groups:
-                    # 带 @ 时：仅移除目标用户，不影响同规则中的其他对象，也不影响全群规则
-                    if targets:
-                        monitor_list = [str(u) for u in rule.get("rule_user_monitor_list", [])]
-                        monitors = set(monitor_list)
-                        if not monitors:
-                            retained.append(rule)
-                            continue
-                        if not (monitors & targets):
-                            retained.append(rule)
-                            continue
-
-                        new_monitor_list = [u for u in monitor_list if u not in targets]
-                        if not new_monitor_list:
-                            removed += 1
-                            continue
-                        if len(new_monitor_list) != len(monitor_list):
-                            rule = rule.copy()
-                            rule["rule_user_monitor_list"] = new_monitor_list
-                            changed += 1
-                        retained.append(rule)
-                        continue
-
-                    # 不带 @ 时：按关键词删除匹配规则
-                    removed += 1
-                    continue
-                retained.append(rule)
-
-            if removed > 0 or changed > 0:
-                self._command_rules = retained
-                await self._save_command_rules()
-                self._update_cache()
+            candidates = self._command_rules.with_keyword(group_id, keyword)
+            if targets:
+                # 带 @ 时：仅移除目标用户，不影响同规则中的其他对象，也不影响全群规则
+                upserts, removed_ids = self._strip_monitor_targets(candidates, targets)
+            else:
+                # 不带 @ 时：按关键词删除匹配规则
+                upserts, removed_ids = [], [str(r.get("rule_id", "")).strip() for r in candidates]
+            changed = len(upserts)
+            removed = len(removed_ids)
+            if upserts or removed_ids:
+                await self._commit_command_rule_changes(upserts, removed_ids)
 
         if removed == 0 and changed == 0:
             yield event.plain_result("ℹ️ 未找到匹配的指令监控规则。")
@@ -639,6 +1098,24 @@ class SentinelPlugin(Star):
         yield event.plain_result(f"✅ 已删除 {removed} 条匹配监控规则。")
         return
 
+    @staticmethod
+    def _strip_monitor_targets(rules: List[dict], targets: set):
+        """从规则的监控列表中移除目标用户，返回 (更新后的规则副本, 监控列表清空而需删除的规则 ID)。"""
+        upserts = []
+        removed_ids = []
+        for rule in rules:
+            monitor_list = [str(u) for u in rule.get("rule_user_monitor_list", [])]
+            if not monitor_list or not (set(monitor_list) & targets):
+                continue
+            new_monitor_list = [u for u in monitor_list if u not in targets]
+            if not new_monitor_list:
+                removed_ids.append(str(rule.get("rule_id", "")).strip())
+                continue
+            rule = rule.copy()
+            rule["rule_user_monitor_list"] = new_monitor_list
+            upserts.append(rule)
+        return upserts, removed_ids
+
     @filter.command("监控列表")
     async def list_monitor_by_command(self, event: AstrMessageEvent):
         """查看当前群通过指令创建的监控规则列表。"""
@@ -651,12 +1128,9 @@ class SentinelPlugin(Star):
             yield event.plain_result("❌ 请在群聊中使用该命令。")
             return
 
+        await self._ensure_group_rules(group_id)
         async with self._command_rules_lock:
-            group_rules = []
-            for rule in self._command_rules:
-                groups = {str(g) for g in rule.get("groups", [])}
-                if group_id in groups:
-                    group_rules.append(rule)
+            group_rules = self._command_rules.in_group(group_id)
 
         if not group_rules:
             yield event.plain_result("ℹ️ 当前群暂无通过指令添加的监控规则。")
@@ -681,5 +1155,92 @@ class SentinelPlugin(Star):
             lines.pop()
         yield event.plain_result("\n".join(lines))
 
+    @filter.command("哨兵状态")
+    async def show_status_by_command(self, event: AstrMessageEvent):
+        """查看插件运行状态与性能指标。"""
+        if not self._is_command_allowed(event):
+            yield event.plain_result("❌ 仅管理员或指令白名单用户可使用该命令。")
+            return
+
+        cache_stats = self._verdict_cache.stats
+        queue_stats = self._action_queue.stats
+        sched_stats = self._action_scheduler.stats
+        lines = [
+            "📊 群哨兵运行状态",
+            f"规则: 全局 {len(self._compiled_global_rules)} 条, 独立规则链 {len(self._chains_by_group)} 个群, 版本 {self._rule_set_version}",
+            f"指令规则: 已载入 {len(self._command_rules)} 条, 待载入 {len(self._rule_store.pending_groups)} 个群, "
+            f"未压实日志 {self._rule_store.journal_length} 条",
+            f"内容缓存: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}, 当前 {len(self._verdict_cache)} 条",
+            f"后台队列: 排队 {self._action_queue.depth()}, 完成 {queue_stats['completed']}, "
+            f"失败 {queue_stats['failed']}, 丢弃 {queue_stats['dropped']}",
+            f"动作调度: 排队 {self._action_scheduler.pending()}, 已发出 {sched_stats['dispatched']}, "
+            f"合并 {sched_stats['merged']}, 限速等待 {sched_stats['throttled']}",
+        ]
+        regex_rules, prefiltered = self._regex_prefilter_coverage()
+        if regex_rules:
+            state = "已开启" if self._performance_cfg["regex_prefilter"] else "未开启"
+            lines.append(f"正则预过滤: {state}, 正则规则 {regex_rules} 条, 可预过滤 {prefiltered} 条")
+        if self._metrics.enabled:
+            lines.extend(self._metrics.format_status())
+        else:
+            lines.append("ℹ️ 详细指标未开启，可在配置 metrics.enable 中开启。")
+        yield event.plain_result("\n".join(lines))
+
+    def _regex_prefilter_coverage(self) -> Tuple[int, int]:
+        """返回 (含正则的规则数, 可提取必需字面量的规则数)。"""
+        rules = {rule.rule_id: rule for rule in self._compiled_global_rules}
+        for group_rules in self._compiled_rules_by_group.values():
+            rules.update((rule.rule_id, rule) for rule in group_rules)
+        regex_rules = [
+            rule for rule in rules.values() if rule.regex_patterns or rule.linear_patterns or rule.guarded_patterns
+        ]
+        return len(regex_rules), sum(1 for rule in regex_rules if rule.regex_literals is not None)
+
+    def _metrics_gauges(self) -> Dict[str, float]:
+        return {
+            "rule_set_version": self._rule_set_version,
+            "verdict_cache_entries": len(self._verdict_cache),
+            "verdict_cache_hits": self._verdict_cache.stats["hits"],
+            "verdict_cache_misses": self._verdict_cache.stats["misses"],
+            "action_queue_depth": self._action_queue.depth(),
+            "action_queue_dropped": self._action_queue.stats["dropped"],
+            "action_scheduler_pending": self._action_scheduler.pending(),
+            "command_rules_loaded": len(self._command_rules),
+            "command_rule_journal_length": self._rule_store.journal_length,
+        }
+
+    @filter.platform_adapter_type(filter.PlatformAdapterType.AIOCQHTTP)
+    @filter.event_message_type(filter.EventMessageType.ALL)
+    async def on_notice(self, event: AstrMessageEvent):
+        """处理 OneBot 通知事件，维护插件内的缓存状态。"""
+        raw_message = event.message_obj.raw_message
+        if not isinstance(raw_message, dict) or raw_message.get("post_type") != "notice":
+            return
+
+        notice_type = raw_message.get("notice_type")
+        group_id = str(raw_message.get("group_id", ""))
+        user_id = str(raw_message.get("user_id", ""))
+        if notice_type == "group_admin":
+            # 管理员变动后重新拉取该群管理员列表
+            self._admin_cache.invalidate_group(group_id)
+        elif notice_type == "group_ban":
+            # 同步他人操作的禁言/解禁；user_id 为 0 表示全员禁言，忽略
+            if user_id and user_id != "0":
+                duration = 0 if raw_message.get("sub_type") == "lift_ban" else self._safe_int(raw_message.get("duration", 0), 0)
+                self._mute_state.mark_muted(group_id, user_id, duration)
+        elif notice_type == "group_decrease":
+            # 成员退群/被踢后不再保留其命中计数
+            self._hit_counters.forget_user(group_id, user_id)
+            self._mute_state.forget_user(group_id, user_id)
+            if self._admin_cache.is_group_admin(group_id, user_id):
+                self._admin_cache.invalidate_group(group_id)
+
     async def terminate(self):
-        pass
+        await self._action_queue.stop()
+        await self._window_scheduler.stop()
+        await self._hit_counters.stop()
+        await self._rule_store.stop()
+        await self._notify_digest.stop()
+        await self._action_scheduler.stop()
+        await self._metrics.stop()
+        await self._regex_guard.close()
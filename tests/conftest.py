@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 插件目录不是可安装的包，测试直接从仓库根目录导入 utils
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
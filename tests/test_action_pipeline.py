@@ -0,0 +1,46 @@
+import asyncio
+import gc
+
+from utils.action_pipeline import BackgroundActionQueue
+
+
+def test_submit_later_keeps_task_reference_until_done():
+    async def run():
+        queue = BackgroundActionQueue(workers=1)
+        queue.start()
+        ran = []
+
+        async def job():
+            ran.append(True)
+
+        queue.submit_later(0, job, "job")
+        await asyncio.sleep(0.01)
+        gc.collect()
+        pending = len(queue._tasks)
+        await queue.stop()
+        return ran, pending
+
+    ran, pending = asyncio.run(run())
+    assert ran == [True]
+    assert pending == 0
+
+
+def test_stop_cancels_pending_delayed_tasks():
+    async def run():
+        queue = BackgroundActionQueue()
+        ran = []
+
+        async def job():
+            ran.append(True)
+
+        # 未启动时延迟任务以协程内联等待
+        queue.submit_later(10, job, "job")
+        await asyncio.sleep(0)
+        tracked = len(queue._tasks)
+        await queue.stop()
+        return ran, tracked, len(queue._tasks)
+
+    ran, tracked, remaining = asyncio.run(run())
+    assert tracked == 1
+    assert remaining == 0
+    assert ran == []
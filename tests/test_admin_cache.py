@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import types
+
+from utils.admin_cache import AdminTargetCache
+
+logger = logging.getLogger("test")
+
+
+def _event(group_id, api):
+    return types.SimpleNamespace(
+        get_group_id=lambda: group_id,
+        get_self_id=lambda: "999",
+        bot=types.SimpleNamespace(api=api),
+    )
+
+
+class _Api:
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = 0
+
+    async def call_action(self, action, **params):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return [{"user_id": 1, "role": "owner"}]
+
+
+def test_epochs_do_not_grow_with_invalidated_groups():
+    async def run():
+        cache = AdminTargetCache(ttl=600)
+        api = _Api()
+        for i in range(100):
+            await cache.get_group_admins(_event(str(i), api), logger)
+            cache.invalidate_group(i)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache._epochs == {}
+    assert cache._group_admins == {}
+
+
+def test_invalidation_during_fetch_discards_stale_result():
+    async def run():
+        cache = AdminTargetCache(ttl=600)
+        gate = asyncio.Event()
+        api = _Api(gate)
+        pending = asyncio.ensure_future(cache.get_group_admins(_event("100", api), logger))
+        while not api.calls:
+            await asyncio.sleep(0)
+        cache.invalidate_group("100")
+        gate.set()
+        admins = await pending
+        return cache, admins
+
+    cache, admins = asyncio.run(run())
+    assert admins == {"1"}
+    assert "100" not in cache._group_admins
+    assert cache._epochs == {}
+
+
+def test_expired_entry_is_dropped_and_refetched():
+    async def run():
+        cache = AdminTargetCache(ttl=600)
+        api = _Api()
+        event = _event("100", api)
+        await cache.get_group_admins(event, logger)
+        expires, admins = cache._group_admins["100"]
+        cache._group_admins["100"] = (0, admins)
+        await cache.get_group_admins(event, logger)
+        return cache, api.calls
+
+    cache, calls = asyncio.run(run())
+    assert calls == 2
+    assert cache._group_admins["100"][0] > 0
+    assert cache._epochs == {}
@@ -0,0 +1,64 @@
+import asyncio
+
+from utils.hit_counter import HitCounterStore
+from utils.rule_store import CommandRuleStore
+
+
+class _MemoryKV:
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+
+    async def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    async def put(self, key, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_sweep_removes_counters_of_deleted_rules():
+    async def run():
+        kv = _MemoryKV({HitCounterStore.STORE_KEY: {"100:u1:1": 2, "100:u1:2": 1}})
+        counters = HitCounterStore(kv.get, kv.put, kv.delete)
+        await counters.load()
+        counters.set_valid_rule_ids(["1"])
+        return counters.sweep(), dict(counters._counts)
+
+    removed, counts = asyncio.run(run())
+    assert removed == 1
+    assert counts == {"100:u1:1": 2}
+
+
+def test_sweep_keeps_counters_of_groups_not_yet_hydrated():
+    """按需载入时，未载入分片的群的指令规则计数不能被当作失效规则清理。"""
+
+    async def run():
+        kv = _MemoryKV(
+            {
+                CommandRuleStore.LEGACY_KEY: [
+                    {"rule_id": "1", "keywords": ["a"], "groups": ["100"], "kick_threshold": 3},
+                    {"rule_id": "2", "keywords": ["b"], "groups": ["200"], "kick_threshold": 3},
+                ],
+                HitCounterStore.STORE_KEY: {"100:u1:1": 2, "200:u2:2": 1, "200:u2:9": 1},
+            }
+        )
+        store = CommandRuleStore(kv.get, kv.put, kv.delete)
+        await store.load()
+        counters = HitCounterStore(kv.get, kv.put, kv.delete, pending_groups=lambda: store.pending_groups)
+        await counters.load()
+        # 与 lazy_rule_loading 相同：启动时只知道已载入群的规则
+        counters.set_valid_rule_ids([])
+        before = counters.sweep()
+
+        # 群 200 载入后，其中已删除规则（9）的计数才会被清理
+        rules = await store.hydrate("200")
+        counters.update_valid_rule_ids(added=[rule["rule_id"] for rule in rules])
+        after = counters.sweep()
+        return before, after, dict(counters._counts)
+
+    before, after, counts = asyncio.run(run())
+    assert before == 0
+    assert after == 1
+    assert counts == {"100:u1:1": 2, "200:u2:2": 1}
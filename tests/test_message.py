@@ -0,0 +1,61 @@
+import json
+import types
+
+from utils.message import JSON_MAX_PAYLOAD_CHARS, build_hit_record, extract_json_descriptive_text
+
+
+def _card(extra_items: int) -> str:
+    return json.dumps(
+        {
+            "app": "com.tencent.miniapp",
+            "prompt": "[分享]代刷\"会员\"",
+            "meta": {"news": {"title": "加微信领福利", "jumpUrl": "https://example.com/a", "desc": "12345"}},
+            "extra": {"items": ["x" * 32] * extra_items},
+        },
+        ensure_ascii=False,
+    )
+
+
+def test_small_payload_is_parsed():
+    text = extract_json_descriptive_text(_card(1))
+    assert text == "[分享]代刷\"会员\" 加微信领福利"
+
+
+def test_oversized_payload_returns_descriptive_fields_not_raw_json():
+    payload = _card(JSON_MAX_PAYLOAD_CHARS // 32 + 10)
+    assert len(payload) > JSON_MAX_PAYLOAD_CHARS
+
+    text = extract_json_descriptive_text(payload)
+    assert text == "[分享]代刷\"会员\" 加微信领福利"
+    assert "com.tencent.miniapp" not in text
+    assert "xxxx" not in text
+
+
+def test_oversized_payload_output_is_bounded():
+    payload = json.dumps({"items": [{"desc": f"第{i}条" + "文" * 200} for i in range(2000)]}, ensure_ascii=False)
+    assert len(payload) > JSON_MAX_PAYLOAD_CHARS
+
+    text = extract_json_descriptive_text(payload)
+    assert text.startswith("第0条")
+    assert len(text) <= JSON_MAX_PAYLOAD_CHARS + 2000
+
+
+def test_oversized_payload_without_descriptive_fields_is_empty():
+    payload = json.dumps({"data": "y" * (JSON_MAX_PAYLOAD_CHARS + 1)})
+    assert extract_json_descriptive_text(payload) == ""
+
+
+def _hit_actions(duration, mute_skipped=False):
+    event = types.SimpleNamespace(
+        get_group_id=lambda: "100", get_sender_id=lambda: "555", get_sender_name=lambda: "nm"
+    )
+    rule = types.SimpleNamespace(keywords=["spam"], msg_types=[], kick_threshold=0, rule_id="cfg:0")
+    return build_hit_record(event, rule, duration, lambda v, d: int(v or d), mute_skipped)["actions"]
+
+
+def test_hit_record_reports_the_mute_that_actually_ran():
+    assert _hit_actions(60) == "撤回 / 禁言60s"
+    # 刷屏合并时用户仍在禁言期内，本次未调用禁言接口
+    assert _hit_actions(0, mute_skipped=True) == "撤回 / 禁言中（未重复禁言）"
+    # 禁言失败时只报告撤回
+    assert _hit_actions(0) == "撤回"
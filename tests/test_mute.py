@@ -0,0 +1,54 @@
+import asyncio
+
+from utils.hit_counter import HitCounterStore
+from utils.mute import MuteStateTracker
+
+
+class _MemoryKV:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    async def put(self, key, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_burst_window_does_not_slide():
+    tracker = MuteStateTracker(burst_window=10)
+    starts = [tracker.begin_hit("100", "u1", "r1", now=t * 9.0) for t in range(7)]
+    # 窗口从首次命中起固定 10 秒：0、18、36、54 秒处各开启一轮
+    assert starts == [True, False, True, False, True, False, True]
+
+
+def test_burst_window_disabled():
+    tracker = MuteStateTracker(burst_window=0)
+    assert all(tracker.begin_hit("100", "u1", "r1", now=float(t)) for t in range(5))
+
+
+def test_steady_spammer_reaches_kick_threshold():
+    """与 execute_actions 相同的处理：每次命中都计数，只有每轮首次命中才回复。"""
+
+    async def run():
+        kv = _MemoryKV()
+        counters = HitCounterStore(kv.get, kv.put, kv.delete)
+        tracker = MuteStateTracker(burst_window=10)
+        kick_threshold = 5
+        replies = 0
+        kicked_at = None
+        for i in range(67):
+            if tracker.begin_hit("100", "u1", "r1", now=i * 9.0):
+                replies += 1
+            hits = await counters.increment("100", "u1", "r1")
+            if hits >= kick_threshold:
+                kicked_at = i
+                break
+        return kicked_at, replies
+
+    kicked_at, replies = asyncio.run(run())
+    assert kicked_at == 4
+    assert replies == 3
@@ -0,0 +1,105 @@
+import asyncio
+import re
+import types
+
+from utils import regex_guard
+from utils.regex_guard import RegexGuard
+
+
+def _rule(*patterns):
+    return types.SimpleNamespace(rule_id="cfg:0", guarded_patterns=tuple(re.compile(p) for p in patterns))
+
+
+def test_sandbox_handles_chinese_text_under_non_utf8_locale(monkeypatch):
+    # 子进程继承环境变量，模拟标准输入为 GBK 编码的 Windows 主机
+    monkeypatch.setenv("PYTHONIOENCODING", "gbk")
+
+    async def run():
+        guard = RegexGuard(budget=1.0)
+        guard.has_guarded = True
+        await guard.start()
+        try:
+            rule = _rule(r"加.{0,3}群")
+            return await guard.rule_matches(rule, "快来加我们的群😀"), await guard.rule_matches(rule, "普通消息")
+        finally:
+            await guard.close()
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_budget_excludes_sandbox_startup():
+    async def run():
+        # 预算小于子进程启动耗时，只计往返时间时首条消息不应被判为超时
+        guard = RegexGuard(budget=0.02)
+        rule = _rule(r"(x+x+)+y")
+        try:
+            matched = await guard.rule_matches(rule, "xxy")
+        finally:
+            await guard.close()
+        return matched, guard.disabled_rules
+
+    assert asyncio.run(run()) == (True, set())
+
+
+def test_probe_pending_runs_off_the_event_loop():
+    async def run():
+        guard = RegexGuard()
+        rule = types.SimpleNamespace(
+            rule_id="cfg:0", regex_patterns=(re.compile(r"(a|a)*b"),), linear_patterns=(), guarded_patterns=()
+        )
+        guard.apply([rule])
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        probed = await guard.probe_pending()
+        task.cancel()
+        guard.apply([rule])
+        return probed, ticks, rule.regex_patterns, bool(rule.guarded_patterns or rule.linear_patterns)
+
+    probed, ticks, safe, moved = asyncio.run(run())
+    assert probed and ticks > 0
+    assert safe == () and moved
+
+
+def test_unavailable_sandbox_misses_and_retries_with_backoff(monkeypatch):
+    async def run():
+        guard = RegexGuard(budget=1.0)
+        rule = _rule(r"(x+x+)+y")
+        clock = [100.0]
+        # 只替换本模块的时钟，事件循环仍使用真实时间
+        monkeypatch.setattr(regex_guard, "time", types.SimpleNamespace(monotonic=lambda: clock[0]))
+
+        async def broken(*args, **kwargs):
+            raise RuntimeError("正则隔离进程启动失败")
+
+        real_start = guard._sandbox._ensure_started
+        guard._sandbox._ensure_started = broken
+        # 隔离进程不可用时不在进程内执行慢正则
+        first = await guard.rule_matches(rule, "xxy")
+        retry_at = guard._retry_at
+        clock[0] += 0.5
+        during_backoff = await guard.rule_matches(rule, "xxy")
+        clock[0] += 1
+        second = await guard.rule_matches(rule, "xxy")
+        second_delay = guard._retry_at - clock[0]
+
+        guard._sandbox._ensure_started = real_start
+        clock[0] += 10
+        try:
+            recovered = await guard.rule_matches(rule, "xxy")
+        finally:
+            await guard.close()
+        return first, retry_at, during_backoff, second, second_delay, recovered, guard._retry_delay
+
+    first, retry_at, during_backoff, second, second_delay, recovered, delay = asyncio.run(run())
+    assert (first, during_backoff, second) == (False, False, False)
+    assert retry_at == 101.0
+    assert second_delay == 2.0
+    assert recovered is True
+    assert delay == 1.0
@@ -0,0 +1,19 @@
+import pytest
+
+from utils.regex_guard import probe_patterns
+from utils.regex_worker import probe
+
+
+@pytest.mark.parametrize("pattern", [r".*微信.*", r".*加.*群.*", r".*[0-9]+.*[0-9]+.*", r"(?i)uoe.{0,3}ie", r"加.{0,3}群"])
+def test_polynomial_patterns_are_not_slow(pattern):
+    assert probe(pattern, 0)["slow"] is False
+
+
+@pytest.mark.parametrize("pattern", [r"(a+)+b", r"(a|a)*b", r"(\w+\s?)+$", r"^(\d+)*$"])
+def test_exponential_patterns_are_slow(pattern):
+    assert probe(pattern, 0)["slow"] is True
+
+
+def test_probe_patterns_in_subprocess():
+    keys = [(r".*微信.*", 32), (r"(x+x+)+y", 32)]
+    assert probe_patterns(keys, timeout=2.0) == {keys[0]: False, keys[1]: True}
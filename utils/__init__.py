@@ -1,24 +1,92 @@
+from .action_pipeline import BackgroundActionQueue
+from .action_scheduler import OneBotActionScheduler
+from .admin_cache import AdminTargetCache
+from .aho_corasick import AhoCorasick
+from .compiled_rule import CompiledRule
+from .hit_counter import HitCounterStore
 from .message import (
     build_template_context,
     extract_at_user_ids,
     extract_command_keyword,
+    extract_command_keywords,
+    build_hit_record,
     extract_json_descriptive_text,
+    fetch_group_admin_ids,
+    format_hit_notification,
+    format_rule_export_text,
     get_bot_admin_targets,
     get_group_admin_targets,
+    PrivateMessageFanout,
+    RecipientFailureCache,
+    SEGMENT_MSG_TYPES,
     notify_for_hit,
+    parse_rule_import_text,
     render_template_text,
     send_private_msg,
 )
+from .metrics import SentinelMetrics
+from .mute import MuteStateTracker, parse_mute_duration, pick_mute_duration
+from .normalize import (
+    NORMALIZE_BASIC,
+    NORMALIZE_NONE,
+    NORMALIZE_SQUEEZE,
+    build_text_views,
+    normalize_text,
+    parse_normalize_level,
+)
+from .notify_digest import NotificationDigest, format_hit_digest
+from .rate_limit import TokenBucket
+from .regex_guard import RegexGuard, probe_patterns
+from .regex_program import FusedRegexProgram, fusible_pattern_source, required_literals
+from .rule_chain import (
+    RuleChain,
+    build_literal_matcher,
+    build_literal_matchers,
+    build_regex_program,
+    merge_rule_chains,
+)
+from .rule_index import CommandRuleIndex
+from .rule_store import CommandRuleStore, normalize_command_rules
 from .time_window import (
     is_in_active_when,
     match_date_spec,
     parse_active_when,
     parse_active_when_date,
     parse_time_range_bounds,
+    next_active_when_transition,
     parse_weekdays,
 )
+from .verdict_cache import VerdictCache
+from .window_scheduler import ActiveWindowScheduler
 
 __all__ = [
+    "AhoCorasick",
+    "BackgroundActionQueue",
+    "OneBotActionScheduler",
+    "CompiledRule",
+    "HitCounterStore",
+    "FusedRegexProgram",
+    "fusible_pattern_source",
+    "required_literals",
+    "RegexGuard",
+    "probe_patterns",
+    "parse_mute_duration",
+    "pick_mute_duration",
+    "MuteStateTracker",
+    "NORMALIZE_NONE",
+    "NORMALIZE_BASIC",
+    "NORMALIZE_SQUEEZE",
+    "normalize_text",
+    "parse_normalize_level",
+    "build_text_views",
+    "RuleChain",
+    "merge_rule_chains",
+    "build_literal_matcher",
+    "build_literal_matchers",
+    "build_regex_program",
+    "CommandRuleIndex",
+    "CommandRuleStore",
+    "normalize_command_rules",
     "build_template_context",
     "render_template_text",
     "parse_time_range_bounds",
@@ -27,11 +95,28 @@ __all__ = [
     "parse_active_when",
     "match_date_spec",
     "is_in_active_when",
+    "next_active_when_transition",
+    "ActiveWindowScheduler",
     "extract_json_descriptive_text",
+    "SEGMENT_MSG_TYPES",
     "extract_at_user_ids",
     "extract_command_keyword",
+    "extract_command_keywords",
+    "parse_rule_import_text",
+    "format_rule_export_text",
+    "fetch_group_admin_ids",
     "get_group_admin_targets",
+    "AdminTargetCache",
     "get_bot_admin_targets",
     "send_private_msg",
+    "PrivateMessageFanout",
+    "RecipientFailureCache",
+    "TokenBucket",
+    "VerdictCache",
+    "SentinelMetrics",
+    "build_hit_record",
+    "format_hit_notification",
+    "format_hit_digest",
+    "NotificationDigest",
     "notify_for_hit",
 ]
@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class BackgroundActionQueue:
+    """命中后续动作（回复、踢人计数、通知）的有界后台队列。
+
+    ``submit`` 在队列已满时最多等待 ``put_timeout`` 秒形成背压，仍无空位则丢弃任务并计数；
+    ``submit_later`` 用事件循环定时器延迟入队，不占用消息处理协程。未启动时任务直接内联执行。
+    定时器触发后创建的入队任务保存在 ``_tasks`` 中防止被垃圾回收，完成后自动移除，``stop`` 时取消。
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 1000,
+        workers: int = 4,
+        put_timeout: float = 0.05,
+        logger: Any = None,
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.put_timeout = put_timeout
+        self._logger = logger
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._timers: Set[asyncio.TimerHandle] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "overflowed": 0,
+            "dropped": 0,
+            "max_depth": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=max(1, self.maxsize))
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+
+    async def stop(self, timeout: float = 5):
+        for handle in self._timers:
+            handle.cancel()
+        self._timers.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        queue = self._queue
+        if queue is None:
+            return
+        try:
+            await asyncio.wait_for(queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            if self._logger:
+                self._logger.warning(f"[Sentinel] 后台动作队列关闭超时，放弃 {queue.qsize()} 个未完成任务")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+
+    async def submit(self, job: Job, name: str = "") -> bool:
+        queue = self._queue
+        self.stats["submitted"] += 1
+        if queue is None:
+            await self._run_job(job, name)
+            return True
+        try:
+            queue.put_nowait((job, name))
+        except asyncio.QueueFull:
+            self.stats["overflowed"] += 1
+            try:
+                await asyncio.wait_for(queue.put((job, name)), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                self.stats["dropped"] += 1
+                dropped = self.stats["dropped"]
+                if self._logger and (dropped == 1 or dropped % 100 == 0):
+                    self._logger.warning(f"[Sentinel] 后台动作队列已满，已丢弃 {dropped} 个任务（最近: {name}）")
+                return False
+        depth = queue.qsize()
+        if depth > self.stats["max_depth"]:
+            self.stats["max_depth"] = depth
+        return True
+
+    def submit_later(self, delay: float, job: Job, name: str = ""):
+        if self._queue is None:
+            self._spawn(self._delayed_inline(delay, job, name))
+            return
+        loop = asyncio.get_running_loop()
+
+        def _fire():
+            self._timers.discard(handle)
+            self._spawn(self.submit(job, name))
+
+        handle = loop.call_later(delay, _fire)
+        self._timers.add(handle)
+
+    def _spawn(self, coro: Awaitable[Any]):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _delayed_inline(self, delay: float, job: Job, name: str):
+        await asyncio.sleep(delay)
+        await self.submit(job, name)
+
+    async def _run_job(self, job: Job, name: str):
+        try:
+            await job()
+            self.stats["completed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            if self._logger:
+                self._logger.error(f"[Sentinel] 后台动作执行失败 {name}: {e}")
+
+    async def _worker(self):
+        queue = self._queue
+        while True:
+            job, name = await queue.get()
+            try:
+                await self._run_job(job, name)
+            finally:
+                queue.task_done()
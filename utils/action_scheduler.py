@@ -0,0 +1,229 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from .rate_limit import TokenBucket
+
+
+LANE_RETRACT = 0
+LANE_PUNISH = 1
+LANE_MESSAGE = 2
+
+ACTION_LANES: Dict[str, int] = {
+    "delete_msg": LANE_RETRACT,
+    "set_group_ban": LANE_PUNISH,
+    "set_group_kick": LANE_PUNISH,
+    "send_group_msg": LANE_MESSAGE,
+    "send_private_msg": LANE_MESSAGE,
+}
+
+# 限速桶数量超过该值时回收已回满的空闲桶
+_MAX_IDLE_BUCKETS = 1024
+
+
+class _PendingAction:
+    __slots__ = ("bot", "action", "params", "group", "merge_key", "merge_sep", "messages", "future")
+
+    def __init__(self, bot: Any, action: str, params: dict, group: Optional[str], merge_key: Optional[Hashable], merge_sep: str):
+        self.bot = bot
+        self.action = action
+        self.params = params
+        self.group = group
+        self.merge_key = merge_key
+        self.merge_sep = merge_sep
+        self.messages: List[str] = [params["message"]] if merge_key is not None else []
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class OneBotActionScheduler:
+    """OneBot 动作调度器：按群与全局令牌桶限速，并按优先级通道依次放行。
+
+    通道优先级为撤回 > 禁言/踢人 > 回复/通知；同一通道内某个群被限速时，其它群的动作仍可先行。
+    带 ``merge_key`` 的文本消息在排队期间会与同键的后续消息合并为一条发送，合并的调用方共享结果。
+    未启动时直接调用 ``call_action``。
+    """
+
+    def __init__(
+        self,
+        *,
+        group_rate: float = 5,
+        global_rate: float = 20,
+        logger: Any = None,
+    ):
+        self._logger = logger
+        self.group_rate = 0.0
+        self.group_burst = 1.0
+        self._global_bucket = TokenBucket(global_rate, max(1.0, float(global_rate) * 2))
+        self._group_buckets: Dict[str, TokenBucket] = {}
+        self.configure(group_rate, global_rate)
+        self._lanes: Tuple[Deque[_PendingAction], ...] = (deque(), deque(), deque())
+        self._mergeable: Dict[Hashable, _PendingAction] = {}
+        self._inflight: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"dispatched": 0, "merged": 0, "throttled": 0}
+        # 可选的 SentinelMetrics，启用时记录各动作的接口耗时与失败次数
+        self.metrics: Any = None
+
+    def configure(self, group_rate: float, global_rate: float):
+        """设置每群与全局的每秒动作数，突发量为速率的两倍；不大于 0 表示不限速。"""
+        self.group_rate = float(group_rate)
+        self.group_burst = max(1.0, self.group_rate * 2)
+        self._global_bucket.configure(global_rate, max(1.0, float(global_rate) * 2))
+        for bucket in self._group_buckets.values():
+            bucket.configure(self.group_rate, self.group_burst)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def pending(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    async def call(
+        self,
+        bot: Any,
+        action: str,
+        params: dict,
+        *,
+        group: Any = None,
+        merge_key: Optional[Hashable] = None,
+        merge_sep: str = "\n",
+    ) -> Any:
+        if self._task is None:
+            return await self._invoke(bot, action, params)
+
+        if merge_key is not None:
+            queued = self._mergeable.get(merge_key)
+            if queued is not None:
+                if params["message"] not in queued.messages:
+                    queued.messages.append(params["message"])
+                self.stats["merged"] += 1
+                return await asyncio.shield(queued.future)
+
+        item = _PendingAction(bot, action, params, None if group is None else str(group), merge_key, merge_sep)
+        if merge_key is not None:
+            self._mergeable[merge_key] = item
+        self._lanes[ACTION_LANES.get(action, LANE_MESSAGE)].append(item)
+        self._wakeup.set()
+        return await asyncio.shield(item.future)
+
+    def _group_bucket(self, group: str) -> TokenBucket:
+        bucket = self._group_buckets.get(group)
+        if bucket is None:
+            if len(self._group_buckets) >= _MAX_IDLE_BUCKETS:
+                idle = [
+                    key for key, b in self._group_buckets.items()
+                    if b.delay_until_available(b.capacity) == 0
+                ]
+                for key in idle:
+                    del self._group_buckets[key]
+            bucket = self._group_buckets[group] = TokenBucket(self.group_rate, self.group_burst)
+        return bucket
+
+    def _pick(self) -> Tuple[Optional[_PendingAction], Optional[float]]:
+        """取出下一个可放行的动作；都被限速时返回需等待的秒数。"""
+        global_delay = self._global_bucket.delay_until_available()
+        if global_delay > 0:
+            return None, global_delay if self.pending() else None
+
+        wait: Optional[float] = None
+        for lane in self._lanes:
+            blocked: Set[str] = set()
+            for index, item in enumerate(lane):
+                if item.group is None:
+                    del lane[index]
+                    self._global_bucket.try_acquire()
+                    return item, None
+                if item.group in blocked:
+                    continue
+                bucket = self._group_bucket(item.group)
+                if bucket.try_acquire():
+                    del lane[index]
+                    self._global_bucket.try_acquire()
+                    return item, None
+                blocked.add(item.group)
+                delay = bucket.delay_until_available()
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _run(self):
+        wakeup = self._wakeup
+        while True:
+            item, delay = self._pick()
+            if item is not None:
+                self._dispatch(item)
+                continue
+            wakeup.clear()
+            if delay is not None:
+                self.stats["throttled"] += 1
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, item: _PendingAction):
+        if item.merge_key is not None:
+            if self._mergeable.get(item.merge_key) is item:
+                del self._mergeable[item.merge_key]
+            params = dict(item.params)
+            params["message"] = item.merge_sep.join(item.messages)
+        else:
+            params = item.params
+        self.stats["dispatched"] += 1
+        task = asyncio.ensure_future(self._invoke(item.bot, item.action, params))
+        self._inflight.add(task)
+
+        def _done(t: asyncio.Task):
+            self._inflight.discard(t)
+            if item.future.done():
+                return
+            if t.cancelled():
+                item.future.cancel()
+            elif t.exception() is not None:
+                item.future.set_exception(t.exception())
+            else:
+                item.future.set_result(t.result())
+
+        task.add_done_callback(_done)
+
+    async def _invoke(self, bot: Any, action: str, params: dict) -> Any:
+        metrics = self.metrics
+        if metrics is None or not metrics.enabled:
+            return await bot.api.call_action(action, **params)
+        t0 = time.perf_counter_ns()
+        try:
+            result = await bot.api.call_action(action, **params)
+        except Exception:
+            metrics.observe_api(action, time.perf_counter_ns() - t0, False)
+            raise
+        metrics.observe_api(action, time.perf_counter_ns() - t0, True)
+        return result
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5):
+        """停止调度；排队中的动作不再限速，直接发出并等待完成。"""
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for lane in self._lanes:
+            while lane:
+                self._dispatch(lane.popleft())
+        self._mergeable.clear()
+        if self._inflight:
+            done, pending = await asyncio.wait(set(self._inflight), timeout=timeout)
+            for t in pending:
+                t.cancel()
+            if pending and self._logger:
+                self._logger.warning(f"[Sentinel] 动作调度器关闭超时，已取消 {len(pending)} 个未完成动作")
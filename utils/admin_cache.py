@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .message import fetch_group_admin_ids, get_bot_admin_targets
+
+
+class AdminTargetCache:
+    """通知目标缓存。
+
+    群管理员列表按群缓存 ``ttl`` 秒，收到 ``group_admin`` 通知时失效；同一群的并发查询
+    共享同一个进行中的 ``get_group_member_list`` 请求。Bot 管理员列表在 ``admins_id``
+    配置变化前一直复用上次的校验结果。``ttl`` 为 0 时不缓存群管理员列表。
+    ``_epochs`` 只在群有进行中的请求时记录失效次数，请求结束即移除，不随群数量增长。
+    """
+
+    def __init__(self, ttl: float = 600):
+        self.ttl = ttl
+        self._group_admins: Dict[str, Tuple[float, Set[str]]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._epochs: Dict[str, int] = {}
+        self._bot_admins_key: Optional[Tuple[str, ...]] = None
+        self._bot_admins: Set[str] = set()
+
+    def invalidate_group(self, group_id: Any):
+        gid = str(group_id)
+        self._group_admins.pop(gid, None)
+        # 进行中的请求结果已过时，不再写入缓存；没有进行中的请求时无需记录
+        if gid in self._inflight:
+            self._epochs[gid] = self._epochs.get(gid, 0) + 1
+        else:
+            self._epochs.pop(gid, None)
+
+    def is_group_admin(self, group_id: Any, user_id: Any) -> bool:
+        entry = self._group_admins.get(str(group_id))
+        return entry is not None and str(user_id) in entry[1]
+
+    def clear(self):
+        self._group_admins.clear()
+        self._epochs.clear()
+        self._bot_admins_key = None
+        self._bot_admins = set()
+
+    async def get_group_admins(self, event: Any, logger: Any) -> Set[str]:
+        gid = str(event.get_group_id())
+        if self.ttl > 0:
+            entry = self._group_admins.get(gid)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    return entry[1]
+                del self._group_admins[gid]
+
+        task = self._inflight.get(gid)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(event, gid, logger))
+            self._inflight[gid] = task
+            task.add_done_callback(lambda _t, key=gid: self._inflight.pop(key, None))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"[Sentinel] 获取群管理员列表失败: {e}")
+            return set()
+
+    async def _fetch(self, event: Any, gid: str, logger: Any) -> Set[str]:
+        epoch = self._epochs.get(gid, 0)
+        try:
+            admin_ids = await fetch_group_admin_ids(event)
+            logger.debug(f"[Sentinel] 群 {gid} 的管理员列表: {admin_ids}")
+            if self.ttl > 0 and self._epochs.get(gid, 0) == epoch:
+                self._group_admins[gid] = (time.monotonic() + self.ttl, admin_ids)
+            return admin_ids
+        finally:
+            # 同一群同时只有一个进行中的请求，请求结束后失效计数不再需要
+            self._epochs.pop(gid, None)
+
+    def get_bot_admins(self, context: Any, logger: Any) -> Set[str]:
+        try:
+            admin_ids = context.get_config().get("admins_id", [])
+        except Exception as e:
+            logger.debug(f"[Sentinel] 读取 admins_id 失败: {e}")
+            return set()
+        key = tuple(str(x) for x in admin_ids) if isinstance(admin_ids, list) else None
+        if key is not None and key == self._bot_admins_key:
+            return self._bot_admins
+        targets = get_bot_admin_targets(context, logger)
+        self._bot_admins_key = key
+        self._bot_admins = targets
+        return targets
@@ -0,0 +1,94 @@
+from typing import Any, Dict, Hashable, List, Set, Tuple
+
+
+class AhoCorasick:
+    """多模式纯文本匹配自动机：一次扫描即可找出文本中出现的全部关键词。
+
+    每个关键词关联一个值（如规则的 ``order``），``find_values`` 返回所有命中关键词
+    对应值的集合。须先 ``add`` 全部关键词再调用 ``build``。
+    """
+
+    __slots__ = ("_goto", "_fail", "_output", "_empty_values", "_size", "_built")
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[Any, ...]] = [()]
+        # 空关键词与任意文本（含空文本）都匹配，与 `"" in text` 的语义保持一致
+        self._empty_values: Set[Any] = set()
+        self._size = 0
+        self._built = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, pattern: str, value: Hashable):
+        if self._built:
+            raise RuntimeError("AhoCorasick 已构建，不能继续添加关键词")
+        self._size += 1
+        if not pattern:
+            self._empty_values.add(value)
+            return
+
+        goto = self._goto
+        state = 0
+        for ch in pattern:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = nxt
+        if value not in self._output[state]:
+            self._output[state] = self._output[state] + (value,)
+
+    def build(self) -> "AhoCorasick":
+        """按广度优先计算失配指针，并把后缀节点的输出合并到当前节点。"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                if output[fail[nxt]]:
+                    merged = output[nxt] + tuple(v for v in output[fail[nxt]] if v not in output[nxt])
+                    output[nxt] = merged
+
+        self._built = True
+        return self
+
+    def find_values(self, text: str) -> Set[Any]:
+        """返回文本中出现的全部关键词所关联值的集合。"""
+        found = set(self._empty_values)
+        if not text or len(self._goto) == 1:
+            return found
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for ch in text:
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            out = output[state]
+            if out:
+                found.update(out)
+        return found
@@ -0,0 +1,202 @@
+import re
+from typing import Any, Callable, FrozenSet, Optional, Tuple
+
+from .mute import parse_mute_duration
+from .normalize import NORMALIZE_NONE, normalize_text, parse_normalize_level
+from .regex_program import required_literals
+from .time_window import parse_active_when
+
+
+_EMPTY_SET: FrozenSet[str] = frozenset()
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+
+def _str_set(values: Any) -> FrozenSet[str]:
+    if not values:
+        return _EMPTY_SET
+    return frozenset(str(v) for v in values)
+
+
+def _str_list(values: Any) -> Tuple[str, ...]:
+    return tuple(str(v) for v in values or ())
+
+
+class CompiledRule:
+    """预编译后的检测规则。
+
+    由 ``_update_cache`` 从配置规则或指令规则构建，消息处理、执行动作与通知均直接读取其属性。
+    使用 ``__slots__`` 以降低大量指令规则时的内存占用并加快属性访问。
+    """
+
+    __slots__ = (
+        "rule_id",
+        "source",
+        "order",
+        "keywords",
+        "msg_types",
+        "groups",
+        "user_whitelist",
+        "user_monitor_list",
+        "literal_patterns",
+        "regex_patterns",
+        "linear_patterns",
+        "guarded_patterns",
+        "regex_literals",
+        "msg_types_set",
+        "normalize",
+        "active_when_raw",
+        "active_when_spec",
+        "active_when_error",
+        "mute_bounds",
+        "reply_message",
+        "ignore_admin",
+        "kick_threshold",
+        "kick_message",
+        "notify_group_admin",
+        "notify_bot_admin",
+        "notify_creator",
+        "notify_immediate",
+        "created_by",
+    )
+
+    def __init__(self, rule_id: str, source: str, order: int):
+        self.rule_id = rule_id
+        self.source = source
+        self.order = order
+        self.keywords: Tuple[str, ...] = ()
+        self.msg_types: Tuple[str, ...] = ()
+        self.groups: FrozenSet[str] = _EMPTY_SET
+        self.user_whitelist: FrozenSet[str] = _EMPTY_SET
+        self.user_monitor_list: FrozenSet[str] = _EMPTY_SET
+        self.literal_patterns: Tuple[str, ...] = ()
+        self.regex_patterns: Tuple[re.Pattern, ...] = ()
+        # 探测为慢正则后移出的部分：RE2 编译的线性时间正则与需在隔离进程中执行的正则
+        self.linear_patterns: Tuple[Any, ...] = ()
+        self.guarded_patterns: Tuple[re.Pattern, ...] = ()
+        # 正则关键词的必需字面量：任一正则命中时消息中至少出现其中一个；为 None 时不做预过滤
+        self.regex_literals: Optional[FrozenSet[str]] = None
+        self.msg_types_set: FrozenSet[str] = _EMPTY_SET
+        # 关键词匹配所用的文本标准化级别，见 normalize.py
+        self.normalize = NORMALIZE_NONE
+        self.active_when_raw = ""
+        self.active_when_spec: Optional[dict] = None
+        self.active_when_error: Optional[str] = None
+        self.mute_bounds: Tuple[int, int] = (0, 0)
+        self.reply_message: Tuple[str, ...] = ()
+        self.ignore_admin = False
+        self.kick_threshold = 0
+        self.kick_message: Tuple[str, ...] = ()
+        self.notify_group_admin = False
+        self.notify_bot_admin = False
+        self.notify_creator = False
+        self.notify_immediate = False
+        self.created_by = ""
+
+    def __repr__(self) -> str:
+        return f"CompiledRule(rule_id={self.rule_id!r}, source={self.source!r}, order={self.order})"
+
+    @property
+    def is_command(self) -> bool:
+        return self.source == "command"
+
+    @property
+    def wants_notification(self) -> bool:
+        if self.is_command:
+            return self.notify_creator and bool(self.created_by)
+        return self.notify_group_admin or self.notify_bot_admin
+
+    @classmethod
+    def from_dict(
+        cls,
+        rule: dict,
+        *,
+        source: str,
+        rule_id: str,
+        order: int,
+        logger: Any,
+        compile_pattern: Callable[[str], "re.Pattern"] = re.compile,
+        normalize: Optional[int] = None,
+    ) -> "CompiledRule":
+        """``compile_pattern`` 可传入带缓存的编译函数，规则集重建时未变化的正则无需重新编译。
+
+        ``normalize`` 覆盖规则自身的标准化选项（指令规则统一使用指令模块配置）。
+        开启标准化后纯文本关键词在此处按同一级别标准化，消息匹配时只需标准化一次消息文本；
+        正则关键词不改写，改为忽略大小写后在标准化文本上执行。
+        """
+        compiled = cls(rule_id, source, order)
+        compiled.keywords = _str_list(rule.get("keywords"))
+        compiled.msg_types = _str_list(rule.get("msg_types"))
+        compiled.groups = _str_set(rule.get("groups"))
+        compiled.user_whitelist = _str_set(rule.get("rule_user_whitelist"))
+        compiled.user_monitor_list = _str_set(rule.get("rule_user_monitor_list"))
+        compiled.msg_types_set = frozenset(compiled.msg_types)
+        level = parse_normalize_level(rule.get("normalize")) if normalize is None else normalize
+        compiled.normalize = level if compiled.keywords else NORMALIZE_NONE
+
+        if source == "command":
+            # 指令规则关键词仅做纯文本匹配，不支持正则
+            literals = list(compiled.keywords)
+            regexes = []
+        else:
+            literals = []
+            regexes = []
+            for kw_text in compiled.keywords:
+                if level and not _REGEX_META.intersection(kw_text):
+                    # 不含正则元字符的关键词按纯文本处理，标准化后交给自动机匹配
+                    literals.append(kw_text)
+                    continue
+                try:
+                    regexes.append(compile_pattern(f"(?i){kw_text}" if level else kw_text))
+                except re.error as e:
+                    logger.error(f"[Sentinel] 规则 {rule_id} 正则表达式语法错误: {kw_text}, 错误: {e}")
+                    literals.append(kw_text)
+        if level:
+            literals = [normalize_text(kw_text, level) for kw_text in literals]
+            literals = [kw_text for kw_text in dict.fromkeys(literals) if kw_text]
+        compiled.literal_patterns = tuple(literals)
+        compiled.regex_patterns = tuple(regexes)
+        compiled.regex_literals = _union_literals(regexes)
+
+        schedule_raw = str(rule.get("time_range", "") or "").strip()
+        compiled.active_when_raw = schedule_raw
+        if schedule_raw:
+            spec, err = parse_active_when(schedule_raw)
+            compiled.active_when_spec = spec
+            compiled.active_when_error = err
+            if err:
+                logger.error(f"[Sentinel] 规则 {rule_id} time_range 配置错误: {err}")
+
+        compiled.set_mute_duration(rule.get("mute_duration", "0"), logger)
+        compiled.reply_message = _str_list(rule.get("reply_message"))
+        compiled.ignore_admin = bool(rule.get("ignore_admin", False))
+        compiled.kick_threshold = _safe_int(rule.get("kick_threshold", 0))
+        compiled.kick_message = _str_list(rule.get("kick_message"))
+        compiled.notify_group_admin = bool(rule.get("notify_group_admin", False))
+        compiled.notify_bot_admin = bool(rule.get("notify_bot_admin", False))
+        compiled.notify_immediate = bool(rule.get("notify_immediate", False))
+        compiled.created_by = str(rule.get("created_by", "") or "").strip()
+        return compiled
+
+    def set_mute_duration(self, value: Any, logger: Any):
+        bounds, err = parse_mute_duration(value)
+        self.mute_bounds = bounds
+        if err:
+            logger.error(f"[Sentinel] 规则 {self.rule_id} {err}")
+
+
+def _union_literals(patterns: list) -> Optional[FrozenSet[str]]:
+    # 任一正则无法提取必需字面量时整条规则都不能预过滤
+    found = set()
+    for pattern in patterns:
+        literals = required_literals(pattern)
+        if literals is None:
+            return None
+        found.update(literals)
+    return frozenset(found) if found else None
+
+
+def _safe_int(value: Any, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
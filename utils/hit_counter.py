@@ -0,0 +1,173 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+
+class HitCounterStore:
+    """规则累计命中次数的内存写回存储。
+
+    计数保存在内存中，按键分段加锁保证并发消息下的读改写安全；脏数据由后台任务定期
+    批量写入 KV（单个键），``terminate`` 时再做最后一次落盘。后台任务同时清理已删除
+    规则的计数。旧版本按 ``hits:{group}:{user}:{rule}`` 单独存储的计数在首次命中时迁移。
+    ``pending_groups`` 返回规则尚未载入的群（按需载入指令规则时），这些群的计数不参与清理。
+    """
+
+    STORE_KEY = "hit_counters"
+    LEGACY_PREFIX = "hits:"
+
+    def __init__(
+        self,
+        get_kv: Callable[[str, Any], Awaitable[Any]],
+        put_kv: Callable[[str, Any], Awaitable[None]],
+        delete_kv: Callable[[str], Awaitable[None]],
+        *,
+        flush_interval: float = 30,
+        lock_stripes: int = 64,
+        pending_groups: Optional[Callable[[], Set[str]]] = None,
+        logger: Any = None,
+    ):
+        self._get_kv = get_kv
+        self._put_kv = put_kv
+        self._delete_kv = delete_kv
+        self.flush_interval = flush_interval
+        self._pending_groups = pending_groups
+        self._logger = logger
+        self._counts: Dict[str, int] = {}
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(max(1, lock_stripes))]
+        self._legacy_checked: Set[str] = set()
+        self._valid_rule_ids: Optional[Set[str]] = None
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def make_key(group_id: Any, user_id: Any, rule_id: Any) -> str:
+        return f"{group_id}:{user_id}:{rule_id}"
+
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    async def load(self):
+        data = await self._get_kv(self.STORE_KEY, {})
+        counts = {}
+        if isinstance(data, dict):
+            for key, value in data.items():
+                try:
+                    count = int(value)
+                except (TypeError, ValueError):
+                    continue
+                if count > 0:
+                    counts[str(key)] = count
+        self._counts = counts
+        self._dirty = False
+
+    async def increment(self, group_id: Any, user_id: Any, rule_id: Any) -> int:
+        """计数加一并返回累计次数。"""
+        key = self.make_key(group_id, user_id, rule_id)
+        async with self._lock_for(key):
+            if key not in self._counts and key not in self._legacy_checked:
+                await self._migrate_legacy(key)
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+            self._dirty = True
+            return count
+
+    async def reset(self, group_id: Any, user_id: Any, rule_id: Any):
+        key = self.make_key(group_id, user_id, rule_id)
+        async with self._lock_for(key):
+            if self._counts.pop(key, None) is not None:
+                self._dirty = True
+
+    async def _migrate_legacy(self, key: str):
+        self._legacy_checked.add(key)
+        legacy_key = f"{self.LEGACY_PREFIX}{key}"
+        try:
+            data = await self._get_kv(legacy_key, None)
+            if data is None:
+                return
+            await self._delete_kv(legacy_key)
+            count = int(data)
+        except (ValueError, TypeError):
+            return
+        except Exception as e:
+            if self._logger:
+                self._logger.warning(f"[Sentinel] 迁移旧版命中计数失败 {legacy_key}: {e}")
+            return
+        if count > 0:
+            self._counts[key] = count
+
+    def forget_user(self, group_id: Any, user_id: Any) -> int:
+        """移除某群中某用户的全部计数（如用户已退群）。"""
+        prefix = f"{group_id}:{user_id}:"
+        stale = [key for key in self._counts if key.startswith(prefix)]
+        for key in stale:
+            del self._counts[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def set_valid_rule_ids(self, rule_ids: Iterable[str]):
+        """设置当前仍需要计数的规则 ID，供清理任务移除失效规则的计数。"""
+        self._valid_rule_ids = {str(rid) for rid in rule_ids}
+
+    def update_valid_rule_ids(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """增量调整需要计数的规则 ID，用于指令增删单条规则时避免重新收集全部规则。"""
+        if self._valid_rule_ids is None:
+            self._valid_rule_ids = set()
+        self._valid_rule_ids.difference_update(str(rid) for rid in removed)
+        self._valid_rule_ids.update(str(rid) for rid in added)
+
+    def sweep(self) -> int:
+        valid = self._valid_rule_ids
+        if valid is None:
+            return 0
+        pending = self._pending_groups() if self._pending_groups is not None else ()
+        stale = []
+        for key in self._counts:
+            parts = key.split(":", 2)
+            # 尚未载入规则的群无法判断其指令规则是否仍存在，保留计数
+            if parts[-1] not in valid and parts[0] not in pending:
+                stale.append(key)
+        for key in stale:
+            del self._counts[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        snapshot = dict(self._counts)
+        self._dirty = False
+        try:
+            await self._put_kv(self.STORE_KEY, snapshot)
+        except Exception as e:
+            self._dirty = True
+            if self._logger:
+                self._logger.error(f"[Sentinel] 写入命中计数失败: {e}")
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.sweep()
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            removed = self.sweep()
+            if removed and self._logger:
+                self._logger.debug(f"[Sentinel] 已清理 {removed} 条失效规则的命中计数")
+            await self.flush()
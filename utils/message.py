@@ -1,87 +1,177 @@
+import asyncio
+import hashlib
 import json
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Callable, List, Set
-
-
-def extract_json_descriptive_text(json_payload: Any) -> str:
-    """从分享卡片 JSON 中提取适合做关键词检测的介绍性文字。"""
-    descriptive_keys = {
-        "title",
-        "desc",
-        "description",
-        "prompt",
-        "content",
-        "text",
-        "brief",
-        "summary",
-        "subtitle",
-    }
-    ignored_keys = {
-        "app",
-        "appid",
-        "app_type",
-        "bizsrc",
-        "config",
-        "ctime",
-        "extra",
-        "jumpUrl",
-        "preview",
-        "tagIcon",
-        "token",
-        "uin",
-        "ver",
-        "view",
-    }
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+try:
+    import orjson as _fast_json
+except ImportError:  # 未安装时使用标准库
+    _fast_json = None
+
+
+_JSON_DESCRIPTIVE_KEYS = frozenset({
+    "title",
+    "desc",
+    "description",
+    "prompt",
+    "content",
+    "text",
+    "brief",
+    "summary",
+    "subtitle",
+})
+_JSON_IGNORED_KEYS = frozenset({
+    "app",
+    "appid",
+    "app_type",
+    "bizsrc",
+    "config",
+    "ctime",
+    "extra",
+    "jumpUrl",
+    "preview",
+    "tagIcon",
+    "token",
+    "uin",
+    "ver",
+    "view",
+})
+_URL_PREFIX_RE = re.compile(r"https?://", flags=re.IGNORECASE)
+_OPAQUE_TOKEN_RE = re.compile(r"[A-Za-z0-9_\-=:/.]{16,}")
+# 超大负载不做完整解析，只扫描描述性键的字符串值；各分支互斥，扫描为线性
+_JSON_DESCRIPTIVE_FIELD_RE = re.compile(
+    r'"(?:%s)"\s*:\s*"((?:[^"\\]|\\.)*)"' % "|".join(sorted(_JSON_DESCRIPTIVE_KEYS))
+)
+
+# 卡片解析上限：超出字符数的负载不再解析，只扫描描述性字段（字段数与总长度同样受限）；超出深度或节点数的部分跳过
+JSON_MAX_PAYLOAD_CHARS = 64 * 1024
+JSON_MAX_DEPTH = 32
+JSON_MAX_NODES = 4096
+_JSON_MEMO_SIZE = 256
+_json_text_memo: "OrderedDict[bytes, str]" = OrderedDict()
+
+
+def _loads_json(text: str) -> Any:
+    if _fast_json is not None:
+        return _fast_json.loads(text)
+    return json.loads(text)
+
+
+def _is_descriptive_text(text: str) -> bool:
+    # 链接、纯数字与不透明令牌不是介绍性文字
+    return bool(text) and not (_URL_PREFIX_RE.match(text) or text.isdigit() or _OPAQUE_TOKEN_RE.fullmatch(text))
+
+
+def _walk_json_texts(root: Any) -> str:
     texts = []
     seen = set()
 
     def _append_text(value: Any):
         text = str(value).strip()
-        if not text or text in seen:
-            return
-        if re.match(r"^https?://", text, flags=re.IGNORECASE):
-            return
-        if text.isdigit():
-            return
-        if re.fullmatch(r"[A-Za-z0-9_\-=:/.]{16,}", text):
+        if text in seen or not _is_descriptive_text(text):
             return
         seen.add(text)
         texts.append(text)
 
-    def _walk(node: Any, parent_key: str = ""):
+    # 迭代深度优先遍历，子节点逆序入栈以保持原有的文本顺序
+    stack = [(root, "", 0)]
+    budget = JSON_MAX_NODES
+    while stack and budget > 0:
+        node, parent_key, depth = stack.pop()
+        budget -= 1
         if isinstance(node, dict):
+            if depth >= JSON_MAX_DEPTH:
+                continue
+            children = []
             for key, value in node.items():
                 key_text = str(key).strip()
-                if key_text in ignored_keys:
+                if key_text in _JSON_IGNORED_KEYS:
                     continue
-                if key_text in descriptive_keys and not isinstance(value, (dict, list)):
-                    _append_text(value)
+                if key_text in _JSON_DESCRIPTIVE_KEYS and not isinstance(value, (dict, list)):
+                    children.append((value, None, depth))
                     continue
-                _walk(value, key_text)
-            return
-        if isinstance(node, list):
-            for item in node:
-                _walk(item, parent_key)
-            return
-        if parent_key in descriptive_keys:
+                children.append((value, key_text, depth + 1))
+            stack.extend(reversed(children))
+        elif isinstance(node, list):
+            if depth >= JSON_MAX_DEPTH:
+                continue
+            stack.extend((item, parent_key, depth + 1) for item in reversed(node))
+        elif parent_key is None or parent_key in _JSON_DESCRIPTIVE_KEYS:
+            # parent_key 为 None 表示描述性键下的标量值
             _append_text(node)
+    return " ".join(texts)
 
-    parsed_payload = json_payload
-    if isinstance(json_payload, str):
-        raw_text = json_payload.strip()
-        if raw_text:
-            try:
-                parsed_payload = json.loads(raw_text)
-            except json.JSONDecodeError:
-                return raw_text
-        else:
-            return ""
-
-    _walk(parsed_payload)
+
+def _scan_json_texts(raw_text: str) -> str:
+    """不解析超大负载，只提取描述性键的字符串值，最多 ``JSON_MAX_NODES`` 个字段、``JSON_MAX_PAYLOAD_CHARS`` 个字符。"""
+    texts = []
+    seen = set()
+    remaining = JSON_MAX_PAYLOAD_CHARS
+    for count, m in enumerate(_JSON_DESCRIPTIVE_FIELD_RE.finditer(raw_text)):
+        if count >= JSON_MAX_NODES or remaining <= 0:
+            break
+        try:
+            text = str(_loads_json(f'"{m.group(1)}"')).strip()
+        except ValueError:
+            continue
+        if text in seen or not _is_descriptive_text(text):
+            continue
+        seen.add(text)
+        text = text[:remaining]
+        remaining -= len(text)
+        texts.append(text)
     return " ".join(texts)
 
 
+def extract_json_descriptive_text(json_payload: Any) -> str:
+    """从分享卡片 JSON 中提取适合做关键词检测的介绍性文字。
+
+    字符串负载按内容摘要缓存结果，同一张卡片反复转发时只解析一次。
+    超过 ``JSON_MAX_PAYLOAD_CHARS`` 的负载只返回有界的描述性字段，不会退回为原始 JSON。
+    """
+    if not isinstance(json_payload, str):
+        return _walk_json_texts(json_payload)
+
+    raw_text = json_payload.strip()
+    if not raw_text:
+        return ""
+    if len(raw_text) > JSON_MAX_PAYLOAD_CHARS:
+        return _scan_json_texts(raw_text)
+
+    digest = hashlib.blake2b(raw_text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    cached = _json_text_memo.get(digest)
+    if cached is not None:
+        _json_text_memo.move_to_end(digest)
+        return cached
+
+    try:
+        result = _walk_json_texts(_loads_json(raw_text))
+    except (ValueError, RecursionError):
+        result = raw_text
+    _json_text_memo[digest] = result
+    if len(_json_text_memo) > _JSON_MEMO_SIZE:
+        _json_text_memo.popitem(last=False)
+    return result
+
+
+# 消息段类型到规则消息类型的映射；未列出的消息段不参与类型匹配
+SEGMENT_MSG_TYPES: Dict[str, str] = {
+    "Plain": "文本",
+    "Image": "图片",
+    "Record": "语音",
+    "Video": "视频",
+    "File": "文件",
+    "Face": "表情",
+    "Forward": "转发消息",
+    "Json": "卡片/分享",
+}
+
+
 def extract_at_user_ids(event: Any) -> List[str]:
     ids = []
     seen = set()
@@ -122,6 +212,65 @@ def extract_command_keyword(event: Any) -> str:
     return keyword
 
 
+def extract_command_keywords(event: Any) -> List[str]:
+    """提取指令中的多个关键词：指令名之后、第一个 @ 之前的各个词，按出现顺序去重。"""
+    keywords = []
+    for part in (event.message_str or "").strip().split()[1:]:
+        if part.startswith("@") or "[CQ:at" in part:
+            break
+        if part not in keywords:
+            keywords.append(part)
+    return keywords
+
+
+_IMPORT_AT_PATTERN = re.compile(r"^(?:@(\d{5,})|\[CQ:at,qq=(\d+)[^\]]*\])$", re.IGNORECASE)
+
+
+def parse_rule_import_text(text: str) -> Tuple[List[Tuple[int, str, List[str]]], List[Tuple[int, str]]]:
+    """解析指令规则导入文本。
+
+    每行格式与 ``/监控`` 参数相同：``关键词 [关键词 ...] [@QQ号 ...]``，每个关键词生成一条规则；
+    空行与 ``#`` 开头的行被忽略。返回 ``([(行号, 关键词, 目标用户)], [(行号, 错误说明)])``。
+    """
+    items = []
+    errors = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        keywords = []
+        targets = []
+        for part in line.split():
+            m = _IMPORT_AT_PATTERN.match(part)
+            if m:
+                uid = m.group(1) or m.group(2)
+                if uid not in targets:
+                    targets.append(uid)
+            elif part not in keywords:
+                keywords.append(part)
+        if not keywords:
+            errors.append((line_no, "缺少关键词"))
+            continue
+        for keyword in keywords:
+            items.append((line_no, keyword, targets))
+    return items, errors
+
+
+def format_rule_export_text(group_id: str, rules: Iterable[dict]) -> str:
+    """把某群的指令规则导出为 ``parse_rule_import_text`` 可读取的文本。"""
+    lines = [
+        f"# 群 {group_id} 指令监控规则，导出于 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "# 每行：关键词 [@QQ号 ...]，不带 @ 表示全群监控",
+    ]
+    for rule in rules:
+        keywords = [str(k) for k in rule.get("keywords", []) if str(k).strip()]
+        if not keywords:
+            continue
+        targets = [f"@{u}" for u in rule.get("rule_user_monitor_list", [])]
+        lines.append(" ".join(keywords + targets))
+    return "\n".join(lines) + "\n"
+
+
 def build_template_context(event: Any) -> dict:
     now = datetime.now()
     try:
@@ -144,21 +293,26 @@ def render_template_text(event: Any, text: str) -> str:
     return pattern.sub(lambda m: str(context.get(m.group(1), m.group(0))), text)
 
 
+async def fetch_group_admin_ids(event: Any) -> Set[str]:
+    """通过 get_group_member_list 拉取群管理员（含群主）列表，失败时抛出异常。"""
+    group_id = event.get_group_id()
+    member_list = await event.bot.api.call_action("get_group_member_list", group_id=group_id)
+
+    self_id = str(event.get_self_id() or "").strip()
+    admin_ids: Set[str] = set()
+    for member in member_list:
+        role = member.get("role", "")
+        user_id = str(member.get("user_id", "")).strip()
+        if role in ["admin", "owner"] and user_id and user_id != self_id:
+            admin_ids.add(user_id)
+    return admin_ids
+
+
 async def get_group_admin_targets(event: Any, logger: Any) -> Set[str]:
     """实时获取群组管理员列表"""
     try:
-        group_id = event.get_group_id()
-        member_list = await event.bot.api.call_action("get_group_member_list", group_id=group_id)
-
-        self_id = str(event.get_self_id() or "").strip()
-        admin_ids: Set[str] = set()
-        for member in member_list:
-            role = member.get("role", "")
-            user_id = str(member.get("user_id", "")).strip()
-            if role in ["admin", "owner"] and user_id and user_id != self_id:
-                admin_ids.add(user_id)
-
-        logger.debug(f"[Sentinel] 群 {group_id} 的管理员列表: {admin_ids}")
+        admin_ids = await fetch_group_admin_ids(event)
+        logger.debug(f"[Sentinel] 群 {event.get_group_id()} 的管理员列表: {admin_ids}")
         return admin_ids
     except Exception as e:
         logger.error(f"[Sentinel] 获取群管理员列表失败: {e}")
@@ -185,34 +339,126 @@ def get_bot_admin_targets(context: Any, logger: Any) -> Set[str]:
     return set()
 
 
-async def send_private_msg(event: Any, user_ids: Set[str], message: str, logger: Any):
+# 私聊失败原因中可判定为“无法送达”的错误，命中后在一段时间内不再向该用户发送
+PERMANENT_PRIVATE_MSG_ERRORS = (
+    ("请先添加对方为好友", "未添加Bot为好友"),
+    ("无法获取用户信息", "无法获取用户信息"),
+)
+
+
+class RecipientFailureCache:
+    """记录无法接收私聊的通知对象，在 ``ttl`` 秒内跳过对其发送。"""
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self._blocked: Dict[str, Tuple[float, str]] = {}
+
+    def mark(self, user_id: str, reason: str):
+        if self.ttl > 0:
+            self._blocked[str(user_id)] = (time.monotonic() + self.ttl, reason)
+
+    def is_blocked(self, user_id: str) -> bool:
+        entry = self._blocked.get(str(user_id))
+        if entry is None:
+            return False
+        if entry[0] <= time.monotonic():
+            del self._blocked[str(user_id)]
+            return False
+        return True
+
+    def clear(self):
+        self._blocked.clear()
+
+
+class PrivateMessageFanout:
+    """私聊通知并发发送参数：并发上限、共享限速器、失败分类缓存与动作调度器。"""
+
+    __slots__ = ("concurrency", "limiter", "failure_cache", "scheduler")
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        limiter: Any = None,
+        failure_cache: Optional[RecipientFailureCache] = None,
+        scheduler: Any = None,
+    ):
+        self.concurrency = concurrency
+        self.limiter = limiter
+        self.failure_cache = failure_cache
+        self.scheduler = scheduler
+
+
+async def send_private_msg(
+    event: Any,
+    user_ids: Iterable[str],
+    message: str,
+    logger: Any,
+    fanout: Optional[PrivateMessageFanout] = None,
+):
     if not message:
         return
-    for uid in user_ids:
+    failure_cache = fanout.failure_cache if fanout is not None else None
+    limiter = fanout.limiter if fanout is not None else None
+    scheduler = fanout.scheduler if fanout is not None else None
+    targets = [str(uid) for uid in user_ids if failure_cache is None or not failure_cache.is_blocked(uid)]
+    if not targets:
+        return
+
+    async def _send_one(uid: str):
+        if limiter is not None:
+            await limiter.acquire()
         try:
-            await event.bot.api.call_action("send_private_msg", user_id=str(uid), message=message)
+            if scheduler is not None:
+                # 同一接收人排队中的通知合并为一条
+                await scheduler.call(
+                    event.bot,
+                    "send_private_msg",
+                    {"user_id": str(uid), "message": message},
+                    merge_key=("notify", uid),
+                    merge_sep="\n\n",
+                )
+            else:
+                await event.bot.api.call_action("send_private_msg", user_id=str(uid), message=message)
         except Exception as e:
             error_msg = str(e)
-            if "请先添加对方为好友" in error_msg:
-                logger.warning(f"[Sentinel] 私聊通知失败 user_id={uid}: 未添加Bot为好友")
-            elif "无法获取用户信息" in error_msg:
-                logger.warning(f"[Sentinel] 私聊通知失败 user_id={uid}: 无法获取用户信息")
+            for marker, reason in PERMANENT_PRIVATE_MSG_ERRORS:
+                if marker in error_msg:
+                    logger.warning(f"[Sentinel] 私聊通知失败 user_id={uid}: {reason}")
+                    if failure_cache is not None:
+                        failure_cache.mark(uid, reason)
+                    break
             else:
                 logger.error(f"[Sentinel] 私聊通知失败 user_id={uid}: {error_msg[:100]}")
 
+    concurrency = fanout.concurrency if fanout is not None else 1
+    if concurrency <= 1 or len(targets) == 1:
+        for uid in targets:
+            await _send_one(uid)
+        return
 
-async def notify_for_hit(
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(uid: str):
+        async with semaphore:
+            await _send_one(uid)
+
+    await asyncio.gather(*(_bounded(uid) for uid in targets))
+
+
+def build_hit_record(
     event: Any,
-    rule: dict,
+    rule: Any,
     duration: int,
-    *,
-    context: Any,
     safe_int: Callable[[Any, int], int],
-    warned_no_admin_targets: bool,
-    logger: Any,
-) -> bool:
-    keywords = rule.get("keywords", [])
-    msg_types = rule.get("msg_types", [])
+    mute_skipped: bool = False,
+) -> dict:
+    """收集一次命中的通知信息，供单条通知与摘要通知共用。
+
+    ``duration`` 为实际执行的禁言时长（未禁言为 0，不撤回为 -1）；``mute_skipped`` 表示用户仍在禁言期内、
+    本次未重复禁言。
+    """
+    keywords = rule.keywords
+    msg_types = rule.msg_types
     if keywords:
         match_desc = f"关键词: {', '.join(str(k) for k in keywords)}"
     elif msg_types:
@@ -224,41 +470,83 @@ async def notify_for_hit(
     actions.append("撤回" if duration != -1 else "不撤回")
     if duration > 0:
         actions.append(f"禁言{duration}s")
-    kick_threshold = safe_int(rule.get("kick_threshold", 0), 0)
+    elif mute_skipped:
+        actions.append("禁言中（未重复禁言）")
+    kick_threshold = safe_int(rule.kick_threshold, 0)
     if kick_threshold > 0:
         actions.append(f"累计{kick_threshold}次踢出")
 
-    sender_id = str(event.get_sender_id() or "")
     try:
         sender_name = str(event.get_sender_name() or "").strip()
     except Exception:
         sender_name = ""
+    return {
+        "group_id": str(event.get_group_id() or ""),
+        "user_id": str(event.get_sender_id() or ""),
+        "user_name": sender_name,
+        "rule_id": str(rule.rule_id),
+        "match_desc": match_desc,
+        "actions": " / ".join(actions),
+        "time": datetime.now(),
+    }
+
+
+def format_hit_notification(record: dict) -> str:
+    sender_id = record["user_id"]
+    sender_name = record["user_name"]
     user_line = f"用户: {sender_name} ({sender_id})" if sender_name else f"用户: {sender_id}"
-    text = (
+    return (
         f"⚠️ 群哨兵通知\n"
-        f"群号: {event.get_group_id()}\n"
+        f"群号: {record['group_id']}\n"
         f"{user_line}\n"
-        f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        f"{match_desc}\n"
-        f"动作: {' / '.join(actions)}"
+        f"时间: {record['time'].strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"{record['match_desc']}\n"
+        f"动作: {record['actions']}"
     )
 
-    if rule.get("_rule_source") == "command":
-        if not bool(rule.get("_notify_creator", False)):
+
+async def notify_for_hit(
+    event: Any,
+    rule: Any,
+    duration: int,
+    *,
+    mute_skipped: bool = False,
+    context: Any,
+    safe_int: Callable[[Any, int], int],
+    warned_no_admin_targets: bool,
+    logger: Any,
+    admin_cache: Any = None,
+    digest: Any = None,
+    fanout: Optional[PrivateMessageFanout] = None,
+) -> bool:
+    async def _deliver(targets: Set[str]):
+        record = build_hit_record(event, rule, duration, safe_int, mute_skipped)
+        # 摘要模式下非“立即通知”规则的命中进入各接收人的队列，定期汇总发送
+        if digest is not None and not rule.notify_immediate:
+            digest.enqueue(event, targets, record)
+            return
+        await send_private_msg(event, targets, format_hit_notification(record), logger, fanout)
+
+    if rule.is_command:
+        if not rule.notify_creator:
             return warned_no_admin_targets
-        creator = str(rule.get("created_by", "")).strip()
+        creator = rule.created_by
         if not creator:
             return warned_no_admin_targets
-        await send_private_msg(event, {creator}, text, logger)
+        await _deliver({creator})
         return warned_no_admin_targets
 
-    notify_group_admin = bool(rule.get("notify_group_admin", False))
-    notify_bot_admin = bool(rule.get("notify_bot_admin", False))
+    notify_group_admin = rule.notify_group_admin
+    notify_bot_admin = rule.notify_bot_admin
     if not notify_group_admin and not notify_bot_admin:
         return warned_no_admin_targets
 
-    group_admins = await get_group_admin_targets(event, logger) if notify_group_admin else set()
-    bot_admins = get_bot_admin_targets(context, logger) if notify_bot_admin else set()
+    if admin_cache is not None:
+        group_admins = await admin_cache.get_group_admins(event, logger) if notify_group_admin else set()
+        bot_admins = admin_cache.get_bot_admins(context, logger) if notify_bot_admin else set()
+    else:
+        group_admins = await get_group_admin_targets(event, logger) if notify_group_admin else set()
+        bot_admins = get_bot_admin_targets(context, logger) if notify_bot_admin else set()
     all_targets = group_admins | bot_admins
 
     if not all_targets:
@@ -270,5 +558,5 @@ async def notify_for_hit(
             return True
         return warned_no_admin_targets
 
-    await send_private_msg(event, all_targets, text, logger)
+    await _deliver(all_targets)
     return False
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+
+# 消息处理各阶段：特征提取、候选规则筛选、内容匹配、执行动作；rebuild 为规则集重建
+STAGES = ("extract", "select", "match", "actions", "rebuild")
+
+
+class SentinelMetrics:
+    """运行指标：各阶段耗时、按规则的匹配统计与按动作名的接口调用统计。
+
+    未启用时各 ``observe_*`` 方法不会被调用：调用方先检查 ``enabled`` 再计时，
+    因此关闭状态下每条消息只多一次属性判断。
+    启用 ``prometheus_file`` 后，后台任务定期以 Prometheus 文本格式写入该文件。
+    """
+
+    def __init__(self, *, enabled: bool = False, prometheus_file: str = "", interval: float = 60, logger: Any = None):
+        self.enabled = enabled
+        self.prometheus_file = prometheus_file
+        self.interval = interval
+        self._logger = logger
+        self.started_at = time.time()
+        self.counters: Dict[str, int] = {"messages": 0, "skipped": 0, "matched": 0}
+        # 阶段名 -> [次数, 累计纳秒, 最大纳秒]
+        self.stages: Dict[str, List[int]] = {name: [0, 0, 0] for name in STAGES}
+        # 规则 ID -> [评估次数, 内容命中次数, 累计匹配纳秒, 执行动作次数]
+        self.rules: Dict[str, List[int]] = {}
+        # 动作名 -> [调用次数, 失败次数, 累计纳秒, 最大纳秒]
+        self.api: Dict[str, List[int]] = {}
+        # 正则预过滤：[检查次数, 拒绝次数]，拒绝即必需字面量均未出现、跳过正则执行
+        self.prefilter: List[int] = [0, 0]
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self):
+        self.started_at = time.time()
+        for key in self.counters:
+            self.counters[key] = 0
+        self.stages = {name: [0, 0, 0] for name in STAGES}
+        self.rules.clear()
+        self.api.clear()
+        self.prefilter = [0, 0]
+
+    def observe_stage(self, stage: str, elapsed_ns: int):
+        entry = self.stages[stage]
+        entry[0] += 1
+        entry[1] += elapsed_ns
+        if elapsed_ns > entry[2]:
+            entry[2] = elapsed_ns
+
+    def observe_rule(self, rule_id: str, matched: bool, elapsed_ns: int):
+        entry = self.rules.get(rule_id)
+        if entry is None:
+            entry = self.rules[rule_id] = [0, 0, 0, 0]
+        entry[0] += 1
+        if matched:
+            entry[1] += 1
+        entry[2] += elapsed_ns
+
+    def observe_rule_hit(self, rule_id: str):
+        entry = self.rules.get(rule_id)
+        if entry is None:
+            entry = self.rules[rule_id] = [0, 0, 0, 0]
+        entry[3] += 1
+
+    def observe_prefilter(self, passed: bool):
+        self.prefilter[0] += 1
+        if not passed:
+            self.prefilter[1] += 1
+
+    def observe_api(self, action: str, elapsed_ns: int, ok: bool):
+        entry = self.api.get(action)
+        if entry is None:
+            entry = self.api[action] = [0, 0, 0, 0]
+        entry[0] += 1
+        if not ok:
+            entry[1] += 1
+        entry[2] += elapsed_ns
+        if elapsed_ns > entry[3]:
+            entry[3] = elapsed_ns
+
+    def format_status(self, top_rules: int = 5) -> List[str]:
+        """返回供状态指令展示的指标摘要行。"""
+        uptime = int(time.time() - self.started_at)
+        lines = [
+            f"统计时长: {uptime // 3600}时{uptime % 3600 // 60}分",
+            f"消息: 处理 {self.counters['messages']} / 跳过 {self.counters['skipped']} / 命中 {self.counters['matched']}",
+        ]
+        stage_parts = []
+        for name in STAGES:
+            count, total, peak = self.stages[name]
+            if count:
+                stage_parts.append(f"{name} {total / count / 1000:.1f}/{peak / 1000:.0f}µs")
+        if stage_parts:
+            lines.append("阶段耗时(均值/最大): " + ", ".join(stage_parts))
+        checked, rejected = self.prefilter
+        if checked:
+            lines.append(f"正则预过滤: 检查 {checked}, 跳过 {rejected} ({rejected / checked:.1%})")
+        for action, (count, failures, total, peak) in sorted(self.api.items()):
+            lines.append(
+                f"接口 {action}: {count} 次, 失败 {failures}, 平均 {total / count / 1e6:.1f}ms, 最大 {peak / 1e6:.0f}ms"
+            )
+        busiest = sorted(self.rules.items(), key=lambda item: item[1][2], reverse=True)[:top_rules]
+        if busiest:
+            lines.append("匹配耗时最多的规则:")
+            for rule_id, (evals, matched, total, hits) in busiest:
+                lines.append(f"- {rule_id}: 评估 {evals}, 内容命中 {matched}, 执行 {hits}, 累计 {total / 1e6:.1f}ms")
+        return lines
+
+    def render_prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        lines = []
+
+        def _metric(name: str, kind: str, help_text: str, samples: List[tuple]):
+            lines.append(f"# HELP sentinel_{name} {help_text}")
+            lines.append(f"# TYPE sentinel_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                lines.append(f"sentinel_{name}{{{label_text}}} {value}" if label_text else f"sentinel_{name} {value}")
+
+        _metric("messages_total", "counter", "Group messages by outcome.",
+                [((("outcome", key),), value) for key, value in self.counters.items()])
+        _metric("stage_seconds_total", "counter", "Cumulative time spent per processing stage.",
+                [((("stage", name),), entry[1] / 1e9) for name, entry in self.stages.items()])
+        _metric("stage_calls_total", "counter", "Number of timed executions per processing stage.",
+                [((("stage", name),), entry[0]) for name, entry in self.stages.items()])
+        _metric("rule_evaluations_total", "counter", "Content evaluations per rule.",
+                [((("rule", rid),), entry[0]) for rid, entry in self.rules.items()])
+        _metric("rule_matches_total", "counter", "Content matches per rule.",
+                [((("rule", rid),), entry[1]) for rid, entry in self.rules.items()])
+        _metric("rule_match_seconds_total", "counter", "Cumulative match time per rule.",
+                [((("rule", rid),), entry[2] / 1e9) for rid, entry in self.rules.items()])
+        _metric("rule_hits_total", "counter", "Executed actions per rule.",
+                [((("rule", rid),), entry[3]) for rid, entry in self.rules.items()])
+        _metric("regex_prefilter_checks_total", "counter", "Regex rules checked against the required-literal prefilter.",
+                [((), self.prefilter[0])])
+        _metric("regex_prefilter_rejects_total", "counter", "Regex rules skipped because no required literal occurred.",
+                [((), self.prefilter[1])])
+        _metric("api_calls_total", "counter", "OneBot API calls by action.",
+                [((("action", name),), entry[0]) for name, entry in self.api.items()])
+        _metric("api_failures_total", "counter", "Failed OneBot API calls by action.",
+                [((("action", name),), entry[1]) for name, entry in self.api.items()])
+        _metric("api_seconds_total", "counter", "Cumulative OneBot API latency by action.",
+                [((("action", name),), entry[2] / 1e9) for name, entry in self.api.items()])
+        for name, value in (gauges or {}).items():
+            _metric(name, "gauge", name.replace("_", " ") + ".", [((), value)])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, gauges: Optional[Dict[str, float]] = None):
+        path = self.prometheus_file
+        if not path:
+            return
+        # 先写临时文件再替换，避免采集方读到半截内容
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus(gauges))
+        os.replace(tmp_path, path)
+
+    def start(self, gauges_provider=None):
+        if self._task is not None and not self._task.done():
+            return
+        if not self.enabled or not self.prometheus_file:
+            return
+        self._task = asyncio.create_task(self._run(gauges_provider))
+
+    async def stop(self):
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, gauges_provider):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                gauges = gauges_provider() if gauges_provider else None
+                self.write_prometheus_file(gauges)
+            except Exception as e:
+                if self._logger:
+                    self._logger.error(f"[Sentinel] 写入指标文件失败: {e}")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,104 @@
+import random
+import time
+from typing import Any
+
+
+def parse_mute_duration(value: Any) -> tuple[tuple[int, int], str | None]:
+    """解析禁言时长配置，返回 ``((最小值, 最大值), 错误信息)``。
+
+    支持固定秒数（如 ``"60"``）与区间（如 ``"30-120"``）；``-1`` 表示不撤回也不禁言。
+    格式错误时按 0（不禁言）处理并返回错误信息。
+    """
+    text = str(value if value is not None else "0").strip() or "0"
+    try:
+        if "-" in text and not text.startswith("-"):
+            start, end = map(int, text.split("-"))
+            return (min(start, end), max(start, end)), None
+        duration = int(float(text))
+        return (duration, duration), None
+    except (ValueError, TypeError):
+        return (0, 0), f"禁言时长格式错误: {text}"
+
+
+def pick_mute_duration(bounds: tuple[int, int]) -> int:
+    low, high = bounds
+    if low == high:
+        return low
+    return random.randint(low, high)
+
+
+class MuteStateTracker:
+    """本地记录用户禁言到期时间与连续命中，用于合并刷屏期间的重复动作。
+
+    ``try_mute`` 在发起禁言前先登记到期时间，同一用户仍处于禁言期内时返回 False，
+    禁言失败时由调用方 ``clear_mute`` 撤销登记；``begin_hit`` 判断同一用户对同一规则的命中
+    是否开启了新一轮刷屏。每轮刷屏从首次命中起固定持续 ``burst_window`` 秒，期间的命中不会延长窗口，
+    持续刷屏的用户每个窗口都会开启新一轮。``burst_window`` 为 0 时不做合并。
+    """
+
+    # 记录条数超过该值时清理已过期条目
+    _SWEEP_THRESHOLD = 4096
+
+    def __init__(self, burst_window: float = 10):
+        self.burst_window = burst_window
+        self._muted_until: dict[tuple[str, str], float] = {}
+        # 每轮刷屏的开始时间
+        self._burst_started: dict[tuple[str, str, str], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._muted_until) + len(self._burst_started)
+
+    def is_muted(self, group_id: Any, user_id: Any, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._muted_until.get((str(group_id), str(user_id)), 0) > now
+
+    def try_mute(self, group_id: Any, user_id: Any, duration: int, now: float | None = None) -> bool:
+        """登记一次禁言；用户仍在禁言期内时返回 False，表示无需再次调用接口。"""
+        if self.burst_window <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        key = (str(group_id), str(user_id))
+        if self._muted_until.get(key, 0) > now:
+            return False
+        if len(self._muted_until) >= self._SWEEP_THRESHOLD:
+            self._sweep(now)
+        self._muted_until[key] = now + duration
+        return True
+
+    def mark_muted(self, group_id: Any, user_id: Any, duration: int, now: float | None = None):
+        """根据群通知同步禁言状态；``duration`` 为 0 表示已解除禁言。"""
+        key = (str(group_id), str(user_id))
+        if duration <= 0:
+            self._muted_until.pop(key, None)
+            return
+        now = time.monotonic() if now is None else now
+        self._muted_until[key] = now + duration
+
+    def clear_mute(self, group_id: Any, user_id: Any):
+        self._muted_until.pop((str(group_id), str(user_id)), None)
+
+    def begin_hit(self, group_id: Any, user_id: Any, rule_id: Any, now: float | None = None) -> bool:
+        """记录一次命中；返回 True 表示这是新一轮刷屏的首次命中。"""
+        if self.burst_window <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        key = (str(group_id), str(user_id), str(rule_id))
+        started = self._burst_started.get(key)
+        if started is not None and now - started < self.burst_window:
+            return False
+        if started is None and len(self._burst_started) >= self._SWEEP_THRESHOLD:
+            self._sweep(now)
+        self._burst_started[key] = now
+        return True
+
+    def forget_user(self, group_id: Any, user_id: Any):
+        group_id, user_id = str(group_id), str(user_id)
+        self._muted_until.pop((group_id, user_id), None)
+        stale = [key for key in self._burst_started if key[0] == group_id and key[1] == user_id]
+        for key in stale:
+            del self._burst_started[key]
+
+    def _sweep(self, now: float):
+        self._muted_until = {k: v for k, v in self._muted_until.items() if v > now}
+        window = self.burst_window
+        self._burst_started = {k: v for k, v in self._burst_started.items() if now - v < window}
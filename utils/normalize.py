@@ -0,0 +1,92 @@
+import unicodedata
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+
+# 标准化级别：0 不处理；1 NFKC + 大小写折叠 + 去除不可见字符；2 在 1 的基础上再去除全部空白
+NORMALIZE_NONE = 0
+NORMALIZE_BASIC = 1
+NORMALIZE_SQUEEZE = 2
+NORMALIZE_LEVELS = (NORMALIZE_NONE, NORMALIZE_BASIC, NORMALIZE_SQUEEZE)
+
+# 配置页选项文本与级别的对应关系
+NORMALIZE_OPTIONS: Dict[str, int] = {
+    "关闭": NORMALIZE_NONE,
+    "标准化": NORMALIZE_BASIC,
+    "标准化并去除空白": NORMALIZE_SQUEEZE,
+}
+
+# 零宽字符、软连字符、双向控制符、变体选择符、标签字符以及显示为空白的填充字符
+_INVISIBLE_RANGES = (
+    (0x00AD, 0x00AD),
+    (0x034F, 0x034F),
+    (0x061C, 0x061C),
+    (0x115F, 0x1160),
+    (0x17B4, 0x17B5),
+    (0x180B, 0x180F),
+    (0x200B, 0x200F),
+    (0x202A, 0x202E),
+    (0x2060, 0x206F),
+    (0x3164, 0x3164),
+    (0xFE00, 0xFE0F),
+    (0xFEFF, 0xFEFF),
+    (0xFFA0, 0xFFA0),
+    (0x1D173, 0x1D17A),
+    (0xE0000, 0xE007F),
+    (0xE0100, 0xE01EF),
+)
+
+
+# str.isspace() 为真的全部字符
+_WHITESPACE_CHARS = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680" + "".join(
+    chr(cp) for cp in range(0x2000, 0x200B)
+) + "\u2028\u2029\u202f\u205f\u3000"
+
+# 模块加载时一次性生成 str.translate 删除表，消息处理时直接复用
+_INVISIBLE_TABLE: Dict[int, None] = {cp: None for start, end in _INVISIBLE_RANGES for cp in range(start, end + 1)}
+_WHITESPACE_TABLE: Dict[int, None] = dict(_INVISIBLE_TABLE)
+_WHITESPACE_TABLE.update((ord(ch), None) for ch in _WHITESPACE_CHARS)
+
+
+def parse_normalize_level(value: Any) -> int:
+    """解析规则的 ``normalize`` 选项，支持配置页选项文本、布尔值与级别数字。"""
+    if isinstance(value, bool):
+        return NORMALIZE_BASIC if value else NORMALIZE_NONE
+    if isinstance(value, int):
+        return value if value in NORMALIZE_LEVELS else NORMALIZE_NONE
+    text = str(value or "").strip()
+    if text in NORMALIZE_OPTIONS:
+        return NORMALIZE_OPTIONS[text]
+    if text.isdigit() and int(text) in NORMALIZE_LEVELS:
+        return int(text)
+    return NORMALIZE_NONE
+
+
+def normalize_text(text: str, level: int) -> str:
+    """按级别标准化文本；关键词编译时与消息匹配前使用同一函数，保证两侧一致。"""
+    if not level or not text:
+        return text
+    if text.isascii():
+        # ASCII 文本在 NFKC 下不变，大小写折叠等同于 lower；ASCII 中只有空白需要额外处理
+        text = text.lower()
+    else:
+        text = text.translate(_INVISIBLE_TABLE)
+        if not unicodedata.is_normalized("NFKC", text):
+            text = unicodedata.normalize("NFKC", text)
+        text = text.casefold()
+    if level >= NORMALIZE_SQUEEZE:
+        text = text.translate(_WHITESPACE_TABLE)
+    return text
+
+
+def build_text_views(text: str, levels: FrozenSet[int]) -> Tuple[Optional[str], ...]:
+    """生成规则链用到的各级标准化文本，下标为级别，未用到的级别为 None。"""
+    views: list = [text, None, None]
+    if not levels:
+        return tuple(views)
+    basic = normalize_text(text, NORMALIZE_BASIC)
+    if NORMALIZE_BASIC in levels:
+        views[NORMALIZE_BASIC] = basic
+    if NORMALIZE_SQUEEZE in levels:
+        # 去除空白只需在 1 级结果上再做一次查表删除
+        views[NORMALIZE_SQUEEZE] = basic.translate(_WHITESPACE_TABLE)
+    return tuple(views)
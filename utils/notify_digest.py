@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+from .message import PrivateMessageFanout, send_private_msg
+
+
+def format_hit_digest(records: List[dict]) -> str:
+    """把多次命中汇总为一条摘要消息，按群、用户、规则分组计数。"""
+    grouped: Dict[str, Dict[tuple, dict]] = {}
+    for record in records:
+        group_entries = grouped.setdefault(record["group_id"], {})
+        key = (record["user_id"], record["rule_id"], record["match_desc"], record["actions"])
+        entry = group_entries.get(key)
+        if entry is None:
+            group_entries[key] = {
+                "record": record,
+                "count": 1,
+                "first": record["time"],
+                "last": record["time"],
+            }
+            continue
+        entry["count"] += 1
+        entry["first"] = min(entry["first"], record["time"])
+        entry["last"] = max(entry["last"], record["time"])
+        if record["user_name"]:
+            entry["record"] = record
+
+    lines = [f"📋 群哨兵通知摘要（共 {len(records)} 次命中）"]
+    for group_id, entries in grouped.items():
+        lines.append(f"群号: {group_id}")
+        for entry in entries.values():
+            record = entry["record"]
+            sender = record["user_id"]
+            if record["user_name"]:
+                sender = f"{record['user_name']} ({record['user_id']})"
+            first = entry["first"].strftime("%H:%M:%S")
+            last = entry["last"].strftime("%H:%M:%S")
+            period = first if first == last else f"{first}~{last}"
+            lines.append(
+                f"- 用户: {sender} | {record['match_desc']} | 动作: {record['actions']} | {entry['count']}次 ({period})"
+            )
+    return "\n".join(lines)
+
+
+class _PendingDigest:
+    __slots__ = ("event", "records")
+
+    def __init__(self, event: Any):
+        self.event = event
+        self.records: List[dict] = []
+
+
+class NotificationDigest:
+    """摘要模式的管理员通知队列。
+
+    命中记录按接收人排队，每隔 ``interval`` 秒或单个接收人的队列达到 ``max_batch`` 条时
+    合并为一条摘要私聊发送，避免刷屏时逐条通知淹没管理员并耗尽 Bot 的发送配额。
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 10,
+        max_batch: int = 20,
+        fanout: Optional[PrivateMessageFanout] = None,
+        logger: Any = None,
+    ):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.fanout = fanout
+        self._logger = logger
+        self._pending: Dict[str, _PendingDigest] = {}
+        self._flushing: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(len(p.records) for p in self._pending.values())
+
+    def enqueue(self, event: Any, recipients: Iterable[str], record: dict):
+        for uid in recipients:
+            uid = str(uid)
+            pending = self._pending.get(uid)
+            if pending is None:
+                pending = self._pending[uid] = _PendingDigest(event)
+            # 使用最近一次事件的 Bot 实例发送
+            pending.event = event
+            pending.records.append(record)
+            if len(pending.records) >= self.max_batch and uid not in self._flushing:
+                task = asyncio.ensure_future(self._flush_recipient(uid))
+                self._flushing[uid] = task
+                task.add_done_callback(lambda _t, key=uid: self._flushing.pop(key, None))
+
+    async def _flush_recipient(self, uid: str):
+        pending = self._pending.pop(uid, None)
+        if pending is None or not pending.records:
+            return
+        text = format_hit_digest(pending.records)
+        await send_private_msg(pending.event, {uid}, text, self._logger, self.fanout)
+
+    async def flush(self):
+        for uid in list(self._pending):
+            try:
+                await self._flush_recipient(uid)
+            except Exception as e:
+                if self._logger:
+                    self._logger.error(f"[Sentinel] 发送通知摘要失败 user_id={uid}: {e}")
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
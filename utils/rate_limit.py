@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """令牌桶限速器。
+
+    ``rate`` 为每秒补充的令牌数，``capacity`` 为允许的突发量。``acquire`` 会预先扣减令牌，
+    令牌不足时按欠额等待，因此并发调用也按先后顺序平滑放行。``rate`` 不大于 0 表示不限速。
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated")
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    def configure(self, rate: float, capacity: float):
+        self._refill()
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = min(self._tokens, self.capacity)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """令牌充足时立即扣减并返回 True，否则不扣减并返回 False。"""
+        if self.rate <= 0:
+            return True
+        if self._refill() >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def delay_until_available(self, tokens: float = 1) -> float:
+        if self.rate <= 0:
+            return 0.0
+        missing = tokens - self._refill()
+        return max(0.0, missing / self.rate)
+
+    async def acquire(self, tokens: float = 1):
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
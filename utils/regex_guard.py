@@ -0,0 +1,331 @@
+import asyncio
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import re2 as _linear_re
+except ImportError:  # 未安装 RE2 绑定时慢正则改在隔离进程中执行
+    _linear_re = None
+
+
+_WORKER_SCRIPT = str(Path(__file__).with_name("regex_worker.py"))
+# 隔离进程启动（输出 READY）的最长等待秒数
+_STARTUP_TIMEOUT = 10
+# 隔离进程不可用后重试启动的退避秒数（首次与上限），失败一次翻倍
+_RETRY_INITIAL = 1.0
+_RETRY_MAX = 300.0
+_PatternKey = Tuple[str, int]
+
+
+def probe_patterns(keys: List[_PatternKey], timeout: float) -> Dict[_PatternKey, bool]:
+    """在子进程中用对抗输入逐条测量正则耗时，返回 ``{(pattern, flags): 是否为慢正则}``。
+
+    子进程每组输入计时后都会输出进度，超过 ``timeout`` 秒仍无输出时结束子进程，
+    把正在探测的正则判为慢正则并从下一条继续。
+    """
+    results: Dict[_PatternKey, bool] = {}
+    pending = list(keys)
+    while pending:
+        proc = subprocess.Popen(
+            [sys.executable, _WORKER_SCRIPT, "probe"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+        def _reader(stream=proc.stdout):
+            for line in stream:
+                lines.put(line)
+            lines.put(None)
+
+        threading.Thread(target=_reader, daemon=True).start()
+        proc.stdin.write(json.dumps([list(k) for k in pending]))
+        proc.stdin.close()
+
+        started = -1
+        done = 0
+        hung = False
+        while True:
+            try:
+                line = lines.get(timeout=timeout)
+            except queue.Empty:
+                hung = True
+                break
+            if line is None:
+                break
+            line = line.strip()
+            if line.startswith("START "):
+                started = int(line[6:])
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            results[pending[result["i"]]] = bool(result.get("slow"))
+            done = result["i"] + 1
+
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        if hung and started >= 0:
+            results[pending[started]] = True
+            pending = pending[started + 1:]
+        elif done < len(pending):
+            # 子进程异常退出：剩余正则无法判断，按慢正则处理
+            for key in pending[done:]:
+                results[key] = True
+            pending = []
+        else:
+            pending = []
+    return results
+
+
+class _RegexSandbox:
+    """常驻的正则隔离子进程；超时后结束进程并立即重新启动，启动耗时不计入调用方的时间预算。"""
+
+    def __init__(self):
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_started(self) -> asyncio.subprocess.Process:
+        proc = self._proc
+        if proc is None or proc.returncode is not None:
+            proc = self._proc = await asyncio.create_subprocess_exec(
+                sys.executable,
+                _WORKER_SCRIPT,
+                "serve",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            # 等待子进程完成解释器启动，之后的往返计时才只包含正则执行时间
+            try:
+                ready = await asyncio.wait_for(proc.stdout.readline(), timeout=_STARTUP_TIMEOUT)
+            except asyncio.TimeoutError:
+                ready = b""
+            if ready.strip() != b"READY":
+                await self._kill()
+                raise RuntimeError("正则隔离进程启动失败")
+        return proc
+
+    async def start(self):
+        async with self._lock:
+            await self._ensure_started()
+
+    async def search(self, pattern: Any, text: str, timeout: float) -> Tuple[Optional[bool], float]:
+        """返回 ``(是否命中, 往返耗时)``；超时命中结果为 None。
+
+        只计算请求发出到收到回复的往返时间，等待锁与启动进程的时间不计入。
+        """
+        async with self._lock:
+            proc = await self._ensure_started()
+            # 转义为 ASCII，子进程按任何本地编码读取标准输入都不会出错
+            request = json.dumps({"p": pattern.pattern, "f": pattern.flags, "t": text})
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                proc.stdin.write(request.encode("ascii") + b"\n")
+                await proc.stdin.drain()
+                reply = await asyncio.wait_for(proc.stdout.readline(), timeout=timeout)
+            except asyncio.TimeoutError:
+                elapsed = loop.time() - started
+                await self._kill()
+                await self._respawn()
+                return None, elapsed
+            except (BrokenPipeError, ConnectionResetError):
+                await self._kill()
+                raise
+            elapsed = loop.time() - started
+            reply = reply.strip()
+            if not reply:
+                await self._kill()
+                raise RuntimeError("正则隔离进程异常退出")
+            return reply == b"1", elapsed
+
+    async def _respawn(self):
+        try:
+            await self._ensure_started()
+        except (OSError, RuntimeError):
+            # 下次调用时再尝试启动，由调用方处理启动失败
+            pass
+
+    async def _kill(self):
+        proc = self._proc
+        self._proc = None
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+    async def close(self):
+        async with self._lock:
+            await self._kill()
+
+
+class RegexGuard:
+    """配置正则的灾难性回溯防护。
+
+    ``probe_pending`` 在线程池中对新出现的正则做递增长度的对抗输入探测（结果按正则文本缓存），
+    ``_update_cache`` 时 ``apply`` 据此把慢正则从同步匹配中移出：安装了 RE2 绑定时改用线性时间引擎，
+    否则放入 ``guarded_patterns``，运行时由 ``rule_matches`` 在隔离子进程中按单条消息 ``budget`` 秒的
+    时间预算执行，隔离进程由 ``start`` 预先启动。
+    超出预算的规则被自动停用并记录日志，停用后调用 ``on_disable`` 重建规则链。
+    隔离进程不可用期间慢正则一律按未命中处理，绝不在事件循环中直接执行；之后按指数退避重试启动。
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        budget: float = 0.1,
+        probe_timeout: float = 0.5,
+        logger: Any = None,
+        on_disable: Optional[Callable[[], None]] = None,
+    ):
+        self.enabled = enabled
+        self.budget = budget
+        self.probe_timeout = probe_timeout
+        self._logger = logger
+        self.on_disable = on_disable
+        self._slow: Dict[_PatternKey, bool] = {}
+        # apply 时遇到的尚未探测的正则，由 probe_pending 在后台线程中探测
+        self._pending: Dict[_PatternKey, None] = {}
+        self._reported: Set[_PatternKey] = set()
+        self.has_guarded = False
+        self.disabled_rules: Set[str] = set()
+        self._sandbox = _RegexSandbox()
+        # 隔离进程不可用时下次允许重试的时刻（monotonic）与当前退避秒数
+        self._retry_at = 0.0
+        self._retry_delay = _RETRY_INITIAL
+
+    async def probe_pending(self) -> bool:
+        """在线程池中探测 ``apply`` 时遇到的新正则，不阻塞事件循环；有新探测结果时返回 True。"""
+        keys = [key for key in self._pending if key not in self._slow]
+        self._pending.clear()
+        if not self.enabled or not keys:
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, probe_patterns, keys, self.probe_timeout)
+        except OSError as e:
+            if self._logger:
+                self._logger.error(f"[Sentinel] 正则耗时探测失败，本次跳过: {e}")
+            return False
+        self._slow.update(results)
+        return True
+
+    async def start(self):
+        """存在需隔离执行的正则时预先启动隔离进程，避免首条消息承担启动耗时。"""
+        if not self.enabled or not self.has_guarded:
+            return
+        try:
+            await self._sandbox.start()
+        except (OSError, RuntimeError) as e:
+            self._sandbox_unavailable(e)
+        else:
+            self._retry_delay = _RETRY_INITIAL
+
+    def _sandbox_unavailable(self, error: Exception):
+        delay = self._retry_delay
+        self._retry_at = time.monotonic() + delay
+        self._retry_delay = min(delay * 2, _RETRY_MAX)
+        if self._logger:
+            self._logger.error(
+                f"[Sentinel] 正则隔离进程不可用，{delay:.0f} 秒内慢正则规则按未命中处理，之后重试启动: {error}"
+            )
+
+    def apply(self, rules: Iterable[Any]):
+        """按已有探测结果把慢正则移出同步匹配路径；未探测过的正则记入待探测列表，暂按普通正则处理。"""
+        rules = [rule for rule in rules if rule.regex_patterns]
+        self.has_guarded = False
+        if not self.enabled or not rules:
+            return
+        for rule in rules:
+            for pattern in rule.regex_patterns:
+                key = (pattern.pattern, pattern.flags)
+                if key not in self._slow:
+                    self._pending[key] = None
+
+        for rule in rules:
+            safe = []
+            linear = list(rule.linear_patterns)
+            guarded = list(rule.guarded_patterns)
+            for pattern in rule.regex_patterns:
+                if not self._slow.get((pattern.pattern, pattern.flags)):
+                    safe.append(pattern)
+                    continue
+                compiled = self._compile_linear(pattern)
+                if compiled is not None:
+                    linear.append(compiled)
+                    engine = "RE2"
+                else:
+                    guarded.append(pattern)
+                    engine = "隔离进程"
+                key = (pattern.pattern, pattern.flags)
+                if self._logger and key not in self._reported:
+                    self._reported.add(key)
+                    self._logger.warning(
+                        f"[Sentinel] 规则 {rule.rule_id} 的正则可能出现灾难性回溯，改用{engine}执行: {pattern.pattern}"
+                    )
+            rule.regex_patterns = tuple(safe)
+            rule.linear_patterns = tuple(linear)
+            rule.guarded_patterns = tuple(guarded)
+            if guarded:
+                self.has_guarded = True
+
+    @staticmethod
+    def _compile_linear(pattern: Any) -> Any:
+        if _linear_re is None:
+            return None
+        try:
+            return _linear_re.compile(pattern.pattern)
+        except Exception:
+            # RE2 不支持反向引用、环视等语法
+            return None
+
+    async def rule_matches(self, rule: Any, text: str) -> bool:
+        """在时间预算内执行规则的慢正则；超出预算时停用该规则并按未命中处理。"""
+        if rule.rule_id in self.disabled_rules:
+            return False
+        if time.monotonic() < self._retry_at:
+            return False
+
+        # 预算只扣除实际的请求往返时间，排队等待隔离进程的时间不计入
+        remaining = self.budget
+        for pattern in rule.guarded_patterns:
+            try:
+                if remaining > 0:
+                    result, elapsed = await self._sandbox.search(pattern, text, remaining)
+                    remaining -= elapsed
+                else:
+                    result = None
+            except (OSError, RuntimeError) as e:
+                # 不退回进程内执行：慢正则在事件循环中运行正是本防护要避免的阻塞
+                self._sandbox_unavailable(e)
+                return False
+            self._retry_delay = _RETRY_INITIAL
+            if result is None:
+                self._disable(rule, pattern)
+                return False
+            if result:
+                return True
+        return False
+
+    def _disable(self, rule: Any, pattern: Any):
+        self.disabled_rules.add(rule.rule_id)
+        if self._logger:
+            self._logger.error(
+                f"[Sentinel] 规则 {rule.rule_id} 的正则超出 {self.budget * 1000:.0f}ms 时间预算，已自动停用: {pattern.pattern}"
+            )
+        if self.on_disable is not None:
+            self.on_disable()
+
+    async def close(self):
+        await self._sandbox.close()
@@ -0,0 +1,268 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+# 组合正则中可以用作用域内联标志 `(?flags:...)` 表达的标志
+_SCOPED_FLAGS = (
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.ASCII, "a"),
+)
+_SCOPED_FLAG_MASK = re.IGNORECASE | re.MULTILINE | re.DOTALL | re.ASCII | re.UNICODE
+_LEADING_GLOBAL_FLAGS = re.compile(r"^(?:\(\?[aiLmsux]+\))+")
+_DEFAULT_FLAGS = re.compile("").flags
+_MISSING = object()
+# 必需字面量提取：可展开为候选字面量的字符类最大字符数，及按版本存在的重复/原子分组操作码
+_MAX_CLASS_LITERALS = 8
+_REPEAT_OPS = tuple(
+    op for op in (getattr(sre_parse, name, None) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")) if op
+)
+_ATOMIC_GROUP = getattr(sre_parse, "ATOMIC_GROUP", None)
+
+
+def _has_group_reference(parsed) -> bool:
+    for op, av in parsed:
+        name = str(op)
+        if name.startswith("GROUPREF"):
+            return True
+        if isinstance(av, (list, tuple)):
+            for item in av:
+                if isinstance(item, sre_parse.SubPattern) and _has_group_reference(item):
+                    return True
+                if isinstance(item, (list, tuple)):
+                    for sub in item:
+                        if isinstance(sub, sre_parse.SubPattern) and _has_group_reference(sub):
+                            return True
+        elif isinstance(av, sre_parse.SubPattern) and _has_group_reference(av):
+            return True
+    return False
+
+
+def fusible_pattern_source(pattern: re.Pattern) -> Optional[str]:
+    """返回可嵌入组合正则的等价源码；无法安全合并时返回 None。
+
+    含命名分组、反向引用/条件分组、verbose 等全局语义标志的正则不参与合并。
+    """
+    if not isinstance(pattern.pattern, str):
+        return None
+    if pattern.groupindex:
+        return None
+    if pattern.flags & ~_SCOPED_FLAG_MASK:
+        return None
+
+    body = _LEADING_GLOBAL_FLAGS.sub("", pattern.pattern)
+    try:
+        # 去掉开头的全局标志后不应再残留任何内联全局标志
+        if re.compile(body).flags != _DEFAULT_FLAGS:
+            return None
+        if _has_group_reference(sre_parse.parse(body, pattern.flags)):
+            return None
+    except (re.error, RecursionError):
+        return None
+
+    scoped = "".join(letter for flag, letter in _SCOPED_FLAGS if pattern.flags & flag)
+    if scoped:
+        return f"(?{scoped}:{body})"
+    return body
+
+
+def _is_cased(ch: str) -> bool:
+    return ch.lower() != ch or ch.upper() != ch
+
+
+def _prefer(current: Optional[FrozenSet[str]], found: FrozenSet[str]) -> FrozenSet[str]:
+    # 优先选最短字面量更长的集合，其次选候选更少的集合
+    if current is None:
+        return found
+    if (min(map(len, found)), -len(found)) > (min(map(len, current)), -len(current)):
+        return found
+    return current
+
+
+def _class_literals(items, flags: int) -> Optional[FrozenSet[str]]:
+    chars = []
+    for op, av in items:
+        if op is not sre_parse.LITERAL:
+            return None
+        ch = chr(av)
+        if flags & re.IGNORECASE and _is_cased(ch):
+            return None
+        chars.append(ch)
+    if not chars or len(chars) > _MAX_CLASS_LITERALS:
+        return None
+    return frozenset(chars)
+
+
+def _sequence_literals(parsed, flags: int) -> Optional[FrozenSet[str]]:
+    """返回序列任一次匹配都必然包含其一的字面量集合；无法确定时返回 None。"""
+    best = None
+    run: List[str] = []
+    for op, av in list(parsed) + [(None, None)]:
+        if op is sre_parse.LITERAL:
+            ch = chr(av)
+            # 忽略大小写时有大小写之分的字符可匹配多种写法，只保留无大小写的字符（如汉字、数字）
+            if not (flags & re.IGNORECASE and _is_cased(ch)):
+                run.append(ch)
+                continue
+        if run:
+            best = _prefer(best, frozenset(("".join(run),)))
+            run = []
+        if op is None:
+            break
+
+        found = None
+        if op is sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            found = _sequence_literals(sub, (flags | add_flags) & ~del_flags)
+        elif op is _ATOMIC_GROUP:
+            found = _sequence_literals(av, flags)
+        elif op in _REPEAT_OPS:
+            low, _, sub = av
+            if low >= 1:
+                found = _sequence_literals(sub, flags)
+        elif op is sre_parse.BRANCH:
+            # 每个分支都能提取时取并集，任一分支无法提取则整体无法提取
+            branches = set()
+            for sub in av[1]:
+                literals = _sequence_literals(sub, flags)
+                if not literals:
+                    branches = None
+                    break
+                branches.update(literals)
+            found = frozenset(branches) if branches else None
+        elif op is sre_parse.IN:
+            found = _class_literals(av, flags)
+        if found:
+            best = _prefer(best, found)
+    return best
+
+
+@lru_cache(maxsize=4096)
+def _pattern_literals(source: str, flags: int) -> Optional[FrozenSet[str]]:
+    try:
+        parsed = sre_parse.parse(source, flags)
+    except (re.error, RecursionError, OverflowError):
+        return None
+    return _sequence_literals(parsed, parsed.state.flags)
+
+
+def required_literals(pattern: re.Pattern) -> Optional[FrozenSet[str]]:
+    """从正则的语法树中提取必需字面量：正则每次匹配的文本都至少包含返回集合中的一个。
+
+    集合为空或无法确定（如 ``\\d+``、否定字符类、忽略大小写的英文字母）时返回 None。
+    结果按正则文本与标志缓存，规则集重建时不会重复解析。
+    """
+    if not isinstance(pattern.pattern, str):
+        return None
+    return _pattern_literals(pattern.pattern, pattern.flags)
+
+
+class _FusedChunk:
+    __slots__ = ("pattern", "orders")
+
+    def __init__(self, pattern: re.Pattern, orders: Dict[str, int]):
+        self.pattern = pattern
+        self.orders = orders
+
+
+class FusedRegexProgram:
+    """把一条规则链中的正则合并为少量带命名分组的组合正则。
+
+    规则按 ``order`` 顺序切分为若干块，每块编译为一个交替正则；一条消息每块至多搜索
+    一次。块未命中时块内所有可合并正则均不可能命中；块命中时，命中分组所属规则直接
+    确认，块内其他规则再逐条复核，从而保持“按顺序首条命中”的语义不变。
+    """
+
+    __slots__ = ("_entries", "chunk_count")
+
+    def __init__(self, rules: Iterable[Tuple[int, Sequence[re.Pattern]]], chunk_size: int = 32):
+        chunk_size = max(1, int(chunk_size))
+        self._entries: Dict[int, Tuple[Optional[_FusedChunk], List[re.Pattern], List[re.Pattern]]] = {}
+        self.chunk_count = 0
+
+        pending: List[Tuple[int, List[Tuple[re.Pattern, str]], List[re.Pattern]]] = []
+        pending_size = 0
+        for order, patterns in rules:
+            fusible = []
+            unfused = []
+            for pattern in patterns:
+                source = fusible_pattern_source(pattern)
+                if source is None:
+                    unfused.append(pattern)
+                else:
+                    fusible.append((pattern, source))
+            if not fusible:
+                if unfused:
+                    self._entries[order] = (None, [], unfused)
+                continue
+            # 同一规则的正则不跨块，块边界只落在规则之间
+            if pending and pending_size + len(fusible) > chunk_size:
+                self._flush(pending)
+                pending = []
+                pending_size = 0
+            pending.append((order, fusible, unfused))
+            pending_size += len(fusible)
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, pending):
+        names: Dict[str, int] = {}
+        alternatives = []
+        for order, fusible, _ in pending:
+            for j, (_, source) in enumerate(fusible):
+                name = f"_r{order}_{j}"
+                names[name] = order
+                alternatives.append(f"(?P<{name}>{source})")
+
+        chunk = None
+        try:
+            chunk = _FusedChunk(re.compile("|".join(alternatives)), names)
+            self.chunk_count += 1
+        except (re.error, RecursionError, OverflowError):
+            chunk = None
+
+        for order, fusible, unfused in pending:
+            fused_patterns = [p for p, _ in fusible]
+            if chunk is None:
+                self._entries[order] = (None, [], fused_patterns + unfused)
+            else:
+                self._entries[order] = (chunk, fused_patterns, unfused)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def rule_matches(self, order: int, text: str, memo: dict) -> bool:
+        """判断规则的正则是否命中文本；``memo`` 为单条消息内共享的块结果缓存。"""
+        entry = self._entries.get(order)
+        if entry is None:
+            return False
+        chunk, fused, unfused = entry
+
+        if chunk is not None:
+            hit = memo.get(chunk, _MISSING)
+            if hit is _MISSING:
+                m = chunk.pattern.search(text)
+                hit = None
+                if m is not None:
+                    hit = chunk.orders.get(m.lastgroup)
+                    if hit is None:
+                        hit = next(chunk.orders[k] for k, v in m.groupdict().items() if v is not None)
+                memo[chunk] = hit
+            if hit is not None:
+                if hit == order:
+                    return True
+                for pattern in fused:
+                    if pattern.search(text):
+                        return True
+
+        for pattern in unfused:
+            if pattern.search(text):
+                return True
+        return False
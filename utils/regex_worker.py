@@ -0,0 +1,134 @@
+"""正则隔离进程：由 ``RegexGuard`` 以独立子进程启动，不作为模块导入使用。
+
+``probe`` 模式：从标准输入读取 ``[[pattern, flags], ...]``，逐条用递增长度的对抗输入计时，
+每条开始前输出 ``START i``、每组输入计时后输出 ``TICK``、结束后输出一行 JSON 结果；
+父进程据此判断哪条正则卡住。
+
+``serve`` 模式：启动完成后输出 ``READY``，随后逐行读取 ``{"p": pattern, "f": flags, "t": text}``，
+输出 ``1``/``0``/``E`` 表示命中、未命中或编译失败。
+"""
+
+import json
+import math
+import re
+import statistics
+import sys
+import time
+
+# 对抗输入的长度，逐步增大；按相邻长度间耗时的增长阶数判断，而不是单次耗时的绝对值
+PROBE_SIZES = (8, 12, 16, 24, 32, 48, 64, 96, 128, 256, 512, 1024, 2048)
+# 每组输入重复计时的次数，取中位数以排除调度抖动
+PROBE_RUNS = 5
+# 单次计时超过该值后不再增大输入：多项式增长的正则在实际消息长度下仍可接受
+PROBE_TIME_CAP = 0.01
+# 低于该耗时的测量受计时精度影响较大，不用于估计增长阶数
+PROBE_NOISE_FLOOR = 0.0001
+# 估计阶数 log(t2/t1)/log(n2/n1) 连续两次超过该值时判定为指数级回溯；
+# 常见的 `.*关键词.*` 类正则为 2~3 阶，嵌套量词的灾难性回溯在 6 阶以上且持续增大
+SLOW_GROWTH_DEGREE = 5.0
+_META_CHARS = set("\\^$.|?*+()[]{}")
+_TAIL = "\x00!"
+
+
+def _probe_alphabet(pattern: str):
+    chars = []
+    for ch in pattern:
+        if ch in _META_CHARS or ch.isspace() or ch in chars:
+            continue
+        chars.append(ch)
+        if len(chars) >= 4:
+            break
+    for ch in ("a", "0", " "):
+        if ch not in chars:
+            chars.append(ch)
+    return chars
+
+
+def _probe_inputs(pattern: str, size: int):
+    chars = _probe_alphabet(pattern)
+    for ch in chars:
+        yield ch * size + _TAIL
+    for i in range(len(chars) - 1):
+        pair = chars[i] + chars[i + 1]
+        yield pair * (size // 2) + _TAIL
+
+
+def _time_search(compiled, text: str) -> float:
+    samples = []
+    for _ in range(PROBE_RUNS):
+        started = time.perf_counter()
+        compiled.search(text)
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed)
+        if elapsed > PROBE_TIME_CAP:
+            break
+    return statistics.median(samples)
+
+
+def probe(pattern: str, flags: int, tick=None) -> dict:
+    try:
+        compiled = re.compile(pattern, flags)
+    except re.error as e:
+        return {"slow": False, "ms": 0.0, "error": str(e)}
+    worst = 0.0
+    degree = 0.0
+    streak = 0
+    prev_size = prev_elapsed = None
+    for size in PROBE_SIZES:
+        elapsed = 0.0
+        for text in _probe_inputs(pattern, size):
+            elapsed = max(elapsed, _time_search(compiled, text))
+            if tick is not None:
+                tick()
+        worst = max(worst, elapsed)
+        if prev_size is not None and elapsed >= PROBE_NOISE_FLOOR:
+            step = math.log(elapsed / max(prev_elapsed, 1e-7)) / math.log(size / prev_size)
+            degree = max(degree, step)
+            streak = streak + 1 if step > SLOW_GROWTH_DEGREE else 0
+            # 连续两次超阶，或超阶后耗时已达上限（下一长度可能已无法完成）
+            if streak >= 2 or (streak and elapsed > PROBE_TIME_CAP):
+                return {"slow": True, "ms": round(worst * 1000, 3), "size": size, "degree": round(degree, 1)}
+        if elapsed > PROBE_TIME_CAP:
+            break
+        prev_size, prev_elapsed = size, elapsed
+    return {"slow": False, "ms": round(worst * 1000, 3), "degree": round(degree, 1)}
+
+
+def _tick():
+    print("TICK", flush=True)
+
+
+def run_probe():
+    items = json.loads(sys.stdin.read() or "[]")
+    for index, (pattern, flags) in enumerate(items):
+        print(f"START {index}", flush=True)
+        result = probe(pattern, flags, _tick)
+        result["i"] = index
+        print(json.dumps(result), flush=True)
+
+
+def run_serve():
+    cache = {}
+    sys.stdout.write("READY\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        try:
+            req = json.loads(line)
+            key = (req["p"], req["f"])
+            compiled = cache.get(key)
+            if compiled is None:
+                if len(cache) >= 256:
+                    cache.clear()
+                compiled = cache[key] = re.compile(req["p"], req["f"])
+            reply = "1" if compiled.search(req["t"]) else "0"
+        except Exception:
+            reply = "E"
+        sys.stdout.write(reply + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        run_serve()
+    else:
+        run_probe()
@@ -0,0 +1,214 @@
+import time
+from operator import attrgetter
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+from .aho_corasick import AhoCorasick
+from .compiled_rule import CompiledRule
+from .normalize import NORMALIZE_LEVELS, NORMALIZE_NONE, build_text_views
+from .regex_program import FusedRegexProgram
+
+
+# 单条消息匹配缓存中保存自动机命中结果的键（按全局/本群自动机与标准化级别区分）与各级标准化文本的键
+_LITERAL_HITS = "__literal_hits__"
+_GROUP_LITERAL_HITS = "__group_literal_hits__"
+_TEXT_VIEWS = "__text_views__"
+_order_key = attrgetter("order")
+
+
+class RuleChain:
+    """某个群聊的候选规则链及其匹配器，由 ``_update_cache`` 预先构建。
+
+    ``version`` 记录构建时的规则集版本号，规则集每次重建都会递增版本号并整体替换规则链。
+    ``active_rules`` 是当前生效的规则子集，带生效时段的规则由时段调度器在切换时刻整体替换。
+    ``needs_text`` 与 ``needed_types`` 标记规则链用到的消息特征，消息处理时只提取这些特征。
+    ``normalize_levels`` 为规则链用到的文本标准化级别，每条消息在首次需要时按这些级别标准化一次，
+    ``global_literal_matchers`` 与 ``group_literal_matchers`` 按级别分别保存全局规则与本群规则在对应
+    标准化文本上的自动机；全局自动机与 ``global_program`` 一样由所有群的规则链共享，只构建一次。
+    开启 ``regex_prefilter`` 时自动机中还包含正则规则的必需字面量（命中值为 ``~order``），
+    纯文本关键词与正则预过滤共用同一次扫描，必需字面量均未出现的规则不执行正则。
+    """
+
+    __slots__ = (
+        "version",
+        "rules",
+        "active_rules",
+        "scheduled",
+        "needs_text",
+        "needed_types",
+        "guarded_rules",
+        "normalize_levels",
+        "global_literal_matchers",
+        "group_literal_matchers",
+        "regex_prefilter",
+        "global_program",
+        "group_program",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        rules: List[CompiledRule],
+        global_literal_matchers: Optional[Dict[int, AhoCorasick]] = None,
+        group_literal_matchers: Optional[Dict[int, AhoCorasick]] = None,
+        global_program: Optional[FusedRegexProgram] = None,
+        group_program: Optional[FusedRegexProgram] = None,
+        regex_prefilter: bool = False,
+    ):
+        self.version = version
+        self.rules = rules
+        self.active_rules = [rule for rule in rules if not rule.active_when_error]
+        self.scheduled = any(rule.active_when_spec for rule in self.active_rules)
+        self.needs_text = any(rule.keywords for rule in self.active_rules)
+        self.needed_types = frozenset(
+            t for rule in self.active_rules if not rule.keywords for t in rule.msg_types_set
+        )
+        # 含慢正则的规则，需在同步匹配之后由 RegexGuard 异步补充判断
+        self.guarded_rules = [rule for rule in self.active_rules if rule.guarded_patterns]
+        self.normalize_levels = frozenset(rule.normalize for rule in self.rules if rule.normalize)
+        self.global_literal_matchers = global_literal_matchers or {}
+        self.group_literal_matchers = group_literal_matchers or {}
+        self.regex_prefilter = regex_prefilter
+        self.global_program = global_program
+        self.group_program = group_program
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def rule_text(self, rule: CompiledRule, text: str, memo: dict) -> str:
+        """返回规则应匹配的文本：未开启标准化时为原文，否则为对应级别的标准化文本。"""
+        level = rule.normalize
+        if not level:
+            return text
+        views = memo.get(_TEXT_VIEWS)
+        if views is None:
+            views = memo[_TEXT_VIEWS] = build_text_views(text, self.normalize_levels)
+        return views[level]
+
+    def _literal_hits(self, rule: CompiledRule, text: str, memo: dict) -> Set[int]:
+        level = rule.normalize
+        if rule.groups:
+            hits_key = (_GROUP_LITERAL_HITS, level)
+            matchers = self.group_literal_matchers
+        else:
+            hits_key = (_LITERAL_HITS, level)
+            matchers = self.global_literal_matchers
+        hits = memo.get(hits_key)
+        if hits is None:
+            hits = memo[hits_key] = matchers[level].find_values(text)
+        return hits
+
+    def regex_may_match(self, rule: CompiledRule, text: str, memo: dict, metrics: Any = None) -> bool:
+        """正则预过滤：规则的必需字面量均未出现在 ``text``（规则对应级别的文本）中时返回 False。"""
+        if not self.regex_prefilter or rule.regex_literals is None:
+            return True
+        passed = ~rule.order in self._literal_hits(rule, text, memo)
+        if metrics is not None:
+            metrics.observe_prefilter(passed)
+        return passed
+
+    def rule_matches(
+        self, rule: CompiledRule, text: str, msg_types: Set[str], memo: dict, metrics: Any = None
+    ) -> bool:
+        """判断规则的内容条件是否命中；``memo`` 为单条消息内共享的自动机、正则块与标准化文本缓存。
+
+        传入 ``metrics`` 时记录正则预过滤的检查与拒绝次数。
+        """
+        if rule.keywords:
+            level = rule.normalize
+            if level:
+                text = self.rule_text(rule, text, memo)
+            # 纯文本关键词：整条消息（每个自动机、每个标准化级别）只扫描一次，按 order 查询命中
+            if rule.literal_patterns and rule.order in self._literal_hits(rule, text, memo):
+                return True
+            if (rule.regex_patterns or rule.linear_patterns) and not self.regex_may_match(rule, text, memo, metrics):
+                return False
+            if rule.regex_patterns:
+                # 标准化规则的正则不参与合并，直接在标准化文本上执行
+                program = None if level else self.group_program if rule.groups else self.global_program
+                if program is not None:
+                    if program.rule_matches(rule.order, text, memo):
+                        return True
+                else:
+                    for pattern in rule.regex_patterns:
+                        if pattern.search(text):
+                            return True
+            for pattern in rule.linear_patterns:
+                if pattern.search(text):
+                    return True
+            return False
+        if rule.msg_types:
+            return bool(rule.msg_types_set & msg_types)
+        return False
+
+    def match_orders(self, text: str, msg_types: Set[str], metrics: Any = None) -> FrozenSet[int]:
+        """返回内容条件命中的全部规则 order，不含用户、管理员等按发送者判断的条件及慢正则。
+
+        传入 ``metrics`` 时逐条规则计时并记录评估结果。
+        """
+        memo = {}
+        if metrics is None:
+            return frozenset(rule.order for rule in self.rules if self.rule_matches(rule, text, msg_types, memo))
+
+        clock = time.perf_counter_ns
+        matched = []
+        for rule in self.rules:
+            t0 = clock()
+            hit = self.rule_matches(rule, text, msg_types, memo, metrics)
+            metrics.observe_rule(rule.rule_id, hit, clock() - t0)
+            if hit:
+                matched.append(rule.order)
+        return frozenset(matched)
+
+
+def merge_rule_chains(global_rules: List[CompiledRule], group_rules: List[CompiledRule]) -> List[CompiledRule]:
+    """线性合并两条有序规则链，保持与原始配置一致的匹配顺序。
+
+    拼接后排序：Timsort 识别出两段已有序的序列后只做一次线性归并，且在 C 层完成，
+    群数量多时比逐条比较的 Python 循环快得多。
+    """
+    if not group_rules:
+        return list(global_rules)
+    if not global_rules:
+        return list(group_rules)
+    merged = global_rules + group_rules
+    merged.sort(key=_order_key)
+    return merged
+
+
+def build_literal_matcher(
+    rules: List[CompiledRule], normalize: int = NORMALIZE_NONE, regex_prefilter: bool = False
+) -> Optional[AhoCorasick]:
+    """把规则链中指定标准化级别的纯文本关键词构建为一个自动机，命中值为规则的 order。
+
+    ``regex_prefilter`` 为真时同时加入正则的必需字面量，命中值为 ``~order``，与纯文本关键词区分。
+    """
+    matcher = AhoCorasick()
+    for rule in rules:
+        if rule.normalize != normalize:
+            continue
+        for pattern in rule.literal_patterns:
+            matcher.add(pattern, rule.order)
+        if regex_prefilter and rule.regex_literals:
+            for literal in rule.regex_literals:
+                matcher.add(literal, ~rule.order)
+    if not len(matcher):
+        return None
+    return matcher.build()
+
+
+def build_literal_matchers(rules: List[CompiledRule], regex_prefilter: bool = False) -> Dict[int, AhoCorasick]:
+    """按标准化级别分别构建自动机，只包含实际用到的级别。"""
+    matchers = {}
+    for level in NORMALIZE_LEVELS:
+        matcher = build_literal_matcher(rules, level, regex_prefilter)
+        if matcher is not None:
+            matchers[level] = matcher
+    return matchers
+
+
+def build_regex_program(rules: List[CompiledRule], chunk_size: int) -> Optional[FusedRegexProgram]:
+    program = FusedRegexProgram(
+        ((rule.order, rule.regex_patterns) for rule in rules if rule.regex_patterns and not rule.normalize),
+        chunk_size,
+    )
+    return program if program else None
@@ -0,0 +1,103 @@
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+
+def _str_keys(values: Iterable) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(str(v) for v in values or ()))
+
+
+class _IndexEntry:
+    __slots__ = ("rule", "groups", "keywords", "users")
+
+    def __init__(self, rule: dict):
+        self.rule = rule
+        self.groups = _str_keys(rule.get("groups", []))
+        self.keywords = _str_keys(rule.get("keywords", []))
+        self.users = _str_keys(rule.get("rule_user_monitor_list", []))
+
+    def group_keys(self) -> Tuple[str, ...]:
+        return self.groups
+
+    def keyword_keys(self) -> List[Tuple[str, str]]:
+        return [(gid, kw) for gid in self.groups for kw in self.keywords]
+
+    def user_keys(self) -> List[Tuple[str, str]]:
+        return [(gid, uid) for gid in self.groups for uid in self.users]
+
+
+class CommandRuleIndex:
+    """已载入指令规则的集合及其二级索引：按群、按 (群, 关键词)、按 (群, 监控用户)。
+
+    指令查重、删除与列表只访问命中的规则，无需在持有 ``_command_rules_lock`` 时遍历全部规则。
+    迭代顺序为规则加入的顺序，替换已有规则时保持原位置。
+    """
+
+    def __init__(self, rules: Iterable[dict] = ()):
+        self._entries: Dict[str, _IndexEntry] = {}
+        self._by_group: Dict[str, Dict[str, dict]] = {}
+        self._by_keyword: Dict[Tuple[str, str], Dict[str, dict]] = {}
+        self._by_user: Dict[Tuple[str, str], Dict[str, dict]] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[dict]:
+        return (entry.rule for entry in self._entries.values())
+
+    def __contains__(self, rule_id: object) -> bool:
+        return str(rule_id) in self._entries
+
+    def get(self, rule_id: str) -> Optional[dict]:
+        entry = self._entries.get(str(rule_id))
+        return entry.rule if entry is not None else None
+
+    def add(self, rule: dict):
+        """加入规则；同 ID 的规则已存在时替换，并只调整变化的索引键。"""
+        rid = str(rule.get("rule_id", "")).strip()
+        entry = _IndexEntry(rule)
+        old = self._entries.get(rid)
+        self._entries[rid] = entry
+        for index, keys in (
+            (self._by_group, _IndexEntry.group_keys),
+            (self._by_keyword, _IndexEntry.keyword_keys),
+            (self._by_user, _IndexEntry.user_keys),
+        ):
+            new_keys = keys(entry)
+            if old is not None:
+                _discard(index, set(keys(old)).difference(new_keys), rid)
+            for key in new_keys:
+                index.setdefault(key, {})[rid] = rule
+
+    def remove(self, rule_id: str) -> Optional[dict]:
+        rid = str(rule_id)
+        entry = self._entries.pop(rid, None)
+        if entry is None:
+            return None
+        _discard(self._by_group, entry.group_keys(), rid)
+        _discard(self._by_keyword, entry.keyword_keys(), rid)
+        _discard(self._by_user, entry.user_keys(), rid)
+        return entry.rule
+
+    def in_group(self, group_id: str) -> List[dict]:
+        return list(self._by_group.get(group_id, {}).values())
+
+    def with_keyword(self, group_id: str, keyword: str) -> List[dict]:
+        return list(self._by_keyword.get((group_id, keyword), {}).values())
+
+    def monitoring(self, group_id: str, user_ids: Iterable[str]) -> List[dict]:
+        """返回监控列表包含任一指定用户的规则（按规则去重）。"""
+        found: Dict[str, dict] = {}
+        for uid in user_ids:
+            found.update(self._by_user.get((group_id, str(uid)), {}))
+        return list(found.values())
+
+
+def _discard(index: Dict[Hashable, Dict[str, dict]], keys: Iterable[Hashable], rid: str):
+    for key in keys:
+        bucket = index.get(key)
+        if bucket is None:
+            continue
+        bucket.pop(rid, None)
+        if not bucket:
+            del index[key]
@@ -0,0 +1,311 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+def normalize_command_rules(items: Any, max_id: int = 0) -> Tuple[List[dict], int]:
+    """清洗旧版整表存储的指令规则：丢弃缺少关键词或群号的条目，为无效 ID 分配新的数字 ID。"""
+    result = []
+    if not isinstance(items, list):
+        return result, max_id
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        keywords = item.get("keywords", [])
+        groups = item.get("groups", [])
+        if not keywords or not groups:
+            continue
+        normalized = item.copy()
+        rid = str(normalized.get("rule_id", "")).strip()
+        if rid.isdigit():
+            rid_num = int(rid)
+            if rid_num > max_id:
+                max_id = rid_num
+            normalized["rule_id"] = rid
+        else:
+            max_id += 1
+            normalized["rule_id"] = str(max_id)
+        result.append(normalized)
+    return result, max_id
+
+
+def _rule_groups(rule: dict) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(str(g) for g in rule.get("groups", [])))
+
+
+def _rule_sort_key(rule: dict):
+    # 按规则 ID 数值排序，与创建先后一致
+    rid = str(rule.get("rule_id", ""))
+    return (0, int(rid)) if rid.isdigit() else (1, rid)
+
+
+class CommandRuleStore:
+    """指令规则的按群分片存储，带追加式变更日志与定期压实。
+
+    每个群的规则保存在独立的分片键中（``{rule_id: rule}``），作用于多个群的规则在每个群的分片中各存一份。
+    指令增删规则时只追加一条日志键，记录变化的规则，不重写任何分片；日志条数达到 ``compact_threshold``、
+    后台定时任务或 ``stop`` 时执行压实：把日志合并进涉及的分片、更新索引并删除已合并的日志。
+    启动时只读取索引与未压实的日志，各群分片可在首次需要时由 ``hydrate`` 按需载入。
+    旧版保存在单个 ``command_monitor_rules`` 键中的规则在首次加载时迁移为分片。
+    """
+
+    INDEX_KEY = "command_rules:index"
+    SHARD_PREFIX = "command_rules:group:"
+    JOURNAL_PREFIX = "command_rules:journal:"
+    LEGACY_KEY = "command_monitor_rules"
+    FORMAT_VERSION = 1
+
+    def __init__(
+        self,
+        get_kv: Callable[[str, Any], Awaitable[Any]],
+        put_kv: Callable[[str, Any], Awaitable[None]],
+        delete_kv: Callable[[str], Awaitable[None]],
+        *,
+        compact_threshold: int = 200,
+        compact_interval: float = 600,
+        logger: Any = None,
+    ):
+        self._get_kv = get_kv
+        self._put_kv = put_kv
+        self._delete_kv = delete_kv
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+        self._logger = logger
+        self._lock = asyncio.Lock()
+        self._reset()
+        self._task: Optional[asyncio.Task] = None
+
+    def _reset(self):
+        # 已载入的分片：群号 -> {rule_id: rule}
+        self._shards: Dict[str, Dict[str, dict]] = {}
+        # 未载入分片上尚未压实的日志变更：群号 -> {rule_id: rule 或 None(已删除)}
+        self._overlay: Dict[str, Dict[str, Optional[dict]]] = {}
+        # 已载入规则的所属群，删除时据此定位分片
+        self._rule_groups: Dict[str, Tuple[str, ...]] = {}
+        self._groups: Set[str] = set()
+        self._dirty_groups: Set[str] = set()
+        self._compacted_seq = 0
+        self._seq = 0
+        self.max_rule_id = 0
+
+    def _shard_key(self, group_id: str) -> str:
+        return f"{self.SHARD_PREFIX}{group_id}"
+
+    def _journal_key(self, seq: int) -> str:
+        return f"{self.JOURNAL_PREFIX}{seq}"
+
+    @property
+    def pending_groups(self) -> Set[str]:
+        """已知有规则但分片尚未载入的群。"""
+        return self._groups.difference(self._shards)
+
+    @property
+    def journal_length(self) -> int:
+        return self._seq - self._compacted_seq
+
+    def is_hydrated(self, group_id: str) -> bool:
+        return group_id in self._shards
+
+    def needs_hydrate(self, group_id: str) -> bool:
+        """消息处理路径上的快速判断：该群有规则且分片尚未载入。"""
+        return group_id in self._groups and group_id not in self._shards
+
+    async def load(self):
+        """读取索引并重放未压实的日志；不存在索引时从旧版整表存储迁移。"""
+        async with self._lock:
+            self._reset()
+            index = await self._get_kv(self.INDEX_KEY, None)
+            if not isinstance(index, dict):
+                await self._migrate_legacy()
+                return
+            self._groups = {str(g) for g in index.get("groups", [])}
+            self._compacted_seq = self._seq = int(index.get("seq", 0) or 0)
+            self.max_rule_id = int(index.get("max_id", 0) or 0)
+            # 日志键连续编号，读到第一个缺失的序号即为末尾
+            while True:
+                entry = await self._get_kv(self._journal_key(self._seq + 1), None)
+                if not isinstance(entry, dict):
+                    break
+                self._seq += 1
+                self._replay(entry)
+
+    async def _migrate_legacy(self):
+        data = await self._get_kv(self.LEGACY_KEY, None)
+        rules, self.max_rule_id = normalize_command_rules(data)
+        shards: Dict[str, Dict[str, dict]] = {}
+        for rule in rules:
+            for gid in _rule_groups(rule):
+                shards.setdefault(gid, {})[rule["rule_id"]] = rule
+        for gid, shard in shards.items():
+            await self._put_kv(self._shard_key(gid), shard)
+        self._groups = set(shards)
+        await self._write_index()
+        if data is not None:
+            await self._delete_kv(self.LEGACY_KEY)
+            if self._logger:
+                self._logger.info(f"[Sentinel] 已将 {len(rules)} 条指令规则迁移为 {len(shards)} 个按群分片")
+
+    def _replay(self, entry: dict):
+        # 与 record 相同的顺序：先删除后写入
+        for item in entry.get("del", []):
+            if isinstance(item, dict):
+                self._apply_delete(str(item.get("id", "")), [str(g) for g in item.get("groups", [])])
+        for rule in entry.get("put", []):
+            if isinstance(rule, dict):
+                self._apply_put(rule)
+
+    def _apply_put(self, rule: dict):
+        rid = str(rule.get("rule_id", "")).strip()
+        if rid.isdigit() and int(rid) > self.max_rule_id:
+            self.max_rule_id = int(rid)
+        groups = _rule_groups(rule)
+        for gid in groups:
+            self._groups.add(gid)
+            self._dirty_groups.add(gid)
+            shard = self._shards.get(gid)
+            if shard is not None:
+                shard[rid] = rule
+            else:
+                self._overlay.setdefault(gid, {})[rid] = rule
+        if any(gid in self._shards for gid in groups):
+            self._rule_groups[rid] = groups
+
+    def _apply_delete(self, rid: str, groups: Iterable[str]):
+        for gid in groups:
+            self._dirty_groups.add(gid)
+            shard = self._shards.get(gid)
+            if shard is not None:
+                shard.pop(rid, None)
+            else:
+                self._overlay.setdefault(gid, {})[rid] = None
+        self._rule_groups.pop(rid, None)
+
+    async def hydrate(self, group_id: str) -> List[dict]:
+        """载入某群的分片，返回此前未载入过的规则；分片已载入时返回空列表。"""
+        async with self._lock:
+            if group_id in self._shards:
+                return []
+            shard = await self._read_shard(group_id)
+            self._shards[group_id] = shard
+            rules = []
+            for rid, rule in shard.items():
+                if rid not in self._rule_groups:
+                    rules.append(rule)
+                self._rule_groups[rid] = _rule_groups(rule)
+            rules.sort(key=_rule_sort_key)
+            return rules
+
+    async def hydrate_all(self) -> List[dict]:
+        rules = []
+        for gid in sorted(self.pending_groups):
+            rules.extend(await self.hydrate(gid))
+        rules.sort(key=_rule_sort_key)
+        return rules
+
+    async def _read_shard(self, group_id: str, consume: bool = True) -> Dict[str, dict]:
+        """读取分片并叠加尚未压实的日志变更；``consume`` 为假时保留这些变更。"""
+        data = await self._get_kv(self._shard_key(group_id), {})
+        shard = {}
+        if isinstance(data, dict):
+            for rid, rule in data.items():
+                if isinstance(rule, dict):
+                    shard[str(rid)] = rule
+        overlay = self._overlay.pop(group_id, {}) if consume else self._overlay.get(group_id, {})
+        for rid, rule in overlay.items():
+            if rule is None:
+                shard.pop(rid, None)
+            else:
+                shard[rid] = rule
+        return shard
+
+    async def record(self, upserts: Iterable[dict] = (), removed_ids: Iterable[str] = ()):
+        """追加一条变更日志；修改所属群的规则会同时从原群的分片中删除。"""
+        async with self._lock:
+            puts = []
+            deletes = []
+            for rule in upserts:
+                rid = str(rule.get("rule_id", "")).strip()
+                stale = set(self._rule_groups.get(rid, ())) - set(_rule_groups(rule))
+                if stale:
+                    deletes.append({"id": rid, "groups": sorted(stale)})
+                puts.append(rule)
+            for rid in removed_ids:
+                rid = str(rid)
+                groups = self._rule_groups.get(rid)
+                if groups:
+                    deletes.append({"id": rid, "groups": list(groups)})
+            if not puts and not deletes:
+                return
+            entry = {"put": puts, "del": deletes}
+            await self._put_kv(self._journal_key(self._seq + 1), entry)
+            self._seq += 1
+            # 先处理删除，规则换群时旧分片移除、新分片写入
+            for item in deletes:
+                self._apply_delete(item["id"], item["groups"])
+            for rule in puts:
+                self._apply_put(rule)
+            needs_compaction = self.journal_length >= self.compact_threshold > 0
+        if needs_compaction:
+            await self.compact()
+
+    async def compact(self):
+        """把日志合并进涉及的分片并更新索引，随后删除已合并的日志。"""
+        async with self._lock:
+            if self._seq == self._compacted_seq and not self._dirty_groups:
+                return
+            for gid in sorted(self._dirty_groups):
+                shard = self._shards.get(gid)
+                if shard is None:
+                    # 未载入的群只读写一次分片，写入成功后才丢弃叠加的变更
+                    shard = await self._read_shard(gid, consume=False)
+                if shard:
+                    await self._put_kv(self._shard_key(gid), shard)
+                else:
+                    await self._delete_kv(self._shard_key(gid))
+                    self._groups.discard(gid)
+                self._overlay.pop(gid, None)
+                self._dirty_groups.discard(gid)
+            first = self._compacted_seq + 1
+            self._compacted_seq = self._seq
+            await self._write_index()
+            for seq in range(first, self._seq + 1):
+                await self._delete_kv(self._journal_key(seq))
+
+    async def _write_index(self):
+        await self._put_kv(
+            self.INDEX_KEY,
+            {
+                "version": self.FORMAT_VERSION,
+                "groups": sorted(self._groups),
+                "seq": self._compacted_seq,
+                "max_id": self.max_rule_id,
+            },
+        )
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task = self._task
+        self._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.compact()
+        except Exception as e:
+            if self._logger:
+                self._logger.error(f"[Sentinel] 压实指令规则日志失败: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.compact_interval)
+            try:
+                await self.compact()
+            except Exception as e:
+                if self._logger:
+                    self._logger.error(f"[Sentinel] 压实指令规则日志失败: {e}")
@@ -1,5 +1,5 @@
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from typing import Any
 
 
@@ -166,11 +166,11 @@ def match_date_spec(date_spec: dict, anchor_date) -> bool:
     return True
 
 
-def is_in_active_when(spec: dict) -> bool:
+def is_in_active_when(spec: dict, now: datetime | None = None) -> bool:
     if not spec:
         return True
 
-    now_dt = datetime.now()
+    now_dt = now or datetime.now()
     now_date = now_dt.date()
     now_weekday = now_dt.weekday()
     now_minute = now_dt.hour * 60 + now_dt.minute
@@ -204,3 +204,34 @@ def is_in_active_when(spec: dict) -> bool:
             return False
 
     return True
+
+
+def next_active_when_transition(spec: dict, now: datetime, horizon_days: int = 366) -> datetime | None:
+    """计算 ``now`` 之后生效状态首次发生变化的时刻（精确到分钟）。
+
+    生效状态只可能在每日零点、时间段起点以及终点的下一分钟发生变化，逐日检查这些边界即可，
+    跨天时间段同样适用。``horizon_days`` 天内无变化时返回 None。
+    """
+    if not spec:
+        return None
+
+    offsets = {0}
+    time_bounds = spec.get("_time_bounds")
+    if isinstance(time_bounds, tuple):
+        start_min, end_min = time_bounds
+        offsets.add(start_min)
+        if end_min + 1 < 24 * 60:
+            offsets.add(end_min + 1)
+    offsets = sorted(offsets)
+
+    current = is_in_active_when(spec, now)
+    first_day = now.date()
+    for day_offset in range(horizon_days + 1):
+        base = datetime.combine(first_day + timedelta(days=day_offset), time())
+        for minute in offsets:
+            candidate = base + timedelta(minutes=minute)
+            if candidate <= now:
+                continue
+            if is_in_active_when(spec, candidate) != current:
+                return candidate
+    return None
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Optional, Tuple
+
+
+class VerdictCache:
+    """消息内容匹配结果的 LRU 缓存。
+
+    键由调用方以 ``(规则链版本, 规则链范围, 文本哈希, 消息类型集合)`` 构成，值为内容命中的规则
+    ``order`` 集合；同时保存原文，哈希碰撞时按未命中处理。规则集重建后须 ``clear``。
+    ``maxsize`` 为 0 表示禁用。
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[str, FrozenSet[int]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, text: str) -> Optional[FrozenSet[int]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != text:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def put(self, key: Hashable, text: str, matched: FrozenSet[int]):
+        if self.maxsize <= 0:
+            return
+        entries = self._entries
+        entries[key] = (text, matched)
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from .rule_chain import RuleChain
+from .time_window import is_in_active_when, next_active_when_transition
+
+
+class ActiveWindowScheduler:
+    """规则生效时段调度器。
+
+    预先计算每个时段配置下一次切换生效状态的时刻，仅在切换时刻重新计算各规则链的
+    ``active_rules``，消息处理时无需再对每条规则调用 ``datetime.now()`` 判断时段。
+    """
+
+    # 单次休眠上限，用于兜底系统时间被调整、休眠唤醒等情况
+    MAX_SLEEP_SECONDS = 300
+    HORIZON_DAYS = 366
+
+    def __init__(self, logger: Any = None):
+        self._logger = logger
+        self._chains: List[RuleChain] = []
+        self._specs: Dict[int, dict] = {}
+        self._transitions: Dict[int, Optional[datetime]] = {}
+        self._active_orders: set = set()
+        self._next_at: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def next_transition(self) -> Optional[datetime]:
+        return self._next_at
+
+    def rebuild(self, chains: Iterable[RuleChain], now: Optional[datetime] = None):
+        """规则集重建后调用：收集带时段的规则并立即刷新所有规则链的生效列表。"""
+        self._chains = [chain for chain in chains if chain.scheduled]
+        specs: Dict[int, dict] = {}
+        for chain in self._chains:
+            for rule in chain.rules:
+                spec = rule.active_when_spec
+                if spec and not rule.active_when_error:
+                    specs[rule.order] = spec
+        self._specs = specs
+        self._transitions = {}
+        self._active_orders = set()
+        self.refresh(now, force=True)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def replace_chains(self, removed: Iterable[RuleChain], added: Iterable[RuleChain], now: Optional[datetime] = None):
+        """局部重建规则链后调用：只替换受影响的规则链，出现新的时段配置时才整体刷新。"""
+        removed_ids = {id(chain) for chain in removed}
+        self._chains = [chain for chain in self._chains if id(chain) not in removed_ids]
+        new_chains = [chain for chain in added if chain.scheduled]
+        new_spec = False
+        for chain in new_chains:
+            self._chains.append(chain)
+            for rule in chain.rules:
+                spec = rule.active_when_spec
+                if spec and not rule.active_when_error and rule.order not in self._specs:
+                    self._specs[rule.order] = spec
+                    new_spec = True
+        if new_spec:
+            self.refresh(now, force=True)
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return
+        for chain in new_chains:
+            chain.active_rules = self._active_rules_of(chain)
+
+    def _active_rules_of(self, chain: RuleChain) -> List[Any]:
+        active_orders = self._active_orders
+        return [
+            rule
+            for rule in chain.rules
+            if not rule.active_when_error
+            and (not rule.active_when_spec or rule.order in active_orders)
+        ]
+
+    def refresh(self, now: Optional[datetime] = None, force: bool = False):
+        """到达切换时刻时重新计算生效规则集合，并整体替换各规则链的 ``active_rules``。"""
+        now = now or datetime.now()
+        if not force and (self._next_at is None or now < self._next_at):
+            return
+
+        active_orders = set()
+        next_at = None
+        for order, spec in self._specs.items():
+            transition = self._transitions.get(order, now)
+            if transition is not None and transition <= now:
+                transition = next_active_when_transition(spec, now, self.HORIZON_DAYS)
+                if transition is None:
+                    # 一年内都不会切换：到期后再重新计算一次
+                    transition = now + timedelta(days=self.HORIZON_DAYS)
+                self._transitions[order] = transition
+            if is_in_active_when(spec, now):
+                active_orders.add(order)
+            if next_at is None or transition < next_at:
+                next_at = transition
+
+        changed = force or active_orders != self._active_orders
+        self._active_orders = active_orders
+        self._next_at = next_at
+        if not changed:
+            return
+        for chain in self._chains:
+            chain.active_rules = self._active_rules_of(chain)
+        if self._logger and not force:
+            self._logger.debug(f"[Sentinel] 规则生效时段切换，当前生效的定时规则: {len(active_orders)} 条")
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task = self._task
+        self._task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            delay = self.MAX_SLEEP_SECONDS
+            if self._next_at is not None:
+                remaining = (self._next_at - datetime.now()).total_seconds()
+                delay = min(delay, max(remaining, 0) + 0.05)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self.refresh()
+            except Exception as e:
+                if self._logger:
+                    self._logger.error(f"[Sentinel] 刷新规则生效时段失败: {e}")